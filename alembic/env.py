@@ -3,7 +3,8 @@ from logging.config import fileConfig
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
-from app.database.database import Base
+from app.database.database import Base, SQLALCHEMY_DATABASE_URL
+from app.models import models  # noqa: F401 - registra as tabelas no metadata
 
 from alembic import context
 
@@ -14,7 +15,14 @@ config = context.config
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
-    fileConfig(config.config_file_name)
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+# A URL do banco vem da mesma variável de ambiente usada pela aplicação,
+# assim `alembic upgrade head` no entrypoint aponta para o banco correto.
+if SQLALCHEMY_DATABASE_URL:
+    config.set_main_option(
+        'sqlalchemy.url', SQLALCHEMY_DATABASE_URL.replace('%', '%%')
+    )
 
 # add your model's MetaData object here
 # for 'autogenerate' support
@@ -59,6 +67,13 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    # Permite que testes e comandos da aplicação reutilizem uma conexão já
+    # aberta (``config.attributes['connection']``).
+    connection = config.attributes.get('connection')
+    if connection is not None:
+        _run_with_connection(connection)
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
@@ -66,12 +81,16 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(
-            connection=connection, target_metadata=target_metadata
-        )
+        _run_with_connection(connection)
 
-        with context.begin_transaction():
-            context.run_migrations()
+
+def _run_with_connection(connection) -> None:
+    context.configure(
+        connection=connection, target_metadata=target_metadata
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
 
 
 if context.is_offline_mode():
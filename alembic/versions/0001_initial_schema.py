@@ -0,0 +1,65 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Bancos criados antes das migrações (via `create_all`) já possuem
+    # estas tabelas; nesse caso a revisão apenas registra o estado atual.
+    existing = sa.inspect(op.get_bind()).get_table_names()
+
+    if 'customers' not in existing:
+        op.create_table(
+            'customers',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(), nullable=True),
+            sa.Column('email', sa.String(), nullable=True),
+            sa.Column('cpf', sa.String(), nullable=True),
+            sa.Column('hashed_password', sa.String(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_customers_id', 'customers', ['id'])
+        op.create_index('ix_customers_name', 'customers', ['name'])
+        op.create_index(
+            'ix_customers_email', 'customers', ['email'], unique=True
+        )
+        op.create_index('ix_customers_cpf', 'customers', ['cpf'], unique=True)
+
+    if 'tokens' not in existing:
+        op.create_table(
+            'tokens',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('token', sa.String(), nullable=True),
+            sa.Column('is_used', sa.Boolean(), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['customers.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_tokens_id', 'tokens', ['id'])
+        op.create_index('ix_tokens_token', 'tokens', ['token'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tokens_token', table_name='tokens')
+    op.drop_index('ix_tokens_id', table_name='tokens')
+    op.drop_table('tokens')
+    op.drop_index('ix_customers_cpf', table_name='customers')
+    op.drop_index('ix_customers_email', table_name='customers')
+    op.drop_index('ix_customers_name', table_name='customers')
+    op.drop_index('ix_customers_id', table_name='customers')
+    op.drop_table('customers')
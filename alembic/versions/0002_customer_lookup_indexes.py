@@ -0,0 +1,51 @@
+"""customer lookup indexes
+
+Índice funcional em `lower(email)` para o login, índices de cobertura com
+as colunas de `schemas.Customer` (index-only scans no Postgres) e remoção
+do índice em `name`, que nenhuma consulta utiliza.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_customers_name', table_name='customers')
+
+    op.create_index(
+        'ix_customers_email_lower',
+        'customers',
+        [sa.text('lower(email)')],
+        postgresql_include=[
+            'id', 'name', 'email', 'cpf', 'hashed_password'
+        ],
+    )
+
+    op.drop_index('ix_customers_cpf', table_name='customers')
+    op.create_index(
+        'ix_customers_cpf_covering',
+        'customers',
+        ['cpf'],
+        unique=True,
+        postgresql_include=['id', 'name', 'email'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_customers_cpf_covering', table_name='customers')
+    op.create_index('ix_customers_cpf', 'customers', ['cpf'], unique=True)
+    op.drop_index('ix_customers_email_lower', table_name='customers')
+    op.create_index('ix_customers_name', 'customers', ['name'])
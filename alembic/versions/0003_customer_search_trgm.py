@@ -0,0 +1,51 @@
+"""customer search trigram indexes
+
+Índices GIN com `gin_trgm_ops` em `name` e `email` para a busca de
+clientes (`GET /customers/search`). Atendem tanto `ILIKE 'prefixo%'` quanto
+o operador de similaridade `%` do `pg_trgm`. Em outros bancos (SQLite nos
+testes) a revisão não cria nada.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'ix_customers_name_trgm',
+        'customers',
+        ['name'],
+        postgresql_using='gin',
+        postgresql_ops={'name': 'gin_trgm_ops'},
+    )
+    op.create_index(
+        'ix_customers_email_trgm',
+        'customers',
+        ['email'],
+        postgresql_using='gin',
+        postgresql_ops={'email': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('ix_customers_email_trgm', table_name='customers')
+    op.drop_index('ix_customers_name_trgm', table_name='customers')
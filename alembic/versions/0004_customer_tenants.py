@@ -0,0 +1,198 @@
+"""customer tenants
+
+Adiciona a unidade (`tenant_id`) aos clientes. E-mail e CPF passam a ser
+únicos por tenant e os clientes existentes ficam no tenant `default`.
+
+No Postgres a tabela `customers` é recriada particionada por hash de
+`tenant_id` (`PARTITIONS` partições): consultas e exportações de uma
+unidade (`WHERE tenant_id = ...`) leem apenas a sua partição. A chave
+primária passa a ser `(tenant_id, id)`, com os IDs ainda vindos da mesma
+sequência. Como `customers.id` deixa de ser único sozinho, a chave
+estrangeira de `tokens.user_id` é removida.
+
+Em outros bancos (SQLite nos testes) apenas a coluna e os índices são
+alterados.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS = 16
+
+COLUMNS = 'id, tenant_id, name, email, cpf, hashed_password'
+
+
+def _create_tenant_indexes() -> None:
+    op.create_index(
+        'ix_customers_tenant_email',
+        'customers',
+        ['tenant_id', 'email'],
+        unique=True,
+    )
+    op.create_index(
+        'ix_customers_tenant_email_lower',
+        'customers',
+        ['tenant_id', sa.text('lower(email)')],
+        postgresql_include=[
+            'id', 'name', 'email', 'cpf', 'hashed_password'
+        ],
+    )
+    op.create_index(
+        'ix_customers_tenant_cpf',
+        'customers',
+        ['tenant_id', 'cpf'],
+        unique=True,
+        postgresql_include=['id', 'name', 'email'],
+    )
+
+
+def _drop_tenant_indexes() -> None:
+    op.drop_index('ix_customers_tenant_cpf', table_name='customers')
+    op.drop_index('ix_customers_tenant_email_lower', table_name='customers')
+    op.drop_index('ix_customers_tenant_email', table_name='customers')
+
+
+def _create_global_indexes() -> None:
+    op.create_index(
+        'ix_customers_email', 'customers', ['email'], unique=True
+    )
+    op.create_index(
+        'ix_customers_email_lower',
+        'customers',
+        [sa.text('lower(email)')],
+        postgresql_include=[
+            'id', 'name', 'email', 'cpf', 'hashed_password'
+        ],
+    )
+    op.create_index(
+        'ix_customers_cpf_covering',
+        'customers',
+        ['cpf'],
+        unique=True,
+        postgresql_include=['id', 'name', 'email'],
+    )
+
+
+def _drop_global_indexes() -> None:
+    op.drop_index('ix_customers_cpf_covering', table_name='customers')
+    op.drop_index('ix_customers_email_lower', table_name='customers')
+    op.drop_index('ix_customers_email', table_name='customers')
+
+
+def _create_search_indexes() -> None:
+    for column in ('name', 'email'):
+        op.create_index(
+            f'ix_customers_{column}_trgm',
+            'customers',
+            [column],
+            postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'},
+        )
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        _drop_global_indexes()
+        op.add_column('customers', sa.Column(
+            'tenant_id', sa.String(), nullable=False,
+            server_default='default',
+        ))
+        _create_tenant_indexes()
+        return
+
+    op.execute(
+        'ALTER TABLE tokens DROP CONSTRAINT IF EXISTS tokens_user_id_fkey'
+    )
+
+    # A tabela atual é renomeada e os seus índices removidos para liberar
+    # os nomes usados na tabela particionada
+    _drop_global_indexes()
+    op.drop_index('ix_customers_email_trgm', table_name='customers')
+    op.drop_index('ix_customers_name_trgm', table_name='customers')
+    op.drop_index('ix_customers_id', table_name='customers')
+    op.execute('ALTER TABLE customers RENAME TO customers_unpartitioned')
+    op.execute(
+        'ALTER TABLE customers_unpartitioned '
+        'RENAME CONSTRAINT customers_pkey TO customers_unpartitioned_pkey'
+    )
+
+    op.execute(
+        "CREATE TABLE customers ("
+        "id INTEGER NOT NULL DEFAULT nextval('customers_id_seq'), "
+        "tenant_id VARCHAR NOT NULL DEFAULT 'default', "
+        "name VARCHAR, email VARCHAR, cpf VARCHAR, hashed_password VARCHAR, "
+        "CONSTRAINT customers_pkey PRIMARY KEY (tenant_id, id)"
+        ") PARTITION BY HASH (tenant_id)"
+    )
+    for remainder in range(PARTITIONS):
+        op.execute(
+            f'CREATE TABLE customers_p{remainder} PARTITION OF customers '
+            f'FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})'
+        )
+
+    op.execute(
+        f'INSERT INTO customers ({COLUMNS}) '
+        f"SELECT id, 'default', name, email, cpf, hashed_password "
+        f'FROM customers_unpartitioned'
+    )
+    # A sequência passa a pertencer à nova tabela antes do DROP da antiga
+    op.execute('ALTER SEQUENCE customers_id_seq OWNED BY customers.id')
+    op.execute('DROP TABLE customers_unpartitioned')
+
+    op.create_index('ix_customers_id', 'customers', ['id'])
+    _create_tenant_indexes()
+    _create_search_indexes()
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        _drop_tenant_indexes()
+        with op.batch_alter_table('customers') as batch_op:
+            batch_op.drop_column('tenant_id')
+        _create_global_indexes()
+        return
+
+    # Falha se o mesmo e-mail ou CPF existir em mais de um tenant
+    op.execute('ALTER TABLE customers RENAME TO customers_partitioned')
+    op.execute(
+        'ALTER TABLE customers_partitioned '
+        'RENAME CONSTRAINT customers_pkey TO customers_partitioned_pkey'
+    )
+    for name in ('ix_customers_id', 'ix_customers_tenant_email',
+                 'ix_customers_tenant_email_lower', 'ix_customers_tenant_cpf',
+                 'ix_customers_name_trgm', 'ix_customers_email_trgm'):
+        op.drop_index(name, table_name='customers_partitioned')
+
+    op.execute(
+        "CREATE TABLE customers ("
+        "id INTEGER NOT NULL DEFAULT nextval('customers_id_seq'), "
+        "name VARCHAR, email VARCHAR, cpf VARCHAR, hashed_password VARCHAR, "
+        "CONSTRAINT customers_pkey PRIMARY KEY (id))"
+    )
+    op.execute(
+        'INSERT INTO customers (id, name, email, cpf, hashed_password) '
+        'SELECT id, name, email, cpf, hashed_password '
+        'FROM customers_partitioned'
+    )
+    op.execute('ALTER SEQUENCE customers_id_seq OWNED BY customers.id')
+    op.execute('DROP TABLE customers_partitioned')
+
+    op.create_index('ix_customers_id', 'customers', ['id'])
+    _create_global_indexes()
+    _create_search_indexes()
+    op.create_foreign_key(
+        'tokens_user_id_fkey', 'tokens', 'customers', ['user_id'], ['id']
+    )
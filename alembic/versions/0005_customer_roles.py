@@ -0,0 +1,69 @@
+"""customer roles
+
+Adiciona o papel (`role`) dos clientes, emitido nos tokens junto com os
+escopos, para que a autorização não precise consultar o banco. Os clientes
+existentes ficam com `customer`; se `ADMIN_EMAIL` estiver definido, o
+administrador do tenant padrão recebe `admin`.
+
+No Postgres, o índice do login passa a cobrir também `role`, mantendo o
+index-only scan.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LOGIN_INCLUDE = ['id', 'name', 'email', 'cpf', 'hashed_password']
+
+
+def _create_login_index(include: list) -> None:
+    op.create_index(
+        'ix_customers_tenant_email_lower',
+        'customers',
+        ['tenant_id', sa.text('lower(email)')],
+        postgresql_include=include,
+    )
+
+
+def upgrade() -> None:
+    op.add_column('customers', sa.Column(
+        'role', sa.String(), nullable=False, server_default='customer',
+    ))
+
+    admin_email = os.getenv('ADMIN_EMAIL')
+    if admin_email:
+        op.get_bind().execute(
+            sa.text(
+                "UPDATE customers SET role = 'admin' "
+                "WHERE tenant_id = 'default' AND lower(email) = :email"
+            ),
+            {'email': admin_email.strip().lower()},
+        )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index(
+            'ix_customers_tenant_email_lower', table_name='customers'
+        )
+        _create_login_index(LOGIN_INCLUDE + ['role'])
+
+
+def downgrade() -> None:
+    # O índice de expressão é removido antes do batch: no SQLite a tabela é
+    # recriada e índices sobre `lower(email)` não seriam copiados
+    op.drop_index('ix_customers_tenant_email_lower', table_name='customers')
+    with op.batch_alter_table('customers') as batch_op:
+        batch_op.drop_column('role')
+    _create_login_index(LOGIN_INCLUDE)
@@ -0,0 +1,41 @@
+"""service clients
+
+Cria a tabela `clients`, com os clientes de serviço do fluxo OAuth2
+`client_credentials`.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'clients',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('client_id', sa.String(), nullable=False),
+        sa.Column('secret_hash', sa.String(), nullable=False),
+        sa.Column('tenant_id', sa.String(), nullable=False,
+                  server_default='default'),
+        sa.Column('scope', sa.String(), nullable=False, server_default=''),
+        sa.Column('active', sa.Boolean(), nullable=False,
+                  server_default=sa.true()),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('client_id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('clients')
@@ -0,0 +1,145 @@
+"""Comandos de linha de comando do Auth Service.
+
+Tarefas pontuais (one-shot) que não devem rodar a cada inicialização de
+worker, como a criação do usuário administrador.
+
+Uso:
+    python -m app.cli create-admin
+    python -m app.cli create-client <client_id> [--scope ...] [--tenant ...]
+    python -m app.cli seed-customers <count> [--start N] [--tenant ...]
+"""
+import argparse
+import sys
+from typing import List, Optional
+
+from .database.database import SessionLocal, get_engine
+from .services.clients import register_client
+from .services.synthetic import SYNTHETIC_PASSWORD, seed_customers
+from .services.tenancy import DEFAULT_TENANT
+from .services.repository import create_admin_user
+from .tools.logging import logger
+
+
+def init_admin_user() -> None:
+    """Inicializa o usuário admin.
+
+    Cria o usuário administrador a partir das variáveis de ambiente
+    `ADMIN_EMAIL`, `ADMIN_PASSWORD`, `ADMIN_CPF` e `ADMIN_NAME`, caso ele
+    ainda não exista.
+
+    Returns:
+        None
+    """
+    db = SessionLocal(bind=get_engine())
+    try:
+        create_admin_user(db)
+    finally:
+        db.close()
+
+
+def _create_admin(args: argparse.Namespace) -> int:
+    logger.info('Executando bootstrap do usuário administrador')
+    init_admin_user()
+    return 0
+
+
+def _create_client(args: argparse.Namespace) -> int:
+    logger.info(f'Registrando o cliente de serviço {args.client_id}')
+    db = SessionLocal(bind=get_engine())
+    try:
+        secret = register_client(
+            db, args.client_id, scope=' '.join(args.scope),
+            tenant_id=args.tenant
+        )
+    finally:
+        db.close()
+    # O segredo não é recuperável depois: é exibido uma única vez
+    print(f'client_id={args.client_id}')
+    print(f'client_secret={secret}')
+    return 0
+
+
+def _seed_customers(args: argparse.Namespace) -> int:
+    logger.info(
+        f'Carregando {args.count} clientes sintéticos no tenant '
+        f'{args.tenant}'
+    )
+    loaded = seed_customers(
+        get_engine(), args.count, start=args.start, tenant_id=args.tenant,
+        password=args.password, batch_size=args.batch_size
+    )
+    print(f'customers={loaded}')
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Monta o parser de argumentos com os subcomandos disponíveis.
+
+    Returns:
+        argparse.ArgumentParser: O parser configurado.
+    """
+    parser = argparse.ArgumentParser(
+        prog='auth-service', description='Comandos do Auth Service'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    create_admin = subparsers.add_parser(
+        'create-admin', help='Cria o usuário administrador, se necessário'
+    )
+    create_admin.set_defaults(handler=_create_admin)
+
+    create_client = subparsers.add_parser(
+        'create-client',
+        help='Registra um cliente de serviço (client_credentials)'
+    )
+    create_client.add_argument('client_id')
+    create_client.add_argument(
+        '--scope', nargs='*', default=[],
+        help='Escopos permitidos ao cliente'
+    )
+    create_client.add_argument(
+        '--tenant', default=DEFAULT_TENANT, help='Tenant do cliente'
+    )
+    create_client.set_defaults(handler=_create_client)
+
+    seed = subparsers.add_parser(
+        'seed-customers',
+        help='Carrega clientes sintéticos para testes de escala'
+    )
+    seed.add_argument('count', type=int)
+    seed.add_argument(
+        '--start', type=int, default=0,
+        help='Primeiro índice (e-mail cliente<N>@example.com)'
+    )
+    seed.add_argument(
+        '--tenant', default=DEFAULT_TENANT, help='Tenant dos clientes'
+    )
+    seed.add_argument(
+        '--password', default=SYNTHETIC_PASSWORD,
+        help='Senha de todos os clientes'
+    )
+    seed.add_argument(
+        '--batch-size', type=int, default=10000,
+        help='Linhas por lote (COPY no Postgres, executemany nos demais)'
+    )
+    seed.set_defaults(handler=_seed_customers)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Ponto de entrada da CLI.
+
+    Args:
+        argv (Optional[List[str]]): Argumentos da linha de comando; usa
+        `sys.argv` quando omitido.
+
+    Returns:
+        int: Código de saída do processo.
+    """
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
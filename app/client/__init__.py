@@ -0,0 +1,3 @@
+from .client import AsyncAuthClient, AuthClient, AuthError, AuthServiceError
+
+__all__ = ['AsyncAuthClient', 'AuthClient', 'AuthError', 'AuthServiceError']
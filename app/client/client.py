@@ -0,0 +1,332 @@
+"""Cliente do Auth Service para os serviços consumidores.
+
+A validação acontece em dois níveis:
+
+1. Local: o token é decodificado sem rede. Tokens expirados ou malformados
+   são rejeitados de imediato; com a `secret_key` configurada, a assinatura
+   também é verificada (`verify`).
+2. Remoto: `GET /auth` confirma que o cliente ainda existe e retorna os seus
+   dados. A resposta fica em cache até o `exp` do token, e validações
+   simultâneas do mesmo token compartilham uma única requisição.
+
+As requisições usam um pool de conexões HTTP/1.1 com keep-alive.
+
+Este módulo não depende do restante da aplicação (banco, logging), para que
+possa ser importado pelos consumidores.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from jose import JWTError, jwt
+
+DEFAULT_ALGORITHM = 'HS256'
+
+
+class AuthError(Exception):
+    """Token inválido, expirado ou recusado pelo Auth Service.
+
+    Attributes:
+        status_code (int): Status HTTP equivalente.
+    """
+
+    def __init__(self, detail: str, status_code: int = 401) -> None:
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+class AuthServiceError(Exception):
+    """O Auth Service não respondeu ou respondeu com erro inesperado."""
+
+
+class _TokenCache:
+    """Cache LRU de respostas de `/auth`, com expiração por entrada."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: 'OrderedDict[str, Tuple[Dict[str, Any], float]]' = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._data.get(token)
+            if item is None:
+                return None
+            if item[1] <= time.time():
+                del self._data[token]
+                return None
+            self._data.move_to_end(token)
+            return item[0]
+
+    def set(self, token: str, value: Dict[str, Any],
+            expires_at: float) -> None:
+        with self._lock:
+            self._data[token] = (value, expires_at)
+            self._data.move_to_end(token)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class _BaseAuthClient:
+    def __init__(
+        self,
+        base_url: str,
+        secret_key: Optional[str] = None,
+        algorithm: str = DEFAULT_ALGORITHM,
+        cache_size: int = 10000,
+        max_cache_ttl: float = 300.0,
+        leeway: float = 0.0,
+    ) -> None:
+        self.base_url = base_url.rstrip('/')
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.max_cache_ttl = max_cache_ttl
+        self.leeway = leeway
+        self.cache = _TokenCache(cache_size)
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Verifica o token localmente, sem acessar a rede.
+
+        Args:
+            token (str): O token JWT.
+
+        Raises:
+            AuthError: Se a assinatura for inválida ou o token estiver
+            expirado.
+            RuntimeError: Se o cliente não tiver a `secret_key`.
+
+        Returns:
+            Dict[str, Any]: As claims do token.
+        """
+        if not self.secret_key:
+            raise RuntimeError('verify() requer a secret_key do Auth Service')
+        try:
+            return jwt.decode(
+                token, self.secret_key, algorithms=[self.algorithm],
+                options={'leeway': self.leeway}
+            )
+        except JWTError as e:
+            raise AuthError(f'Token inválido: {e}')
+
+    def _precheck(self, token: str) -> float:
+        """Primeiro nível: valida o token localmente e retorna o `exp`."""
+        if self.secret_key:
+            claims = self.verify(token)
+        else:
+            try:
+                claims = jwt.get_unverified_claims(token)
+            except JWTError as e:
+                raise AuthError(f'Token malformado: {e}')
+        exp = claims.get('exp')
+        if exp is None:
+            raise AuthError('Token sem expiração')
+        exp = float(exp)
+        if exp + self.leeway <= time.time():
+            raise AuthError('Token expirado')
+        return exp
+
+    def _cache_until(self, exp: float) -> float:
+        return min(exp, time.time() + self.max_cache_ttl)
+
+    @staticmethod
+    def _handle_response(response: httpx.Response) -> Dict[str, Any]:
+        if response.status_code == 200:
+            return response.json()
+        if response.status_code in (400, 401, 403):
+            raise AuthError(
+                'Token recusado pelo Auth Service', response.status_code
+            )
+        raise AuthServiceError(
+            f'Resposta inesperada do Auth Service: {response.status_code}'
+        )
+
+    @staticmethod
+    def _limits(max_connections: int) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=60.0,
+        )
+
+
+class AuthClient(_BaseAuthClient):
+    """Cliente síncrono e thread-safe do Auth Service.
+
+    Example:
+        >>> client = AuthClient('http://auth-service')
+        >>> customer = client.validate(token)
+    """
+
+    def __init__(self, base_url: str, *, timeout: float = 5.0,
+                 max_connections: int = 20,
+                 transport: Optional[httpx.BaseTransport] = None,
+                 **kwargs) -> None:
+        super().__init__(base_url, **kwargs)
+        self.http = httpx.Client(
+            base_url=self.base_url, timeout=timeout,
+            limits=self._limits(max_connections), transport=transport,
+        )
+        self._inflight: Dict[str, '_Call'] = {}
+        self._lock = threading.Lock()
+
+    def validate(self, token: str) -> Dict[str, Any]:
+        """Valida o token e retorna os dados do cliente autenticado.
+
+        Args:
+            token (str): O token JWT.
+
+        Raises:
+            AuthError: Se o token for inválido, expirado ou recusado.
+            AuthServiceError: Se o Auth Service estiver indisponível.
+
+        Returns:
+            Dict[str, Any]: Os dados do cliente retornados por `GET /auth`.
+        """
+        exp = self._precheck(token)
+        cached = self.cache.get(token)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            call = self._inflight.get(token)
+            leader = call is None
+            if leader:
+                call = self._inflight[token] = _Call()
+
+        if not leader:
+            return call.wait()
+
+        try:
+            customer = self._fetch(token)
+            self.cache.set(token, customer, self._cache_until(exp))
+            call.resolve(customer)
+            return customer
+        except Exception as e:
+            call.reject(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(token, None)
+
+    def _fetch(self, token: str) -> Dict[str, Any]:
+        try:
+            response = self.http.get(
+                '/auth', headers={'Authorization': f'Bearer {token}'}
+            )
+        except httpx.HTTPError as e:
+            raise AuthServiceError(f'Auth Service indisponível: {e}') from e
+        return self._handle_response(response)
+
+    def close(self) -> None:
+        """Fecha o pool de conexões."""
+        self.http.close()
+
+    def __enter__(self) -> 'AuthClient':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class _Call:
+    """Resultado compartilhado de uma validação em andamento."""
+
+    def __init__(self) -> None:
+        self._done = threading.Event()
+        self._result: Optional[Dict[str, Any]] = None
+        self._error: Optional[BaseException] = None
+
+    def resolve(self, result: Dict[str, Any]) -> None:
+        self._result = result
+        self._done.set()
+
+    def reject(self, error: BaseException) -> None:
+        self._error = error
+        self._done.set()
+
+    def wait(self) -> Dict[str, Any]:
+        self._done.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class AsyncAuthClient(_BaseAuthClient):
+    """Cliente assíncrono do Auth Service, para consumidores asyncio.
+
+    Example:
+        >>> client = AsyncAuthClient('http://auth-service')
+        >>> customer = await client.validate(token)
+    """
+
+    def __init__(self, base_url: str, *, timeout: float = 5.0,
+                 max_connections: int = 20,
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 **kwargs) -> None:
+        super().__init__(base_url, **kwargs)
+        self.http = httpx.AsyncClient(
+            base_url=self.base_url, timeout=timeout,
+            limits=self._limits(max_connections), transport=transport,
+        )
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def validate(self, token: str) -> Dict[str, Any]:
+        """Valida o token e retorna os dados do cliente autenticado.
+
+        Veja `AuthClient.validate`.
+        """
+        exp = self._precheck(token)
+        cached = self.cache.get(token)
+        if cached is not None:
+            return cached
+
+        future = self._inflight.get(token)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[token] = future
+        try:
+            customer = await self._fetch(token)
+            self.cache.set(token, customer, self._cache_until(exp))
+            future.set_result(customer)
+            return customer
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Evita o aviso de exceção não consumida quando não há seguidores
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(token, None)
+
+    async def _fetch(self, token: str) -> Dict[str, Any]:
+        try:
+            response = await self.http.get(
+                '/auth', headers={'Authorization': f'Bearer {token}'}
+            )
+        except httpx.HTTPError as e:
+            raise AuthServiceError(f'Auth Service indisponível: {e}') from e
+        return self._handle_response(response)
+
+    async def aclose(self) -> None:
+        """Fecha o pool de conexões."""
+        await self.http.aclose()
+
+    async def __aenter__(self) -> 'AsyncAuthClient':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
@@ -1,29 +1,75 @@
+import threading
 from os import environ as env
-from typing import Generator
+from typing import Generator, Optional
 
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
+from . import query_stats
+from .pool_stats import TimedQueuePool
+from ..tools import tracing
+
 load_dotenv()
 
 SQLALCHEMY_DATABASE_URL: str = env.get('DATABASE_URL', '')
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# A engine é criada sob demanda (ver `get_engine`): importar a aplicação não
+# abre conexões nem carrega o driver do banco.
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
 Base = declarative_base()
 
+# Contagem de consultas por requisição (ver `QueryStatsMiddleware`)
+query_stats.install()
+tracing.instrument_sqlalchemy()
+
+
+def get_engine() -> Engine:
+    """Retorna a engine do banco de dados, criando-a no primeiro uso.
+
+    Fora do SQLite o pool mede a espera por conexões (ver `pool_stats`).
+
+    Returns:
+        Engine: A engine compartilhada pelo processo.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                options = {}
+                url = make_url(SQLALCHEMY_DATABASE_URL)
+                if url.get_backend_name() != 'sqlite':
+                    options['poolclass'] = TimedQueuePool
+                _engine = create_engine(url, **options)
+                SessionLocal.configure(bind=_engine)
+    return _engine
+
+
+def dispose_engine() -> None:
+    """Fecha as conexões do pool e descarta a engine, se existir."""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+
+
 def get_db() -> Generator[Session, None, None]:
-    """Cria uma sessão de banco de dados e garante que ela seja fechada ao final.
+    """Cria uma sessão de banco de dados e garante que ela seja fechada ao
+    final.
 
-    Esta função é usada como uma dependência em frameworks como FastAPI para garantir
-    que cada requisição tenha sua própria sessão de banco de dados.
+    Esta função é usada como uma dependência em frameworks como FastAPI para
+    garantir que cada requisição tenha sua própria sessão de banco de dados.
 
     Yields:
         Generator[Session, None, None]: Uma sessão de banco de dados.
     """
-    db = SessionLocal()
+    db = SessionLocal(bind=get_engine())
     try:
         yield db
     finally:
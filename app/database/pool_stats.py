@@ -0,0 +1,46 @@
+"""Tempo de espera por conexões do pool.
+
+`TimedQueuePool` mede quanto cada checkout aguardou por uma conexão livre.
+Com o pool dimensionado corretamente a espera é praticamente zero; quando
+ela cresce, as requisições estão enfileiradas atrás do banco (ver
+`/metrics`).
+"""
+import threading
+import time
+from typing import Tuple
+
+from sqlalchemy.pool import QueuePool
+
+
+class PoolWaitStats:
+    """Soma e contagem das esperas por conexão (um `summary` Prometheus)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._count = 0
+        self._total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Registra a espera de um checkout."""
+        with self._lock:
+            self._count += 1
+            self._total += seconds
+
+    def snapshot(self) -> Tuple[int, float]:
+        """Retorna o número de checkouts e o tempo total de espera."""
+        with self._lock:
+            return self._count, self._total
+
+
+pool_wait = PoolWaitStats()
+
+
+class TimedQueuePool(QueuePool):
+    """`QueuePool` que registra a espera de cada checkout em `pool_wait`."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_wait.observe(time.perf_counter() - started)
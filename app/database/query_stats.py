@@ -0,0 +1,111 @@
+"""Contagem de consultas SQL e tempo de banco por requisição.
+
+Os eventos `before_cursor_execute`/`after_cursor_execute` de todas as
+engines registram cada comando executado no `QueryStats` ativo no contexto
+atual (ver `track_queries`). Fora de uma medição o custo por comando é uma
+leitura de `ContextVar`.
+"""
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_START_KEY = 'query_stats_start'
+
+
+class QueryStats:
+    """Comandos SQL executados durante uma medição.
+
+    Attributes:
+        count (int): O número de comandos executados.
+        duration (float): O tempo total gasto no banco, em segundos.
+        statements (Counter): Quantas vezes cada comando foi executado.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        """Registra a execução de um comando."""
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Retorna os comandos executados pelo menos `threshold` vezes.
+
+        O mesmo comando repetido muitas vezes em uma requisição é o sintoma
+        típico de N+1 (uma consulta por item de uma lista).
+
+        Args:
+            threshold (int): O número mínimo de repetições.
+
+        Returns:
+            List[Tuple[str, int]]: Os comandos e as suas contagens.
+        """
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar(
+    'query_stats', default=None
+)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Mede os comandos SQL executados no contexto atual.
+
+    Tarefas e threads criados dentro do bloco (como os endpoints síncronos
+    do FastAPI) herdam o contexto e também são contabilizados.
+
+    Yields:
+        QueryStats: As estatísticas da medição.
+    """
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def current_stats() -> Optional[QueryStats]:
+    """Retorna as estatísticas ativas no contexto atual, se houver."""
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany) -> None:
+    stats = _current.get()
+    starts = conn.info.get(_START_KEY)
+    if stats is None or not starts:
+        return
+    stats.record(statement, time.perf_counter() - starts.pop())
+
+
+def install(target=Engine) -> None:
+    """Registra os eventos de medição (por padrão, em todas as engines).
+
+    Args:
+        target: A engine, ou a classe `Engine`, a instrumentar.
+    """
+    if not event.contains(target, 'before_cursor_execute',
+                          _before_cursor_execute):
+        event.listen(target, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(target, 'after_cursor_execute', _after_cursor_execute)
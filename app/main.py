@@ -1,6 +1,9 @@
+import asyncio
+from os import environ as env
+
 import uvicorn
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.middleware.cors import CORSMiddleware
@@ -12,39 +15,47 @@ from starlette.status import (
 from contextlib import asynccontextmanager
 from fastapi.responses import HTMLResponse
 
-from .middleware.middleware import ExceptionLoggingMiddleware
-from .routers import auth, customer
+from .middleware.middleware import (
+    AdmissionMiddleware,
+    ExceptionLoggingMiddleware,
+    QueryStatsMiddleware,
+    TracingMiddleware,
+)
+from .routers import auth, customer, debug
+from .services import health, idempotency, lifecycle, metrics
 from .tools.logging import logger
-from .services.repository import create_admin_user
-from .database.database import Base, SessionLocal, engine
-
-Base.metadata.create_all(bind=engine)
-
+from .tools.responses import ORJSONResponse
 
-def init_admin_user() -> None:
-    """Inicializa o usuário admin e configura o banco de dados.
-
-    Cria um usuário administrador e inicializa o banco de dados com dados
-    padrão.
-
-    Returns:
-        None
-    """
-    db = SessionLocal()
-    try:
-        create_admin_user(db)
-    finally:
-        db.close()
+# Modo de inicialização dos workers:
+# - `lean` (padrão): nenhuma tarefa síncrona no startup. O schema é aplicado
+#   pelo Alembic e o admin é criado pelo comando `python -m app.cli
+#   create-admin`, ambos uma única vez antes de subir os workers.
+# - `bootstrap`: cria o admin ao iniciar, fora do event loop. Útil apenas
+#   em desenvolvimento local com um único processo.
+STARTUP_MODE: str = env.get('STARTUP_MODE', 'lean').lower()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Executa tarefas antes de iniciar a API"""
-    init_admin_user()
+    if STARTUP_MODE == 'bootstrap':
+        from .cli import init_admin_user
+        await asyncio.to_thread(init_admin_user)
+    # Cria o backend de idempotência já no startup (e avisa se for local)
+    await asyncio.to_thread(idempotency.get_store)
+    # No pre-fork, cada worker publica a sua amostra para o `/metrics`
+    publisher = (
+        asyncio.create_task(metrics.publish_periodically())
+        if metrics.multiprocess_dir() else None
+    )
     yield
-    print("Aplicação encerrando...")
+    if publisher is not None:
+        publisher.cancel()
+    # Executado depois que o uvicorn drenou as requisições em andamento
+    logger.info('Aplicação encerrando...')
+    await asyncio.to_thread(lifecycle.shutdown_resources, 5.0)
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 logger.info('Application startup')
 
 # Configuração do CORS
@@ -68,8 +79,12 @@ app.add_middleware(
 
 # Incluindo os roteadores
 app.add_middleware(ExceptionLoggingMiddleware)
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(TracingMiddleware)
 app.include_router(auth.router, tags=['authentication'])
 app.include_router(customer.router, prefix='/customers', tags=['customers'])
+app.include_router(debug.router, prefix='/debug', tags=['debug'])
 
 
 STATUS_CODE = "status code"
@@ -99,6 +114,7 @@ async def http_exception_handler(request, exc):
             STATUS_CODE: exc.status_code,
             "msg": exc.detail,
         },
+        headers=getattr(exc, "headers", None),
     )
 
 
@@ -128,6 +144,53 @@ def health_check() -> dict:
     return {'status': 'Operational'}
 
 
+@app.get('/livez', tags=['health'])
+async def liveness_check() -> dict:
+    """Indica que o processo está vivo e o event loop responde.
+
+    Não consulta dependências: uma falha do banco não deve reiniciar o pod.
+
+    Returns:
+        dict: Um dicionário com o status do processo.
+    """
+    return {'status': 'alive'}
+
+
+@app.get('/readyz', tags=['health'])
+async def readiness_check() -> JSONResponse:
+    """Indica se o worker deve receber tráfego.
+
+    Verifica a conexão com o banco (em cache por alguns segundos), a
+    saturação do pool de conexões e a fila do bcrypt. Durante a drenagem
+    do shutdown responde sempre 503.
+
+    Returns:
+        JSONResponse: 200 se pronto, 503 caso contrário, com os detalhes
+        de cada verificação.
+    """
+    ready, checks = await health.get_probe().check(
+        draining=lifecycle.is_draining()
+    )
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={'status': 'ready' if ready else 'unavailable', **checks},
+    )
+
+
+@app.get('/metrics', include_in_schema=False)
+async def metrics_endpoint() -> PlainTextResponse:
+    """Expõe os sinais de escalonamento no formato do Prometheus.
+
+    Fila do bcrypt, threadpool, pool de conexões e requisições por classe
+    de endpoint, somados entre os workers do pod (ver `services.metrics`),
+    usados pelo HPA/KEDA.
+    """
+    collected = await metrics.collect()
+    return PlainTextResponse(
+        metrics.render(collected), media_type=metrics.CONTENT_TYPE
+    )
+
+
 @app.get('/redoc', include_in_schema=False, tags=['documentation'])
 async def redoc() -> HTMLResponse:
     """Retorna o HTML para a documentação do ReDoc.
@@ -1,3 +1,13 @@
-from .middleware import ExceptionLoggingMiddleware
+from .middleware import (
+    AdmissionMiddleware,
+    ExceptionLoggingMiddleware,
+    QueryStatsMiddleware,
+    TracingMiddleware,
+)
 
-__all__ = ['ExceptionLoggingMiddleware']
+__all__ = [
+    'AdmissionMiddleware',
+    'ExceptionLoggingMiddleware',
+    'QueryStatsMiddleware',
+    'TracingMiddleware',
+]
@@ -1,5 +1,13 @@
+import time
+from os import environ as env
+from typing import Optional
+
 from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
+from ..database import query_stats
+from ..services import admission
+from ..tools import tracing
 from ..tools.logging import logger
 
 
@@ -39,3 +47,158 @@ class ExceptionLoggingMiddleware(BaseHTTPMiddleware):
             logger.error(f'Erro Não Tratado: {e}', exc_info=True)
             raise HTTPException(status_code=500,
                                 detail='Internal Server Error')
+
+
+class QueryStatsMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware que mede as consultas SQL de cada requisição.
+
+    Adiciona à resposta o cabeçalho `Server-Timing` com o número de
+    comandos e o tempo gasto no banco (`db`) e o tempo total da requisição
+    (`app`). Um mesmo comando repetido `QUERY_REPEAT_THRESHOLD` vezes ou
+    mais (padrão 5) é registrado como suspeita de N+1.
+
+    Atributos:
+        repeat_threshold (int): Repetições que disparam o alerta de N+1.
+    """
+
+    def __init__(self, app, repeat_threshold: Optional[int] = None) -> None:
+        super().__init__(app)
+        if repeat_threshold is None:
+            repeat_threshold = int(env.get('QUERY_REPEAT_THRESHOLD', '5'))
+        self.repeat_threshold = repeat_threshold
+
+    async def dispatch(self, request: Request, call_next):
+        """
+        Executa a requisição medindo as consultas e anota a resposta.
+
+        Args:
+            request: A requisição atual.
+            call_next: Função que chama o próximo middleware ou endpoint.
+
+        Returns:
+            A resposta da aplicação com o cabeçalho `Server-Timing`.
+        """
+        started = time.perf_counter()
+        with query_stats.track_queries() as stats:
+            response = await call_next(request)
+        elapsed = time.perf_counter() - started
+
+        for statement, count in stats.repeated(self.repeat_threshold):
+            logger.warning(
+                f'Possível N+1 em {request.method} {request.url.path}: '
+                f'{count} execuções de {statement!r}'
+            )
+        response.headers.append(
+            'Server-Timing',
+            f'db;dur={stats.duration * 1000:.2f};desc="{stats.count} '
+            f'queries", app;dur={elapsed * 1000:.2f}'
+        )
+        return response
+
+
+class TracingMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware que abre o span de servidor de cada requisição.
+
+    Continua o trace recebido no cabeçalho W3C `traceparent`, quando
+    presente; os spans dos handlers, da segurança e do repositório são
+    registrados como filhos deste span. Com o tracing desligado a
+    requisição segue sem custo adicional.
+
+    Atributos:
+        Nenhum.
+    """
+
+    async def dispatch(self, request: Request, call_next):  # noqa PLR6301
+        """
+        Executa a requisição dentro de um span `server`.
+
+        Args:
+            request: A requisição atual.
+            call_next: Função que chama o próximo middleware ou endpoint.
+
+        Returns:
+            A resposta da aplicação.
+        """
+        tracer = tracing.get_tracer()
+        if not tracer.enabled:
+            return await call_next(request)
+
+        parent = tracing.parse_traceparent(request.headers.get('traceparent'))
+        with tracer.start_span(
+            request.method, kind='server', parent=parent, attributes={
+                'http.request.method': request.method,
+                'url.path': request.url.path,
+            }
+        ) as span:
+            response = await call_next(request)
+            route = request.scope.get('route')
+            if route is not None:
+                span.name = f'{request.method} {route.path}'
+                span.set_attribute('http.route', route.path)
+            span.set_attribute(
+                'http.response.status_code', response.status_code
+            )
+            if response.status_code >= 500:
+                span.error = f'HTTP {response.status_code}'
+        return response
+
+
+class AdmissionMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware que aplica o controle de admissão por classe de endpoint.
+
+    Requisições recusadas recebem 429 ou 503 com `Retry-After`, sem chegar
+    aos handlers, ao banco ou ao bcrypt.
+
+    Atributos:
+        controller (AdmissionController): Os limitadores por classe, ou
+        None se o controle estiver desabilitado.
+    """
+
+    def __init__(self, app,
+                 controller: Optional[admission.AdmissionController] = None
+                 ) -> None:
+        super().__init__(app)
+        self.controller = controller or admission.get_controller()
+
+    async def dispatch(self, request: Request, call_next):
+        """
+        Executa a requisição ocupando uma vaga da sua classe.
+
+        Args:
+            request: A requisição atual.
+            call_next: Função que chama o próximo middleware ou endpoint.
+
+        Returns:
+            A resposta da aplicação, ou a recusa do controle de admissão.
+        """
+        limiter = None
+        if self.controller is not None:
+            limiter = self.controller.limiter_for(
+                request.method, request.url.path
+            )
+        if limiter is None:
+            return await call_next(request)
+
+        try:
+            await limiter.acquire()
+        except admission.AdmissionRejected as e:
+            logger.warning(
+                f'Requisição recusada ({limiter.name}): {e.detail}'
+            )
+            return JSONResponse(
+                status_code=e.status_code,
+                content={'status code': e.status_code, 'msg': e.detail},
+                headers={'Retry-After': str(e.retry_after)},
+            )
+
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = await call_next(request)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            limiter.release(time.perf_counter() - started, failed)
@@ -1,4 +1,6 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String
+from sqlalchemy import (
+    Boolean, Column, Index, Integer, String, func, true
+)
 from sqlalchemy.orm import relationship
 
 from ..database.database import Base
@@ -8,12 +10,19 @@ class Customer(Base):
     """
     Representa um Cliente na Base de Dados.
 
+    No Postgres a tabela é particionada por hash de `tenant_id` (migração
+    `0004_customer_tenants`), com chave primária `(tenant_id, id)`; os IDs
+    continuam vindo de uma única sequência e são únicos entre os tenants.
+
     Attributes:
         id (int): Identificador único do cliente.
+        tenant_id (str): Unidade (restaurante) à qual o cliente pertence.
         name (str): Nome do cliente.
         email (str): Email do cliente.
         cpf (str): CPF do cliente.
         hashed_password (str): Senha do cliente criptografada.
+        role (str): Papel do cliente (`customer`, `service` ou `admin`),
+        emitido nos tokens junto com os escopos correspondentes.
         orders (relationship): Relacionamento com pedidos associados ao
         cliente.
     """
@@ -21,10 +30,54 @@ class Customer(Base):
     __tablename__ = 'customers'
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
-    email = Column(String, unique=True, index=True)
-    cpf = Column(String, unique=True, index=True)
+    tenant_id = Column(String, nullable=False, server_default='default')
+    name = Column(String)
+    email = Column(String)
+    cpf = Column(String)
     hashed_password = Column(String)
+    role = Column(String, nullable=False, server_default='customer')
+
+
+# Índices espelhados nas migrações `0002_customer_lookup_indexes`,
+# `0004_customer_tenants` e `0005_customer_roles`: o login consulta
+# `lower(email)` e a identificação consulta `cpf`, sempre dentro de um
+# tenant; e-mail e CPF são únicos por tenant. As colunas em
+# `postgresql_include` permitem index-only scans no Postgres.
+Index(
+    'ix_customers_tenant_email',
+    Customer.tenant_id,
+    Customer.email,
+    unique=True,
+)
+Index(
+    'ix_customers_tenant_email_lower',
+    Customer.tenant_id,
+    func.lower(Customer.email),
+    postgresql_include=[
+        'id', 'name', 'email', 'cpf', 'hashed_password', 'role'
+    ],
+)
+Index(
+    'ix_customers_tenant_cpf',
+    Customer.tenant_id,
+    Customer.cpf,
+    unique=True,
+    postgresql_include=['id', 'name', 'email'],
+)
+
+# Índices de trigramas da busca (`0003_customer_search_trgm`), só no Postgres
+Index(
+    'ix_customers_name_trgm',
+    Customer.name,
+    postgresql_using='gin',
+    postgresql_ops={'name': 'gin_trgm_ops'},
+).ddl_if(dialect='postgresql')
+Index(
+    'ix_customers_email_trgm',
+    Customer.email,
+    postgresql_using='gin',
+    postgresql_ops={'email': 'gin_trgm_ops'},
+).ddl_if(dialect='postgresql')
 
 
 class Token(Base):
@@ -44,6 +97,38 @@ class Token(Base):
     id = Column(Integer, primary_key=True, index=True)
     token = Column(String, unique=True, index=True)
     is_used = Column(Boolean, default=False)
-    user_id = Column(Integer, ForeignKey('customers.id'))
+    # Sem chave estrangeira: no Postgres a chave de `customers` é
+    # `(tenant_id, id)` (ver `0004_customer_tenants`)
+    user_id = Column(Integer)
+
+    user = relationship(
+        'Customer', primaryjoin='foreign(Token.user_id) == Customer.id'
+    )
+
+
+class Client(Base):
+    """
+    Representa um Cliente de Serviço (fluxo `client_credentials`).
+
+    O segredo é guardado como HMAC-SHA256 (ver `services.clients`): os
+    segredos são gerados aleatoriamente com alta entropia, então um hash
+    rápido com comparação em tempo constante basta, sem o custo do bcrypt.
+
+    Attributes:
+        id (int): Identificador interno.
+        client_id (str): Identificador público do cliente.
+        secret_hash (str): HMAC do segredo do cliente.
+        tenant_id (str): Tenant ao qual os tokens do cliente se restringem.
+        scope (str): Escopos que o cliente pode solicitar, separados por
+        espaço.
+        active (bool): Se o cliente pode emitir tokens.
+    """
+
+    __tablename__ = 'clients'
 
-    user = relationship('Customer')
+    id = Column(Integer, primary_key=True)
+    client_id = Column(String, nullable=False, unique=True)
+    secret_hash = Column(String, nullable=False)
+    tenant_id = Column(String, nullable=False, server_default='default')
+    scope = Column(String, nullable=False, server_default='')
+    active = Column(Boolean, nullable=False, server_default=true())
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import FrozenSet, Optional
 from pydantic import BaseModel, ConfigDict
 
 
@@ -36,14 +36,9 @@ class Customer(CustomerBase):
         id (int): Identificador único do cliente.
     """
 
-    id: int
-
-    class Tracking:
-        """
-        Configurações específicas para o modelo Pydantic `Tracking`.
-        """
+    model_config = ConfigDict(from_attributes=True)
 
-        model_config = ConfigDict(from_attributes=True)
+    id: int
 
 
 class CPFIdentify(BaseModel):
@@ -70,6 +65,64 @@ class Token(BaseModel):
     customer_id: int
 
 
+class ClientToken(BaseModel):
+    """
+    Modelo para um Token Emitido a um Cliente de Serviço.
+
+    Attributes:
+        access_token (str): Token de acesso.
+        token_type (str): Tipo do token (`bearer`).
+        expires_in (int): Segundos até a expiração do token.
+        scope (str): Escopos concedidos, separados por espaço.
+    """
+
+    access_token: str
+    token_type: str = 'bearer'
+    expires_in: int
+    scope: str
+
+
+class Introspection(BaseModel):
+    """
+    Modelo da Resposta de Introspecção de Token (RFC 7662).
+
+    Attributes:
+        active (bool): Se o token é válido e não expirou.
+        sub (Optional[str]): Identificador do cliente do token.
+        exp (Optional[int]): Expiração do token (timestamp Unix).
+        scope (Optional[str]): Escopos do token, separados por espaço.
+        tenant (Optional[str]): Tenant do cliente do token.
+    """
+
+    active: bool
+    sub: Optional[str] = None
+    exp: Optional[int] = None
+    scope: Optional[str] = None
+    tenant: Optional[str] = None
+
+
+class TokenClaims(BaseModel):
+    """
+    Modelo das Claims de um Token de Acesso Validado.
+
+    Attributes:
+        sub (str): Identificador do cliente do token.
+        tenant (str): Tenant do cliente.
+        role (str): Papel do cliente.
+        scope (str): Escopos concedidos, separados por espaço.
+    """
+
+    sub: str
+    tenant: str
+    role: str
+    scope: str = ''
+
+    @property
+    def scopes(self) -> FrozenSet[str]:
+        """Os escopos concedidos."""
+        return frozenset(self.scope.split())
+
+
 class TokenData(BaseModel):
     """
     Modelo para Dados do Token.
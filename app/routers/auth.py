@@ -1,32 +1,108 @@
-from fastapi import APIRouter, Depends, HTTPException
+import hashlib
+import time
+from os import environ as env
+from typing import Optional, Union
+
+from fastapi import APIRouter, Depends, Form, Header, HTTPException, Request
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
-from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from starlette.status import HTTP_401_UNAUTHORIZED
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import (
+    HTTPBasic, HTTPBasicCredentials, OAuth2PasswordBearer
+)
+from starlette.status import (
+    HTTP_304_NOT_MODIFIED, HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN
+)
 
 from ..database.database import get_db
 from ..models import schemas
-from ..services import security
+from ..services import clients, kdf, security, tenancy
 from ..tools.logging import logger
+from ..tools.tracing import TracedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+client_basic = HTTPBasic(auto_error=False)
+
+# Status (não padronizado, do nginx) das requisições cujo cliente
+# desconectou antes da resposta
+HTTP_499_CLIENT_CLOSED_REQUEST = 499
+
+# Validade máxima, em segundos, das respostas de `/introspect` em cache
+INTROSPECTION_MAX_AGE = int(env.get("INTROSPECTION_MAX_AGE", "60"))
 
+# Cabeçalho com o token inspecionado em `GET /introspect`; o `Authorization`
+# carrega as credenciais de quem consulta
+INTROSPECT_TOKEN_HEADER = "X-Introspect-Token"
 
-@router.post("/token", response_model=schemas.Token)
-def generate_token(
+
+@router.post(
+    "/token", response_model=Union[schemas.Token, schemas.ClientToken]
+)
+async def generate_token(
+    request: Request,
     db: Session = Depends(get_db),
-    form_data: OAuth2PasswordRequestForm = Depends()
+    grant_type: str = Form("password"),
+    username: Optional[str] = Form(None),
+    password: Optional[str] = Form(None),
+    client_id: Optional[str] = Form(None),
+    client_secret: Optional[str] = Form(None),
+    scope: str = Form(""),
+    basic: Optional[HTTPBasicCredentials] = Depends(client_basic),
+    tenant_id: str = Depends(tenancy.get_request_tenant)
 ):
-    """Autentica um usuário e retorna um token JWT."""
-    user = security.get_user_by_email(db, form_data.username)
-    if not user or not security.verify_password(
-        form_data.password, user.hashed_password
-    ):
+    """Emite um token JWT.
+
+    - `grant_type=password` (padrão): autentica um usuário. O usuário é
+      buscado no tenant do cabeçalho `X-Tenant-ID`, que passa a viajar no
+      token. A consulta ao banco roda no threadpool e o bcrypt no pool de
+      derivações (`kdf`), sem bloquear o event loop; e-mails inexistentes
+      pagam o mesmo bcrypt. Se o cliente desconectar enquanto o bcrypt
+      aguarda na fila, a derivação é cancelada e a resposta é 499.
+    - `grant_type=client_credentials`: autentica um serviço pelo
+      `client_id`/`client_secret` (no corpo ou em HTTP Basic), sem banco
+      nem bcrypt.
+    """
+    if grant_type == "client_credentials":
+        if basic is not None:
+            client_id, client_secret = basic.username, basic.password
+        return await _client_credentials_token(client_id, client_secret,
+                                               scope)
+    if grant_type != "password":
+        raise HTTPException(
+            status_code=400, detail="grant_type não suportado"
+        )
+    if not username or not password:
+        raise HTTPException(status_code=400, detail="Credenciais inválidas")
+
+    user = await run_in_threadpool(
+        security.get_user_by_email, db, username, tenant_id
+    )
+    # A senha é sempre verificada (contra um hash fictício quando o usuário
+    # não existe), para que o tempo de resposta não revele o cadastro
+    try:
+        valid = await kdf.verify_password(
+            password, user.hashed_password if user else None,
+            is_disconnected=request.is_disconnected
+        )
+    except kdf.ClientDisconnected:
+        logger.warning("Cliente desconectou antes da verificação da senha")
+        raise HTTPException(
+            status_code=HTTP_499_CLIENT_CLOSED_REQUEST,
+            detail="Cliente desconectado"
+        )
+    if not user or not valid:
         logger.error("Credenciais inválidas")
         raise HTTPException(status_code=400, detail="Credenciais inválidas")
 
-    access_token = security.create_access_token(data={"sub": str(user.id)})
+    access_token = security.create_access_token(
+        data={
+            "sub": str(user.id),
+            tenancy.TENANT_CLAIM: tenant_id,
+            "role": user.role,
+        }
+    )
 
     return schemas.Token(
         access_token=access_token,
@@ -35,6 +111,33 @@ def generate_token(
     )
 
 
+async def _client_credentials_token(
+    client_id: Optional[str], client_secret: Optional[str], scope: str
+) -> schemas.ClientToken:
+    registry = clients.get_registry()
+    if not registry.loaded:
+        await run_in_threadpool(registry.reload)
+    try:
+        client = registry.authenticate(client_id or "", client_secret or "")
+        issued = registry.issue_token(client, scope or None)
+    except clients.InvalidClient:
+        logger.error(f"Cliente de serviço inválido: {client_id}")
+        raise HTTPException(
+            status_code=HTTP_401_UNAUTHORIZED, detail="Cliente inválido",
+            headers={"WWW-Authenticate": "Basic"},
+        )
+    except clients.InvalidScope as e:
+        raise HTTPException(
+            status_code=400, detail=f"Escopo não permitido: {e}"
+        )
+
+    return schemas.ClientToken(
+        access_token=issued.access_token,
+        expires_in=max(0, int(issued.expires_at - time.time())),
+        scope=issued.scope,
+    )
+
+
 @router.get("/auth", response_model=schemas.Customer)
 def validate_token(
     token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
@@ -50,3 +153,113 @@ def validate_token(
             status_code=HTTP_401_UNAUTHORIZED,
             detail="Token inválido ou expirado"
         )
+
+
+def require_introspection_client(
+    basic: Optional[HTTPBasicCredentials] = Depends(client_basic)
+) -> clients.RegisteredClient:
+    """Autentica quem consulta `/introspect` (RFC 7662, seção 2.1).
+
+    Exige as credenciais de um cliente de serviço em HTTP Basic, com o
+    escopo `tokens:introspect`, para que o endpoint não sirva de oráculo de
+    tokens a qualquer um.
+
+    Raises:
+        HTTPException: 401 sem credenciais válidas; 403 sem o escopo.
+
+    Returns:
+        clients.RegisteredClient: O cliente autenticado.
+    """
+    registry = clients.get_registry()
+    if not registry.loaded:
+        registry.reload()
+    try:
+        if basic is None:
+            raise clients.InvalidClient("")
+        caller = registry.authenticate(basic.username, basic.password)
+    except clients.InvalidClient:
+        logger.warning("Introspecção sem credenciais de cliente válidas")
+        raise HTTPException(
+            status_code=HTTP_401_UNAUTHORIZED, detail="Cliente inválido",
+            headers={"WWW-Authenticate": "Basic"},
+        )
+    if security.SCOPE_INTROSPECT not in caller.scopes:
+        logger.warning(
+            f"Cliente {caller.client_id} sem escopo de introspecção"
+        )
+        raise HTTPException(
+            status_code=HTTP_403_FORBIDDEN, detail="Permissão insuficiente"
+        )
+    return caller
+
+
+def _introspection_response(request: Request, token: str,
+                            shared: bool) -> Response:
+    """Monta a resposta de introspecção com os cabeçalhos de cache.
+
+    Tokens ativos podem ser guardados até o menor valor entre
+    `INTROSPECTION_MAX_AGE` e o tempo restante até o `exp`; tokens inativos
+    nunca são guardados. Caches compartilhados só podem guardar a resposta
+    (`shared`) quando a chave inclui quem consulta e o token, isto é, no
+    `GET` (`Vary: Authorization, X-Introspect-Token`); no `POST` o token
+    vai no corpo e a resposta é `private`. O `ETag` permite que o cache
+    revalide a entrada com `If-None-Match` e receba `304`.
+    """
+    result = schemas.Introspection(**security.introspect_token(token))
+    body = result.model_dump_json(exclude_none=True).encode()
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+    if result.active:
+        max_age = max(0, min(INTROSPECTION_MAX_AGE,
+                             result.exp - int(time.time())))
+        visibility = "public" if shared else "private"
+        cache_control = f"{visibility}, max-age={max_age}"
+    else:
+        cache_control = "no-store"
+    headers = {
+        "Cache-Control": cache_control,
+        "ETag": etag,
+        "Vary": (
+            f"Authorization, {INTROSPECT_TOKEN_HEADER}" if shared
+            else "Authorization"
+        ),
+    }
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(
+        content=body, media_type="application/json", headers=headers
+    )
+
+
+@router.get("/introspect", response_model=schemas.Introspection)
+def introspect_header(
+    request: Request,
+    token: str = Header(..., alias=INTROSPECT_TOKEN_HEADER),
+    caller: clients.RegisteredClient = Depends(require_introspection_client)
+) -> Response:
+    """Introspecção do token enviado no cabeçalho `X-Introspect-Token`.
+
+    Variante em GET de `POST /introspect`, que pode ser guardada por
+    proxies (nginx, envoy) com a chave composta pelas credenciais de quem
+    consulta e pelo token. Aceita o token puro ou com o prefixo `Bearer`.
+    """
+    scheme, _, value = token.partition(" ")
+    if scheme.lower() == "bearer" and value:
+        token = value
+    return _introspection_response(request, token, shared=True)
+
+
+@router.post("/introspect", response_model=schemas.Introspection)
+def introspect(
+    request: Request, token: str = Form(...),
+    caller: clients.RegisteredClient = Depends(require_introspection_client)
+) -> Response:
+    """Introspecção de token conforme a RFC 7662.
+
+    Retorna `active`, `sub`, `exp` e `scope` validando apenas a
+    assinatura e a expiração do token, sem consultar o banco. Quem consulta
+    se autentica como cliente de serviço (ver
+    `require_introspection_client`).
+    """
+    return _introspection_response(request, token, shared=False)
@@ -1,24 +1,80 @@
-from typing import List, Optional, Union
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, Callable, List, Optional, Union
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
 from ..database.database import get_db
 from ..models import schemas
-from ..services import repository, security
+from ..services import (
+    anonymous_pool, batch_writer, idempotency, repository, security
+)
 from ..tools.logging import logger
+from ..tools.tracing import TracedRoute
+from ..tools.responses import serialize
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
+def _idempotent(
+    key: Optional[str], operation: str, payload: Any,
+    claims: schemas.TokenClaims, tenant_id: str, response: Response,
+    create: Callable[[], Any]
+) -> Any:
+    """Executa `create` no máximo uma vez por `Idempotency-Key`.
+
+    Sem a chave, apenas executa. Com ela, repetições recebem a resposta
+    gravada da primeira execução (com o cabeçalho `Idempotent-Replayed`).
+
+    Args:
+        key (Optional[str]): O valor do cabeçalho `Idempotency-Key`.
+        operation (str): O nome da operação (isola as chaves por rota).
+        payload (Any): O corpo da requisição, para detectar reutilização.
+        claims (schemas.TokenClaims): As claims de quem chama.
+        tenant_id (str): O tenant de quem chama.
+        response (Response): A resposta, para os cabeçalhos.
+        create (Callable[[], Any]): Cria o cliente.
+
+    Raises:
+        HTTPException: 422 se a chave foi usada com outro corpo; 409 se a
+        requisição original ainda está em andamento.
+
+    Returns:
+        Any: O cliente criado ou a resposta gravada.
+    """
+    if key is None:
+        return create()
+    try:
+        body, replayed = idempotency.get_store().run(
+            idempotency.idempotency_key(tenant_id, claims.sub, operation, key),
+            idempotency.fingerprint(payload),
+            lambda: schemas.Customer.model_validate(create()).model_dump(),
+        )
+    except idempotency.IdempotencyConflict:
+        raise HTTPException(
+            status_code=422,
+            detail='Idempotency-Key reutilizada com outra requisição'
+        )
+    except idempotency.IdempotencyInProgress:
+        raise HTTPException(
+            status_code=409,
+            detail='Requisição com a mesma Idempotency-Key em andamento',
+            headers={'Retry-After': '1'}
+        )
+    if replayed:
+        logger.info(f'Resposta reaproveitada para a Idempotency-Key {key}')
+        response.headers[idempotency.REPLAYED_HEADER] = 'true'
+    return body
+
+
 @router.post('/admin', response_model=schemas.Customer)
 def create_customer(
     customer: schemas.CustomerCreate,
         db: Session = Depends(get_db),
-        current_user: schemas.Customer = Depends(
-            security.get_current_user)
+        claims: schemas.TokenClaims = Depends(
+            security.require_scopes(security.SCOPE_CUSTOMERS_ADMIN)),
+        tenant_id: str = Depends(security.get_current_tenant)
 ) -> schemas.Customer:
     """Cria um novo cliente com as informações fornecidas.
 
@@ -33,11 +89,15 @@ def create_customer(
         schemas.Customer: O cliente criado.
     """
     logger.info(f'Criando cliente com o e-mail: {customer.email}')
-    db_customer = repository.get_user_by_email(db, email=customer.email)
+    db_customer = repository.get_user_by_email(
+        db, email=customer.email, tenant_id=tenant_id
+    )
     if db_customer:
         logger.warning(f'Cliente com o e-mail {customer.email} já existe')
         raise HTTPException(status_code=400, detail='E-mail já registrado')
-    created_customer = repository.create_user(db=db, user=customer)
+    created_customer = repository.create_user(
+        db=db, user=customer, tenant_id=tenant_id
+    )
     logger.info(f'Cliente criado com ID: {created_customer.id}')
     return created_customer
 
@@ -51,7 +111,9 @@ def get_customers(
     skip: int = 0,
     limit: int = 10,
     db: Session = Depends(get_db),
-    current_user: schemas.Customer = Depends(security.get_current_user)
+    claims: schemas.TokenClaims = Depends(
+        security.require_scopes(security.SCOPE_CUSTOMERS_READ)),
+    tenant_id: str = Depends(security.get_current_tenant)
 ):
     """
     Recupera um cliente pelo ID ou uma lista de clientes com paginação.
@@ -71,7 +133,9 @@ def get_customers(
     """
     if customer_id:
         logger.info(f'Buscando cliente com ID: {customer_id}')
-        db_customer = repository.get_customer(db, customer_id=customer_id)
+        db_customer = repository.get_customer(
+            db, customer_id=customer_id, tenant_id=tenant_id
+        )
 
         if db_customer is None:
             logger.warning(f'Cliente com ID {customer_id} não encontrado')
@@ -79,24 +143,52 @@ def get_customers(
                 status_code=404, detail='Cliente não encontrado'
             )
 
-        # 🔹 Conversão do modelo SQLAlchemy para Pydantic
-        return schemas.Customer.model_validate(db_customer)
+        # 🔹 Serialização direta do modelo SQLAlchemy, sem revalidação
+        return serialize(schemas.Customer, db_customer)
 
     logger.info(f'Buscando clientes com skip: {skip}, limit: {limit}')
-    db_customers = repository.get_customers(db, skip=skip, limit=limit)
+    db_customers = repository.get_customers(
+        db, skip=skip, limit=limit, tenant_id=tenant_id
+    )
+
+    # 🔹 Serialização da lista em uma única passada (TypeAdapter em cache)
+    return serialize(List[schemas.Customer], db_customers)
 
-    # 🔹 Conversão do modelo SQLAlchemy para Pydantic (Lista)
-    return [
-        schemas.Customer.model_validate(customer)
-        for customer in db_customers
-    ]
+
+@router.get('/search', response_model=List[schemas.Customer])
+def search_customers(
+    q: str = Query(min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    claims: schemas.TokenClaims = Depends(
+        security.require_scopes(security.SCOPE_CUSTOMERS_READ)),
+    tenant_id: str = Depends(security.get_current_tenant)
+):
+    """Busca clientes por nome ou e-mail, com prefixo e similaridade.
+
+    Args:
+        q (str): O termo buscado.
+        limit (int): O número máximo de resultados (até 50).
+        db (Session): A sessão do banco de dados.
+
+    Returns:
+        List[schemas.Customer]: Os clientes encontrados, ordenados por
+        relevância.
+    """
+    logger.info(f'Buscando clientes pelo termo: {q}')
+    db_customers = repository.search_customers(
+        db, query=q, limit=limit, tenant_id=tenant_id
+    )
+    return serialize(List[schemas.Customer], db_customers)
 
 
 @router.post('/identify', response_model=schemas.Customer)
 def check_customer(
     cpf: schemas.CPFIdentify,
     db: Session = Depends(get_db),
-    current_user: schemas.Customer = Depends(security.get_current_user)
+    claims: schemas.TokenClaims = Depends(
+        security.require_scopes(security.SCOPE_CUSTOMERS_READ)),
+    tenant_id: str = Depends(security.get_current_tenant)
 ) -> schemas.Customer:
     """Identifica um cliente pelo CPF.
 
@@ -111,7 +203,9 @@ def check_customer(
         schemas.Customer: O cliente identificado.
     """
     logger.info(f'Identificando cliente com CPF: {cpf.cpf}')
-    db_customer = repository.get_customer_by_cpf(db, cpf=cpf.cpf)
+    db_customer = repository.get_customer_by_cpf(
+        db, cpf=cpf.cpf, tenant_id=tenant_id
+    )
     if db_customer is None:
         logger.warning(f'Cliente com CPF {cpf.cpf} não encontrado')
         raise HTTPException(status_code=404, detail='Cliente não encontrado')
@@ -121,14 +215,23 @@ def check_customer(
 @router.post('/register', response_model=schemas.Customer)
 def register_customer(
     customer: schemas.CustomerCreate,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: schemas.Customer = Depends(security.get_current_user)
+    claims: schemas.TokenClaims = Depends(
+        security.require_scopes(security.SCOPE_CUSTOMERS_WRITE)),
+    tenant_id: str = Depends(security.get_current_tenant),
+    idempotency_key: Optional[str] = Header(
+        None, alias=idempotency.IDEMPOTENCY_HEADER, max_length=255)
 ) -> schemas.Customer:
     """Registra um novo cliente com as informações fornecidas.
 
+    Com o cabeçalho `Idempotency-Key`, repetições da requisição recebem o
+    cliente já registrado, sem novo bcrypt nem novo insert.
+
     Args:
         customer (schemas.CustomerCreate): Os dados do cliente para registrar.
         db (Session): A sessão do banco de dados.
+        idempotency_key (Optional[str]): A chave de idempotência.
 
     Raises:
         HTTPException: Se um cliente com o e-mail fornecido já existir.
@@ -136,30 +239,86 @@ def register_customer(
     Returns:
         schemas.Customer: O cliente registrado.
     """
-    logger.info(f'Registrando cliente com e-mail: {customer.email}')
-    db_customer = repository.get_user_by_email(db, email=customer.email)
-    if db_customer:
-        logger.warning(f'Cliente com o e-mail {customer.email} já existe')
-        raise HTTPException(status_code=400, detail='E-mail já registrado')
-    created_customer = repository.create_user(db=db, user=customer)
-    logger.info(f'Cliente registrado com ID: {created_customer.id}')
-    return created_customer
+    def register():
+        logger.info(f'Registrando cliente com e-mail: {customer.email}')
+        db_customer = repository.get_user_by_email(
+            db, email=customer.email, tenant_id=tenant_id
+        )
+        if db_customer:
+            logger.warning(f'Cliente com o e-mail {customer.email} já existe')
+            raise HTTPException(
+                status_code=400, detail='E-mail já registrado'
+            )
+        created_customer = repository.create_user(
+            db=db, user=customer, tenant_id=tenant_id
+        )
+        logger.info(f'Cliente registrado com ID: {created_customer.id}')
+        return created_customer
+
+    # A senha fica fora da impressão digital gravada no cache
+    return _idempotent(
+        idempotency_key, 'register',
+        customer.model_dump(exclude={'password'}), claims, tenant_id,
+        response, register
+    )
 
 
 @router.post('/anonymous', response_model=schemas.Customer)
 def create_anonymous_customer(
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: schemas.Customer = Depends(security.get_current_user)
+    claims: schemas.TokenClaims = Depends(
+        security.require_scopes(security.SCOPE_CUSTOMERS_WRITE)),
+    tenant_id: str = Depends(security.get_current_tenant),
+    idempotency_key: Optional[str] = Header(
+        None, alias=idempotency.IDEMPOTENCY_HEADER, max_length=255)
 ) -> schemas.Customer:
     """Cria um novo cliente anônimo.
 
+    Quando o pool de pré-alocação está habilitado, o cliente é entregue a
+    partir dos IDs já reservados, sem transação na requisição. Caso
+    contrário, com a escrita em lote habilitada, o insert é agrupado com os
+    de outras requisições. Com o cabeçalho `Idempotency-Key`, repetições
+    recebem o mesmo cliente.
+
     Args:
         db (Session): A sessão do banco de dados.
+        idempotency_key (Optional[str]): A chave de idempotência.
+
+    Raises:
+        HTTPException: 503 se a escrita em lote estiver sobrecarregada.
 
     Returns:
         schemas.Customer: O cliente anônimo criado.
     """
-    logger.info('Criando cliente anônimo')
-    anonymous_customer = repository.create_anonymous_customer(db)
-    logger.info(f'Cliente anônimo criado com ID: {anonymous_customer.id}')
-    return anonymous_customer
+    def create():
+        logger.info('Criando cliente anônimo')
+        pool = anonymous_pool.get_pool(tenant_id)
+        writer = batch_writer.get_customer_writer()
+        if pool is not None:
+            anonymous_customer = pool.acquire()
+        elif writer is not None:
+            try:
+                customer_id = writer.submit(
+                    {'tenant_id': tenant_id,
+                     'name': anonymous_pool.ANONYMOUS_NAME}
+                )
+            except batch_writer.WriterOverloaded as e:
+                logger.warning(f'Escrita em lote recusada: {e}')
+                raise HTTPException(
+                    status_code=503, detail='Serviço sobrecarregado',
+                    headers={'Retry-After': '1'}
+                )
+            anonymous_customer = schemas.Customer(
+                id=customer_id, name=anonymous_pool.ANONYMOUS_NAME
+            )
+        else:
+            anonymous_customer = repository.create_anonymous_customer(
+                db, tenant_id=tenant_id
+            )
+        logger.info(f'Cliente anônimo criado com ID: {anonymous_customer.id}')
+        return anonymous_customer
+
+    return _idempotent(
+        idempotency_key, 'anonymous', {}, claims, tenant_id, response, create
+    )
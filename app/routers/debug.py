@@ -0,0 +1,42 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from ..models import schemas
+from ..services import security
+from ..tools import profiler
+from ..tools.logging import logger
+from ..tools.tracing import TracedRoute
+
+router = APIRouter(route_class=TracedRoute)
+
+
+@router.get('/profile', response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(5.0, gt=0, le=60),
+    interval: float = Query(0.005, ge=0.001, le=1),
+    admin: schemas.TokenClaims = Depends(security.get_current_admin)
+) -> PlainTextResponse:
+    """Executa o profiler por amostragem neste worker.
+
+    A amostragem roda em um thread separado; o event loop continua
+    atendendo requisições e aparece nas pilhas amostradas. O resultado está
+    no formato collapsed (`flamegraph.pl`, speedscope).
+
+    Args:
+        seconds (float): Duração da sessão, em segundos (até 60).
+        interval (float): Intervalo entre as amostras, em segundos.
+
+    Raises:
+        HTTPException: 409 se já houver uma sessão em andamento.
+
+    Returns:
+        PlainTextResponse: As pilhas colapsadas com as contagens.
+    """
+    logger.info(f'Profiling por {seconds}s solicitado por {admin.sub}')
+    try:
+        stacks = await asyncio.to_thread(profiler.sample, seconds, interval)
+    except profiler.ProfilerBusy:
+        raise HTTPException(status_code=409, detail='Profiling em andamento')
+    return PlainTextResponse(profiler.format_collapsed(stacks))
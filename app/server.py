@@ -0,0 +1,369 @@
+"""Servidor de produção do Auth Service.
+
+Sobe N workers uvicorn no modelo pre-fork: o processo principal importa a
+aplicação e abre o socket uma única vez, e cada worker é criado com
+`os.fork()`, herdando os módulos já carregados (copy-on-write) em vez de
+repetir o import. O processo principal supervisiona os workers, recria os
+que morrerem e, ao receber SIGTERM/SIGINT, repassa o sinal e aguarda a
+drenagem das requisições em andamento até `SERVER_GRACEFUL_TIMEOUT`.
+
+Workers que morrem logo após subir são recriados com espera exponencial
+(de 0,5 s até 30 s); depois de `SERVER_MAX_RESTARTS` falhas seguidas do
+mesmo worker, o supervisor encerra os demais e sai com status 1, para que o
+Kubernetes reinicie o pod em vez de manter um ciclo de fork.
+
+No SIGTERM cada worker primeiro marca o `/readyz` como indisponível e
+continua atendendo por `SERVER_DRAIN_DELAY` segundos, tempo para o
+Kubernetes retirá-lo dos endpoints do Service; só então para de aceitar
+conexões. Um segundo sinal encerra a espera imediatamente. Na subida, o
+servidor avisa se `SERVER_DRAIN_DELAY + SERVER_GRACEFUL_TIMEOUT` não couber
+em `SERVER_TERMINATION_GRACE_PERIOD` (o `terminationGracePeriodSeconds`).
+
+Configuração via variáveis de ambiente:
+    HOST, PORT, WEB_CONCURRENCY (número de workers), SERVER_BACKLOG,
+    SERVER_KEEPALIVE_TIMEOUT, SERVER_GRACEFUL_TIMEOUT, SERVER_DRAIN_DELAY,
+    SERVER_MAX_RESTARTS, SERVER_TERMINATION_GRACE_PERIOD, SERVER_LOOP,
+    SERVER_HTTP.
+
+Uso:
+    python -m app.server
+"""
+import importlib.util
+import os
+import signal
+import socket
+import sys
+import time
+from os import environ as env
+from typing import Dict, List, Optional
+
+import uvicorn
+
+from .tools.logging import logger
+
+APP_PATH = 'app.main:app'
+
+# Status de saída de um worker cuja aplicação não subiu (como no uvicorn)
+STARTUP_FAILURE = 3
+
+# Folga para os workers encerrarem depois da drenagem, antes do SIGKILL
+SHUTDOWN_MARGIN = 5
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def _int_env(name: str, default: int) -> int:
+    value = env.get(name)
+    return int(value) if value else default
+
+
+def worker_count() -> int:
+    """Retorna o número de workers configurado.
+
+    Usa `WEB_CONCURRENCY` quando definido; caso contrário, um worker por CPU
+    disponível.
+
+    Returns:
+        int: O número de workers (no mínimo 1).
+    """
+    return max(1, _int_env('WEB_CONCURRENCY', os.cpu_count() or 1))
+
+
+def graceful_timeout() -> int:
+    """Retorna o prazo, em segundos, para drenar requisições no shutdown."""
+    return _int_env('SERVER_GRACEFUL_TIMEOUT', 20)
+
+
+def drain_delay() -> int:
+    """Retorna o tempo, em segundos, servindo em drenagem após o SIGTERM."""
+    return _int_env('SERVER_DRAIN_DELAY', 5)
+
+
+def termination_grace_period() -> int:
+    """Retorna o prazo, em segundos, entre o SIGTERM e o SIGKILL do pod."""
+    return _int_env('SERVER_TERMINATION_GRACE_PERIOD', 30)
+
+
+def check_shutdown_budget() -> bool:
+    """Verifica se a drenagem cabe no prazo de encerramento do pod.
+
+    Registra um aviso quando `drain_delay + graceful_timeout` mais a folga
+    de `SHUTDOWN_MARGIN` excede `termination_grace_period`: nesse caso o
+    kubelet mata o processo antes do fim da drenagem.
+
+    Returns:
+        bool: True se a configuração cabe no prazo.
+    """
+    budget = drain_delay() + graceful_timeout() + SHUTDOWN_MARGIN
+    grace = termination_grace_period()
+    if budget <= grace:
+        return True
+    logger.warning(
+        f'SERVER_DRAIN_DELAY ({drain_delay()}s) + SERVER_GRACEFUL_TIMEOUT '
+        f'({graceful_timeout()}s) + {SHUTDOWN_MARGIN}s excede '
+        f'terminationGracePeriodSeconds ({grace}s); requisições em '
+        f'andamento podem ser interrompidas pelo SIGKILL'
+    )
+    return False
+
+
+def max_restarts() -> int:
+    """Retorna quantas falhas seguidas de um worker o supervisor tolera."""
+    return _int_env('SERVER_MAX_RESTARTS', 5)
+
+
+class DrainingServer(uvicorn.Server):
+    """Servidor uvicorn que drena antes de parar de aceitar conexões.
+
+    O primeiro SIGTERM/SIGINT apenas inicia a drenagem
+    (`lifecycle.start_draining`); o encerramento normal do uvicorn começa
+    quando `on_tick` detecta o fim do `drain_delay`, ou no próximo sinal,
+    que segue o tratamento padrão do uvicorn.
+    """
+
+    def __init__(self, config: uvicorn.Config,
+                 delay: Optional[float] = None) -> None:
+        super().__init__(config)
+        self.drain_delay = drain_delay() if delay is None else delay
+        self.drain_deadline: Optional[float] = None
+
+    def handle_exit(self, sig: int, frame) -> None:
+        if self.drain_deadline is None and self.drain_delay > 0:
+            from .services import lifecycle
+            lifecycle.start_draining()
+            self.drain_deadline = time.monotonic() + self.drain_delay
+            logger.info(
+                f'Sinal {sig} recebido; drenando por {self.drain_delay}s'
+            )
+            return
+        super().handle_exit(sig, frame)
+
+    async def on_tick(self, counter: int) -> bool:
+        if (self.drain_deadline is not None
+                and time.monotonic() >= self.drain_deadline):
+            self.should_exit = True
+        return await super().on_tick(counter)
+
+
+def build_config(app=APP_PATH) -> uvicorn.Config:
+    """Monta a configuração do uvicorn para produção.
+
+    Usa uvloop e httptools quando instalados, sem reload e sem access log
+    (os logs da aplicação já registram as requisições relevantes).
+
+    Args:
+        app: A aplicação ASGI ou o caminho de import dela.
+
+    Returns:
+        uvicorn.Config: A configuração do servidor.
+    """
+    return uvicorn.Config(
+        app,
+        host=env.get('HOST', '0.0.0.0'),
+        port=_int_env('PORT', 8000),
+        loop=env.get(
+            'SERVER_LOOP', 'uvloop' if _installed('uvloop') else 'asyncio'
+        ),
+        http=env.get(
+            'SERVER_HTTP', 'httptools' if _installed('httptools') else 'h11'
+        ),
+        backlog=_int_env('SERVER_BACKLOG', 2048),
+        timeout_keep_alive=_int_env('SERVER_KEEPALIVE_TIMEOUT', 75),
+        timeout_graceful_shutdown=graceful_timeout(),
+        proxy_headers=True,
+        access_log=False,
+        lifespan='on',
+    )
+
+
+def serve(config: uvicorn.Config,
+          sockets: Optional[List[socket.socket]] = None) -> int:
+    """Executa um `DrainingServer` até o encerramento.
+
+    Args:
+        config (uvicorn.Config): A configuração do servidor.
+        sockets (Optional[List[socket.socket]]): Sockets já abertos.
+
+    Returns:
+        int: 0 após um encerramento normal, `STARTUP_FAILURE` se a
+        aplicação não subiu ou 1 se o servidor falhou.
+    """
+    try:
+        server = DrainingServer(config)
+        server.run(sockets=sockets)
+    except Exception as e:
+        logger.error(f'Servidor encerrado por erro: {e!r}')
+        return 1
+    return 0 if server.started else STARTUP_FAILURE
+
+
+class Supervisor:
+    """Processo principal do modelo pre-fork.
+
+    Attributes:
+        config (uvicorn.Config): Configuração compartilhada pelos workers.
+        workers (int): Quantidade de workers a manter ativos.
+        sock (socket.socket): Socket de escuta herdado pelos workers.
+        pids (Dict[int, int]): Workers ativos, indexados por PID.
+        max_restarts (int): Falhas seguidas de um worker antes de desistir.
+        exit_code (int): O status de saída do supervisor.
+    """
+
+    # Um worker que sobrevive a este tempo, em segundos, é considerado
+    # estável e zera a contagem de falhas
+    MIN_UPTIME = 10.0
+    BACKOFF_INITIAL = 0.5
+    BACKOFF_MAX = 30.0
+
+    def __init__(self, config: uvicorn.Config, workers: int,
+                 restarts: Optional[int] = None) -> None:
+        self.config = config
+        self.workers = workers
+        self.sock: Optional[socket.socket] = None
+        self.pids: Dict[int, int] = {}
+        self.stopping = False
+        self.deadline: Optional[float] = None
+        self.max_restarts = max_restarts() if restarts is None else restarts
+        self.exit_code = 0
+        self.started_at: Dict[int, float] = {}
+        self.failures: Dict[int, int] = {}
+        self.respawn_at: Dict[int, float] = {}
+
+    def spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover - executado no processo filho
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 1
+            try:
+                code = serve(self.config, sockets=[self.sock])
+            finally:
+                os._exit(code)
+        self.pids[pid] = slot
+        self.started_at[slot] = time.monotonic()
+        logger.info(f'Worker {slot} iniciado com PID {pid}')
+
+    def worker_exited(self, slot: int, status: int) -> None:
+        """Agenda a recriação do worker, com espera exponencial se ele
+        falhou logo após subir.
+
+        Após `max_restarts` falhas seguidas, encerra os demais workers e
+        define `exit_code` como 1.
+
+        Args:
+            slot (int): O índice do worker.
+            status (int): O status de `os.waitpid`.
+        """
+        now = time.monotonic()
+        code = os.waitstatus_to_exitcode(status)
+        if now - self.started_at.get(slot, now) >= self.MIN_UPTIME:
+            self.failures[slot] = 0
+        failures = self.failures[slot] = self.failures.get(slot, 0) + 1
+        if failures > self.max_restarts:
+            logger.error(
+                f'Worker {slot} falhou {failures} vezes seguidas (status '
+                f'{code}); encerrando o servidor'
+            )
+            self.exit_code = 1
+            self.stop(signal.SIGTERM)
+            return
+        delay = min(
+            self.BACKOFF_INITIAL * 2 ** (failures - 1), self.BACKOFF_MAX
+        )
+        logger.warning(
+            f'Worker {slot} terminou com status {code}; recriando em '
+            f'{delay:.1f}s'
+        )
+        self.respawn_at[slot] = now + delay
+
+    def stop(self, signum: int, frame=None) -> None:
+        """Inicia a drenagem: repassa o sinal aos workers e define o prazo."""
+        if self.stopping:
+            return
+        self.stopping = True
+        self.deadline = (
+            time.monotonic() + drain_delay() + graceful_timeout()
+            + SHUTDOWN_MARGIN
+        )
+        logger.info(
+            f'Sinal {signum} recebido; drenando {len(self.pids)} workers'
+        )
+        for pid in self.pids:
+            _kill(pid, signal.SIGTERM)
+
+    def run(self) -> int:
+        """Supervisiona os workers até o encerramento.
+
+        Returns:
+            int: 0 após uma drenagem normal; 1 se um worker falhou
+            repetidamente.
+        """
+        # Pré-carrega a aplicação antes do fork para compartilhar o import
+        self.config.load()
+        from .services import metrics
+        # Os workers somam as amostras uns dos outros no `/metrics`
+        metrics.prepare_multiprocess_dir()
+        self.sock = self.config.bind_socket()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for slot in range(self.workers):
+            self.spawn(slot)
+
+        while self.pids or (self.respawn_at and not self.stopping):
+            now = time.monotonic()
+            for slot, when in list(self.respawn_at.items()):
+                if self.stopping:
+                    self.respawn_at.clear()
+                elif when <= now:
+                    del self.respawn_at[slot]
+                    self.spawn(slot)
+            if not self.pids:
+                time.sleep(0.2)
+                continue
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                if self.deadline and time.monotonic() > self.deadline:
+                    logger.warning('Prazo de drenagem esgotado; encerrando')
+                    for remaining in self.pids:
+                        _kill(remaining, signal.SIGKILL)
+                    self.deadline = None
+                time.sleep(0.2)
+                continue
+
+            slot = self.pids.pop(pid, None)
+            if slot is None:
+                continue
+            metrics.mark_process_dead(pid)
+            if not self.stopping:
+                self.worker_exited(slot, status)
+
+        self.sock.close()
+        logger.info('Todos os workers foram encerrados')
+        return self.exit_code
+
+
+def _kill(pid: int, signum: int) -> None:
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def main() -> int:
+    """Ponto de entrada do servidor de produção.
+
+    Returns:
+        int: O status de saída do processo.
+    """
+    check_shutdown_budget()
+    workers = worker_count()
+    if workers == 1 or not hasattr(os, 'fork'):
+        return serve(build_config())
+    return Supervisor(build_config(), workers).run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
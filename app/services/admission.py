@@ -0,0 +1,285 @@
+"""Controle de admissão adaptativo por classe de endpoint.
+
+Cada classe (login, validação, escrita, listagens administrativas) tem o
+seu próprio limite de requisições simultâneas. Excedido o limite, a
+requisição aguarda em uma fila curta por até `queue_timeout` segundos; com
+a fila cheia ela é recusada imediatamente com 429, e se o tempo de espera
+se esgota, com 503. Assim o bcrypt do `/token` não consome os threads e as
+conexões de que o `/auth` precisa.
+
+O limite se ajusta pela latência medida (AIMD): cresce `1/limite` a cada
+requisição concluída dentro da tolerância, com a classe em uso, e cai 10%
+(no máximo uma vez por latência observada) quando a latência passa de
+`tolerance` vezes a linha de base sem carga.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from os import environ as env
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from ..tools.logging import logger
+
+LOGIN = 'login'
+VALIDATION = 'validation'
+WRITE = 'write'
+ADMIN_LIST = 'admin_list'
+
+
+class AdmissionRejected(Exception):
+    """A requisição foi recusada pelo controle de admissão.
+
+    Attributes:
+        status_code (int): 429 (fila cheia) ou 503 (tempo de espera
+        esgotado).
+        retry_after (int): Sugestão de espera, em segundos.
+    """
+
+    def __init__(self, status_code: int, retry_after: int,
+                 detail: str) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class AdaptiveLimiter:
+    """Limite de concorrência ajustado pela latência observada.
+
+    Attributes:
+        name (str): O nome da classe de endpoint.
+        limit (float): O limite atual de requisições simultâneas.
+        min_limit (int): O menor limite permitido.
+        max_limit (int): O maior limite permitido.
+        queue_timeout (float): Espera máxima na fila, em segundos.
+        max_queue (int): Tamanho máximo da fila.
+        tolerance (float): Razão entre a latência e a linha de base que
+        indica sobrecarga.
+    """
+
+    def __init__(self, name: str, limit: int, min_limit: int = 1,
+                 max_limit: Optional[int] = None, queue_timeout: float = 0.1,
+                 max_queue: Optional[int] = None,
+                 tolerance: float = 2.0) -> None:
+        self.name = name
+        self.limit = float(limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit if max_limit is not None else limit * 4
+        self.queue_timeout = queue_timeout
+        self.max_queue = max_queue if max_queue is not None else limit * 2
+        self.tolerance = tolerance
+        self.baseline: Optional[float] = None
+        self.rejected = 0
+        self._inflight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+
+    @property
+    def inflight(self) -> int:
+        """O número de requisições em execução."""
+        return self._inflight
+
+    @property
+    def queued(self) -> int:
+        """O número de requisições aguardando na fila."""
+        return len(self._waiters)
+
+    def _retry_after(self) -> int:
+        latency = self.baseline or self.queue_timeout
+        waves = (len(self._waiters) + 1) / max(self.limit, 1)
+        return max(1, math.ceil(latency * waves))
+
+    async def acquire(self) -> None:
+        """Aguarda uma vaga na classe.
+
+        Raises:
+            AdmissionRejected: 429 se a fila estiver cheia; 503 se a vaga
+            não surgir dentro de `queue_timeout`.
+        """
+        if self._inflight < int(self.limit) and not self._waiters:
+            self._inflight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(
+                429, self._retry_after(), 'Muitas requisições simultâneas'
+            )
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # A vaga foi concedida junto com o fim da espera
+                return
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self.rejected += 1
+            raise AdmissionRejected(
+                503, self._retry_after(), 'Serviço sobrecarregado'
+            )
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Cancelada depois de receber a vaga: repassa-a à fila
+                self._inflight -= 1
+                self._wake()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, latency: float, failed: bool = False) -> None:
+        """Libera a vaga e ajusta o limite com a latência medida.
+
+        Args:
+            latency (float): Duração da requisição, em segundos.
+            failed (bool): Se a requisição falhou por erro do servidor.
+        """
+        self._inflight -= 1
+        self._adjust(latency, failed)
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._inflight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._inflight += 1
+
+    def _adjust(self, latency: float, failed: bool) -> None:
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        else:
+            # A linha de base acompanha lentamente mudanças de carga
+            self.baseline += (latency - self.baseline) * 0.01
+
+        now = time.monotonic()
+        if failed or latency > self.baseline * self.tolerance:
+            if now - self._last_decrease >= latency:
+                self._last_decrease = now
+                previous = int(self.limit)
+                self.limit = max(float(self.min_limit), self.limit * 0.9)
+                if int(self.limit) != previous:
+                    logger.info(
+                        f'Admission {self.name}: limit {int(self.limit)} '
+                        f'(latency {latency * 1000:.1f}ms)'
+                    )
+        elif self._inflight + 1 >= self.limit / 2:
+            self.limit = min(
+                float(self.max_limit), self.limit + 1 / self.limit
+            )
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Executa o bloco ocupando uma vaga da classe."""
+        await self.acquire()
+        started = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.release(time.perf_counter() - started, failed)
+
+
+# Limites iniciais, máximos e espera na fila (ms) de cada classe. O login
+# é limitado pela CPU (bcrypt); as demais classes, pelo banco.
+_CPUS = os.cpu_count() or 1
+DEFAULTS: Dict[str, Dict[str, int]] = {
+    LOGIN: {'limit': 2 * _CPUS, 'max_limit': 8 * _CPUS,
+            'queue_timeout_ms': 500},
+    VALIDATION: {'limit': 32, 'max_limit': 200, 'queue_timeout_ms': 100},
+    WRITE: {'limit': 16, 'max_limit': 100, 'queue_timeout_ms': 250},
+    ADMIN_LIST: {'limit': 4, 'max_limit': 16, 'queue_timeout_ms': 500},
+}
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """Retorna a classe do endpoint, ou None para rotas sem controle.
+
+    Args:
+        method (str): O método HTTP.
+        path (str): O caminho da requisição.
+
+    Returns:
+        Optional[str]: A classe do endpoint.
+    """
+    path = path.rstrip('/') or '/'
+    if method == 'POST' and path == '/token':
+        return LOGIN
+    if path in ('/auth', '/introspect', '/customers/identify'):
+        return VALIDATION
+    if method == 'POST' and path in (
+        '/customers/register', '/customers/admin', '/customers/anonymous'
+    ):
+        return WRITE
+    if method == 'GET' and (
+        path in ('/customers', '/customers/search')
+        or path.startswith('/debug/')
+    ):
+        return ADMIN_LIST
+    return None
+
+
+class AdmissionController:
+    """Conjunto de limitadores, um por classe de endpoint."""
+
+    def __init__(self, limiters: Dict[str, AdaptiveLimiter]) -> None:
+        self.limiters = limiters
+
+    def limiter_for(self, method: str, path: str
+                    ) -> Optional[AdaptiveLimiter]:
+        """Retorna o limitador da rota, se ela for controlada."""
+        endpoint_class = classify(method, path)
+        if endpoint_class is None:
+            return None
+        return self.limiters.get(endpoint_class)
+
+
+_controller: Optional[AdmissionController] = None
+_controller_created = False
+
+
+def get_controller() -> Optional[AdmissionController]:
+    """Retorna o controle de admissão do processo, criando-o no primeiro
+    uso (ver `create_controller`).
+
+    Returns:
+        Optional[AdmissionController]: O controle, ou None se desabilitado.
+    """
+    global _controller, _controller_created
+    if not _controller_created:
+        _controller = create_controller()
+        _controller_created = True
+    return _controller
+
+
+def create_controller() -> Optional[AdmissionController]:
+    """Cria o controle de admissão a partir das variáveis de ambiente.
+
+    `ADMISSION_CONTROL=off` desabilita o controle. Para cada classe
+    (`LOGIN`, `VALIDATION`, `WRITE`, `ADMIN_LIST`), os valores padrão podem
+    ser substituídos por `ADMISSION_<CLASSE>_LIMIT`,
+    `ADMISSION_<CLASSE>_MAX_LIMIT` e `ADMISSION_<CLASSE>_QUEUE_TIMEOUT_MS`.
+
+    Returns:
+        Optional[AdmissionController]: O controle configurado.
+    """
+    if env.get('ADMISSION_CONTROL', 'on').lower() in ('off', 'false', '0'):
+        return None
+    limiters = {}
+    for name, defaults in DEFAULTS.items():
+        prefix = f'ADMISSION_{name.upper()}_'
+        limit = int(env.get(prefix + 'LIMIT', defaults['limit']))
+        limiters[name] = AdaptiveLimiter(
+            name, limit,
+            max_limit=int(env.get(prefix + 'MAX_LIMIT',
+                                  max(limit, defaults['max_limit']))),
+            queue_timeout=int(env.get(
+                prefix + 'QUEUE_TIMEOUT_MS', defaults['queue_timeout_ms']
+            )) / 1000,
+        )
+    return AdmissionController(limiters)
@@ -0,0 +1,160 @@
+"""Pré-alocação de clientes anônimos.
+
+Cada pedido de totem sem identificação cria um cliente anônimo. Em vez de um
+INSERT + COMMIT por requisição, o pool insere os clientes anônimos em lotes
+(um único INSERT multi-linha por transação) e entrega os IDs a partir da
+memória. Quando o estoque cai abaixo de `low_watermark`, um novo lote é
+reservado em segundo plano.
+
+Os clientes reservados já existem no banco antes de serem entregues: eles
+aparecem nas listagens e na contagem de clientes, e os não entregues
+(por exemplo, quando o worker é encerrado) permanecem como clientes
+anônimos órfãos. Por isso o pool vem desabilitado; a escrita em lote
+(`batch_writer`) é a alternativa que só grava clientes pedidos.
+"""
+import threading
+from collections import deque
+from os import environ as env
+from typing import Callable, Deque, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..database.database import SessionLocal, get_engine
+from ..models import models, schemas
+from ..tools.logging import logger
+from . import cache, repository, tenancy
+
+ANONYMOUS_NAME = 'Anonymous'
+
+
+class AnonymousCustomerPool:
+    """Estoque em memória de clientes anônimos já gravados no banco.
+
+    Attributes:
+        session_factory (Callable[[], Session]): Cria as sessões usadas nas
+        reservas.
+        batch_size (int): Quantidade de clientes reservados por lote.
+        low_watermark (int): Estoque mínimo antes de disparar uma nova
+        reserva em segundo plano.
+        tenant_id (str): O tenant dos clientes reservados.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session],
+                 batch_size: int = 50,
+                 low_watermark: Optional[int] = None,
+                 tenant_id: str = tenancy.DEFAULT_TENANT) -> None:
+        self.session_factory = session_factory
+        self.tenant_id = tenant_id
+        self.batch_size = batch_size
+        self.low_watermark = (
+            batch_size // 4 if low_watermark is None else low_watermark
+        )
+        self._ids: Deque[int] = deque()
+        self._lock = threading.Lock()
+        self._refill_lock = threading.Lock()
+        self._refilling = False
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def acquire(self) -> schemas.Customer:
+        """Entrega um cliente anônimo já persistido.
+
+        Returns:
+            schemas.Customer: O cliente anônimo.
+        """
+        customer_id = self._pop()
+        while customer_id is None:
+            # Estoque vazio: reserva um lote na própria requisição
+            self.refill()
+            customer_id = self._pop()
+
+        if len(self._ids) <= self.low_watermark:
+            self._refill_in_background()
+        return schemas.Customer(id=customer_id, name=ANONYMOUS_NAME)
+
+    def _pop(self) -> Optional[int]:
+        with self._lock:
+            return self._ids.popleft() if self._ids else None
+
+    def refill(self) -> List[int]:
+        """Reserva um lote de clientes anônimos em uma única transação.
+
+        Returns:
+            List[int]: Os IDs reservados.
+        """
+        with self._refill_lock:
+            # Outro thread pode ter reabastecido enquanto aguardávamos
+            if len(self._ids) > self.low_watermark:
+                return []
+            db = self.session_factory()
+            try:
+                ids = list(db.scalars(
+                    insert(models.Customer).returning(
+                        models.Customer.id, sort_by_parameter_order=True
+                    ),
+                    [{'tenant_id': self.tenant_id, 'name': ANONYMOUS_NAME}]
+                    * self.batch_size,
+                ))
+                db.commit()
+            finally:
+                db.close()
+
+        with self._lock:
+            self._ids.extend(ids)
+        cache.invalidate([repository.count_cache_key(self.tenant_id)])
+        logger.info(f'Reserved {len(ids)} anonymous customers')
+        return ids
+
+    def _refill_in_background(self) -> None:
+        with self._lock:
+            if self._refilling:
+                return
+            self._refilling = True
+
+        def run() -> None:
+            try:
+                self.refill()
+            except Exception as e:
+                logger.error(f'Error reserving anonymous customers: {e}')
+            finally:
+                with self._lock:
+                    self._refilling = False
+
+        threading.Thread(
+            target=run, name='anonymous-pool-refill', daemon=True
+        ).start()
+
+
+_pools: Dict[str, AnonymousCustomerPool] = {}
+_pool_lock = threading.Lock()
+
+
+def get_pool(tenant_id: str = tenancy.DEFAULT_TENANT
+             ) -> Optional[AnonymousCustomerPool]:
+    """Retorna o pool do tenant no processo, ou None se desabilitado.
+
+    Cada tenant tem o seu estoque, criado no primeiro uso. O tamanho do
+    lote vem de `ANONYMOUS_POOL_BATCH` (padrão 0, desabilitado: cada
+    requisição grava o seu cliente).
+
+    Args:
+        tenant_id (str): O tenant dos clientes.
+
+    Returns:
+        Optional[AnonymousCustomerPool]: O pool configurado.
+    """
+    batch_size = int(env.get('ANONYMOUS_POOL_BATCH', '0'))
+    if batch_size <= 0:
+        return None
+    pool = _pools.get(tenant_id)
+    if pool is None:
+        with _pool_lock:
+            pool = _pools.get(tenant_id)
+            if pool is None:
+                pool = _pools[tenant_id] = AnonymousCustomerPool(
+                    lambda: SessionLocal(bind=get_engine()), batch_size,
+                    tenant_id=tenant_id,
+                )
+    return pool
@@ -0,0 +1,277 @@
+"""Escrita em lote (group commit) para inserts de baixa criticidade.
+
+Cada requisição enfileira a sua linha e aguarda o ID. Um thread de escrita
+acumula as linhas por até `max_delay` segundos (ou `max_batch` linhas),
+grava o lote em um único INSERT multi-linha com RETURNING e uma única
+transação, e entrega a cada requisição o seu ID. O custo de commit/fsync
+passa a ser pago por lote, e não por linha.
+
+A fila é limitada: quando está cheia por mais de `enqueue_timeout`
+segundos, `submit` levanta `WriterOverloaded` para que a requisição seja
+recusada rapidamente em vez de acumular latência. O mesmo vale para a
+espera pela gravação: a linha que expira ainda na fila é cancelada e não
+chega a ser gravada.
+"""
+import queue
+import threading
+import time
+from concurrent import futures
+from concurrent.futures import Future
+from os import environ as env
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..database.database import SessionLocal, get_engine
+from ..models import models
+from ..tools.logging import logger
+from . import cache, repository, tenancy
+
+_Item = Tuple[Dict[str, Any], Future]
+
+
+class WriterOverloaded(Exception):
+    """A fila do writer está cheia, a gravação expirou ou o writer foi
+    encerrado (backpressure)."""
+
+
+class GroupCommitWriter:
+    """Agrupa inserts de uma tabela em lotes com um commit por lote.
+
+    Attributes:
+        session_factory (Callable[[], Session]): Cria as sessões de escrita.
+        model: O modelo SQLAlchemy cujas linhas são inseridas.
+        max_batch (int): Máximo de linhas por lote.
+        max_delay (float): Tempo máximo, em segundos, que a primeira linha
+        de um lote aguarda por outras.
+        enqueue_timeout (float): Tempo máximo de espera por espaço na fila.
+        on_flush (Optional[Callable[[List[Dict[str, Any]]], None]]):
+        Chamado com os valores das linhas de cada lote gravado.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], model,
+                 max_batch: int = 100, max_delay: float = 0.005,
+                 max_queue: int = 1000, enqueue_timeout: float = 0.05,
+                 on_flush: Optional[
+                     Callable[[List[Dict[str, Any]]], None]] = None
+                 ) -> None:
+        self.session_factory = session_factory
+        self.model = model
+        self.on_flush = on_flush
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: 'queue.Queue[Optional[_Item]]' = queue.Queue(max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def qsize(self) -> int:
+        """Retorna o número de linhas aguardando gravação."""
+        return self._queue.qsize()
+
+    def submit(self, values: Dict[str, Any],
+               timeout: Optional[float] = 5.0) -> int:
+        """Enfileira uma linha e aguarda o ID gerado.
+
+        Args:
+            values (Dict[str, Any]): Os valores da linha.
+            timeout (Optional[float]): Tempo máximo de espera pela gravação.
+
+        Raises:
+            WriterOverloaded: Se a fila estiver cheia, o writer fechado ou
+            a linha não for gravada dentro de `timeout`.
+
+        Returns:
+            int: O ID da linha inserida.
+        """
+        future = self.submit_async(values)
+        try:
+            return future.result(timeout=timeout)
+        except futures.TimeoutError:
+            # Ainda na fila: cancelada, o thread de escrita a descarta
+            if not future.cancel():
+                logger.warning(
+                    'Group commit timed out while the row was being written'
+                )
+            raise WriterOverloaded('Gravação em lote expirou')
+
+    def submit_async(self, values: Dict[str, Any]) -> Future:
+        """Enfileira uma linha e retorna um `Future` com o ID gerado."""
+        if self._closed:
+            raise WriterOverloaded('Writer encerrado')
+        self._ensure_started()
+        future: Future = Future()
+        try:
+            self._queue.put((values, future), timeout=self.enqueue_timeout)
+        except queue.Full:
+            raise WriterOverloaded('Fila de escrita cheia')
+        return future
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='group-commit-writer', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch: List[_Item]) -> None:
+        # Descarta as linhas cuja requisição desistiu de esperar
+        batch = [
+            item for item in batch if item[1].set_running_or_notify_cancel()
+        ]
+        if not batch:
+            return
+        pending = [future for _, future in batch]
+        db = None
+        try:
+            db = self.session_factory()
+            ids = list(db.scalars(
+                insert(self.model).returning(
+                    self.model.id, sort_by_parameter_order=True
+                ),
+                [values for values, _ in batch],
+            ))
+            db.commit()
+        except Exception as e:
+            logger.error(f'Error flushing batch of {len(batch)} rows: {e}')
+            for future in pending:
+                future.set_exception(e)
+            return
+        finally:
+            if db is not None:
+                db.close()
+
+        logger.debug(f'Flushed batch of {len(ids)} rows')
+        for future, row_id in zip(pending, ids):
+            future.set_result(row_id)
+        if self.on_flush is not None:
+            try:
+                self.on_flush([values for values, _ in batch])
+            except Exception as e:
+                logger.error(f'Error in flush callback: {e}')
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Grava as linhas pendentes e encerra o thread de escrita.
+
+        As linhas que não forem gravadas dentro de `timeout` falham com
+        `WriterOverloaded`.
+
+        Args:
+            timeout (Optional[float]): Tempo máximo de espera pelo thread.
+        """
+        self._closed = True
+        if self._thread is None:
+            return
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(
+            None if deadline is None
+            else max(deadline - time.monotonic(), 0)
+        )
+        self._fail_pending()
+
+    def _fail_pending(self) -> None:
+        failed = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(WriterOverloaded('Writer encerrado'))
+                failed += 1
+        if failed:
+            logger.warning(f'Failed {failed} rows still queued at shutdown')
+        if self._thread.is_alive():
+            # Acorda o thread caso ele ainda aguarde a fila
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                pass
+
+
+def _invalidate_counts(rows: List[Dict[str, Any]]) -> None:
+    """Invalida a contagem de clientes dos tenants do lote gravado."""
+    tenants = {
+        row.get('tenant_id', tenancy.DEFAULT_TENANT) for row in rows
+    }
+    cache.invalidate(
+        [repository.count_cache_key(tenant) for tenant in tenants]
+    )
+
+
+_writer: Optional[GroupCommitWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_customer_writer() -> Optional[GroupCommitWriter]:
+    """Retorna o writer de clientes do processo, ou None se desabilitado.
+
+    Habilitado quando `GROUP_COMMIT_DELAY_MS` é maior que zero; o tamanho
+    do lote e da fila vêm de `GROUP_COMMIT_MAX_BATCH` (padrão 100) e
+    `GROUP_COMMIT_MAX_QUEUE` (padrão 1000).
+
+    Returns:
+        Optional[GroupCommitWriter]: O writer configurado.
+    """
+    global _writer
+    delay_ms = float(env.get('GROUP_COMMIT_DELAY_MS', '0'))
+    if delay_ms <= 0:
+        return None
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = GroupCommitWriter(
+                    lambda: SessionLocal(bind=get_engine()),
+                    models.Customer,
+                    max_batch=int(env.get('GROUP_COMMIT_MAX_BATCH', '100')),
+                    max_delay=delay_ms / 1000,
+                    max_queue=int(env.get('GROUP_COMMIT_MAX_QUEUE', '1000')),
+                    on_flush=_invalidate_counts,
+                )
+    return _writer
+
+
+def close_customer_writer(timeout: Optional[float] = None) -> None:
+    """Grava as linhas pendentes e encerra o writer de clientes, se ativo.
+
+    Args:
+        timeout (Optional[float]): Tempo máximo de espera pelo writer.
+    """
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close(timeout)
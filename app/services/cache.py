@@ -0,0 +1,619 @@
+"""Backends de cache compartilháveis entre workers.
+
+Todos os backends implementam `CacheBackend`:
+
+- `LRUCache`: em memória, por processo.
+- `SQLiteCache`: arquivo SQLite compartilhado pelos workers de um mesmo nó
+  (por padrão em `/dev/shm`, ou seja, em memória compartilhada).
+- `RedisCache`: servidor compatível com Redis, compartilhado entre pods.
+  O cliente `redis` é opcional e só é importado quando esse backend é
+  escolhido.
+
+Invalidações são publicadas com `invalidate()`: a chave é removida do
+armazenamento e todos os assinantes (`subscribe()`), inclusive os de outros
+processos, são notificados. `TieredCache` usa isso para manter um cache
+local (L1) na frente de um backend compartilhado sem servir dados
+desatualizados após uma escrita. As invalidações também avançam a geração
+da chave (`generation`): quem grava o resultado de uma consulta lenta usa
+`add_if_unchanged` para não gravar um valor que uma escrita concorrente já
+invalidou.
+
+Os valores precisam ser serializáveis em JSON.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from os import environ as env
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+from ..tools.logging import logger
+
+InvalidationCallback = Callable[[List[str]], None]
+
+
+class CacheBackend(ABC):
+    """Interface comum dos backends de cache."""
+
+    # Quantas chaves invalidadas têm a geração guardada individualmente
+    _GENERATIONS = 10000
+
+    def __init__(self) -> None:
+        self._subscribers: List[InvalidationCallback] = []
+        self._generations: 'OrderedDict[str, int]' = OrderedDict()
+        self._generation = 0
+        self._generation_floor = 0
+        self._generation_lock = threading.Lock()
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Retorna o valor da chave, ou None se ausente ou expirado."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Grava o valor da chave, com expiração opcional em segundos."""
+
+    @abstractmethod
+    def delete(self, *keys: str) -> None:
+        """Remove as chaves apenas do armazenamento deste backend."""
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Grava o valor apenas se a chave estiver ausente (ou expirada).
+
+        Os backends deste módulo fazem a operação de forma atômica, de modo
+        que só um processo consegue reservar a chave.
+
+        Returns:
+            bool: Se o valor foi gravado.
+        """
+        if self.get(key) is not None:
+            return False
+        self.set(key, value, ttl)
+        return True
+
+    def generation(self, key: str) -> int:
+        """Retorna a geração da chave, que avança a cada invalidação.
+
+        Inclui as invalidações de outros processos já recebidas (ver
+        `poll`).
+
+        Args:
+            key (str): A chave.
+
+        Returns:
+            int: A geração atual.
+        """
+        self.poll()
+        with self._generation_lock:
+            return self._generations.get(key, self._generation_floor)
+
+    def add_if_unchanged(self, key: str, value: Any, ttl: Optional[float],
+                         generation: int) -> bool:
+        """Grava o valor com `add` se a chave não foi invalidada desde
+        `generation`.
+
+        Example:
+            >>> generation = backend.generation(key)
+            >>> value = slow_query()
+            >>> backend.add_if_unchanged(key, value, ttl, generation)
+
+        Returns:
+            bool: Se o valor foi gravado.
+        """
+        if self.generation(key) != generation:
+            return False
+        return self.add(key, value, ttl)
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove todas as chaves."""
+
+    def subscribe(self, callback: InvalidationCallback) -> None:
+        """Registra um callback chamado a cada invalidação publicada.
+
+        Args:
+            callback (InvalidationCallback): Recebe a lista de chaves
+            invalidadas.
+        """
+        self._subscribers.append(callback)
+
+    def poll(self) -> None:
+        """Processa invalidações pendentes de outros processos, se houver."""
+
+    def invalidate(self, *keys: str) -> None:
+        """Remove as chaves e notifica todos os assinantes.
+
+        Args:
+            *keys (str): As chaves a invalidar.
+        """
+        if not keys:
+            return
+        self.delete(*keys)
+        self._advance(keys)
+        self._publish(list(keys))
+
+    def _publish(self, keys: List[str]) -> None:
+        self._notify(keys)
+
+    def _advance(self, keys: Iterable[str]) -> None:
+        with self._generation_lock:
+            for key in keys:
+                self._generation += 1
+                self._generations[key] = self._generation
+                self._generations.move_to_end(key)
+            while len(self._generations) > self._GENERATIONS:
+                # Chaves esquecidas assumem a maior geração descartada
+                _, dropped = self._generations.popitem(last=False)
+                self._generation_floor = max(self._generation_floor, dropped)
+
+    def _notify(self, keys: List[str]) -> None:
+        self._advance(keys)
+        for callback in list(self._subscribers):
+            try:
+                callback(keys)
+            except Exception as e:
+                logger.error(f'Error in cache invalidation callback: {e}')
+
+
+class LRUCache(CacheBackend):
+    """Cache em memória do processo, com política LRU e TTL.
+
+    Attributes:
+        maxsize (int): Número máximo de chaves mantidas.
+        ttl (Optional[float]): Expiração padrão, em segundos.
+    """
+
+    def __init__(self, maxsize: int = 1024,
+                 ttl: Optional[float] = None) -> None:
+        super().__init__()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: 'OrderedDict[str, Tuple[Any, Optional[float]]]' = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        ttl = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and (item[1] is None or item[1] > now):
+                return False
+            self._data[key] = (value, now + ttl if ttl is not None else None)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return True
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache(CacheBackend):
+    """Cache em arquivo SQLite, compartilhado pelos processos do nó.
+
+    As invalidações são registradas em uma tabela de log; cada instância
+    lê as entradas novas no máximo a cada `poll_interval` segundos (durante
+    `get`) e notifica os seus assinantes.
+
+    As entradas expiradas só são removidas quando lidas; por isso, a cada
+    `purge_interval` segundos uma escrita apaga as expiradas e, acima de
+    `max_entries` linhas, as mais próximas de expirar.
+
+    Attributes:
+        path (str): Caminho do arquivo SQLite.
+        poll_interval (float): Intervalo mínimo entre leituras do log de
+        invalidações.
+        max_entries (Optional[int]): Número máximo de linhas mantidas.
+        purge_interval (float): Intervalo entre as limpezas, em segundos.
+    """
+
+    _RETENTION = 60.0
+
+    def __init__(self, path: str, poll_interval: float = 0.5,
+                 max_entries: Optional[int] = None,
+                 purge_interval: float = 60.0) -> None:
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_interval
+        self.max_entries = max_entries
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._last_poll = 0.0
+        self._last_purge = time.monotonic()
+        with self._connection() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entries ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache_invalidations ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, keys TEXT NOT NULL, '
+                'created_at REAL NOT NULL)'
+            )
+            row = conn.execute(
+                'SELECT COALESCE(MAX(id), 0) FROM cache_invalidations'
+            ).fetchone()
+        self._last_seen = row[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        self.poll()
+        row = self._connection().execute(
+            'SELECT value, expires_at FROM cache_entries WHERE key = ?',
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            self.delete(key)
+            return None
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._purge_if_due()
+        expires_at = time.time() + ttl if ttl is not None else None
+        self._connection().execute(
+            'INSERT OR REPLACE INTO cache_entries (key, value, expires_at) '
+            'VALUES (?, ?, ?)',
+            (key, json.dumps(value), expires_at)
+        )
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        self._purge_if_due()
+        now = time.time()
+        cursor = self._connection().execute(
+            'INSERT INTO cache_entries (key, value, expires_at) '
+            'VALUES (?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+            'value = excluded.value, expires_at = excluded.expires_at '
+            'WHERE cache_entries.expires_at <= ?',
+            (key, json.dumps(value),
+             now + ttl if ttl is not None else None, now)
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, *keys: str) -> None:
+        self._connection().executemany(
+            'DELETE FROM cache_entries WHERE key = ?', [(k,) for k in keys]
+        )
+
+    def clear(self) -> None:
+        self._connection().execute('DELETE FROM cache_entries')
+
+    def _purge_if_due(self) -> None:
+        now = time.monotonic()
+        if now - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = now
+        self.purge()
+
+    def purge(self) -> int:
+        """Remove as entradas expiradas e as excedentes de `max_entries`.
+
+        Returns:
+            int: O número de entradas removidas.
+        """
+        conn = self._connection()
+        removed = conn.execute(
+            'DELETE FROM cache_entries WHERE expires_at <= ?', (time.time(),)
+        ).rowcount
+        if self.max_entries is not None:
+            # Sem registro de acesso: saem primeiro as que expiram antes
+            removed += conn.execute(
+                'DELETE FROM cache_entries WHERE key IN ('
+                'SELECT key FROM cache_entries '
+                'ORDER BY expires_at IS NULL, expires_at '
+                'LIMIT MAX((SELECT COUNT(*) FROM cache_entries) - ?, 0))',
+                (self.max_entries,)
+            ).rowcount
+        return removed
+
+    def _publish(self, keys: List[str]) -> None:
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            'INSERT INTO cache_invalidations (keys, created_at) VALUES (?, ?)',
+            (json.dumps(keys), now)
+        )
+        conn.execute(
+            'DELETE FROM cache_invalidations WHERE created_at < ?',
+            (now - self._RETENTION,)
+        )
+        self.poll(force=True)
+
+    def generation(self, key: str) -> int:
+        # Sem o intervalo do poll: a consulta ao log é barata
+        self.poll(force=True)
+        return super().generation(key)
+
+    def poll(self, force: bool = False) -> None:
+        """Lê o log de invalidações e notifica os assinantes locais.
+
+        Args:
+            force (bool): Ignora o `poll_interval`.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_poll < self.poll_interval:
+            return
+        self._last_poll = now
+        rows = self._connection().execute(
+            'SELECT id, keys FROM cache_invalidations WHERE id > ? '
+            'ORDER BY id',
+            (self._last_seen,)
+        ).fetchall()
+        for row_id, keys in rows:
+            self._last_seen = row_id
+            self._notify(json.loads(keys))
+
+
+class RedisCache(CacheBackend):
+    """Cache em um servidor compatível com Redis.
+
+    As invalidações são publicadas em um canal pub/sub; a primeira chamada a
+    `subscribe` inicia uma thread que escuta o canal.
+
+    Attributes:
+        client: Cliente compatível com `redis.Redis`.
+        prefix (str): Prefixo aplicado a todas as chaves.
+        channel (str): Canal pub/sub das invalidações.
+    """
+
+    def __init__(self, client, prefix: str = 'auth:',
+                 channel: str = 'auth:invalidations') -> None:
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+        self.channel = channel
+        self._listener: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'RedisCache':
+        """Cria o backend a partir de uma URL `redis://`.
+
+        Raises:
+            RuntimeError: Se o pacote `redis` não estiver instalado.
+        """
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                'O backend de cache redis requer o pacote "redis"'
+            ) from e
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        px = int(ttl * 1000) if ttl is not None else None
+        self.client.set(self.prefix + key, json.dumps(value), px=px)
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        px = int(ttl * 1000) if ttl is not None else None
+        return bool(self.client.set(
+            self.prefix + key, json.dumps(value), px=px, nx=True
+        ))
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def subscribe(self, callback: InvalidationCallback) -> None:
+        super().subscribe(callback)
+        self._ensure_listener()
+
+    def generation(self, key: str) -> int:
+        # As invalidações de outros processos chegam pela thread de escuta
+        self._ensure_listener()
+        return super().generation(key)
+
+    def _ensure_listener(self) -> None:
+        if self._listener is not None:
+            return
+        with self._generation_lock:
+            if self._listener is None:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                self._listener = threading.Thread(
+                    target=self._listen, args=(pubsub,),
+                    name='cache-invalidations', daemon=True
+                )
+                self._listener.start()
+
+    def _publish(self, keys: List[str]) -> None:
+        # Os assinantes (inclusive os deste processo) são notificados pela
+        # thread de escuta ao receber a mensagem
+        self.client.publish(self.channel, json.dumps(keys))
+
+    def _listen(self, pubsub) -> None:
+        for message in pubsub.listen():
+            if message.get('type') == 'message':
+                self._notify(json.loads(message['data']))
+
+
+class TieredCache(CacheBackend):
+    """Cache local (L1) na frente de um backend compartilhado (L2).
+
+    Leituras consultam o L1 antes do L2; invalidações são publicadas pelo L2
+    e, via assinatura, removem a chave do L1 de todos os processos.
+
+    Attributes:
+        local (LRUCache): O cache do processo.
+        shared (CacheBackend): O backend compartilhado.
+    """
+
+    def __init__(self, local: LRUCache, shared: CacheBackend) -> None:
+        super().__init__()
+        self.local = local
+        self.shared = shared
+        shared.subscribe(self._on_invalidation)
+
+    def _on_invalidation(self, keys: List[str]) -> None:
+        self.local.delete(*keys)
+        self._notify(keys)
+
+    def get(self, key: str) -> Optional[Any]:
+        self.shared.poll()
+        value = self.local.get(key)
+        if value is None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.shared.set(key, value, ttl)
+        self.local.set(key, value, ttl)
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        # A reserva vale entre processos: só o L2 decide
+        self.local.delete(key)
+        return self.shared.add(key, value, ttl)
+
+    def delete(self, *keys: str) -> None:
+        self.local.delete(*keys)
+        self.shared.delete(*keys)
+
+    def generation(self, key: str) -> int:
+        return self.shared.generation(key)
+
+    def clear(self) -> None:
+        self.local.clear()
+        self.shared.clear()
+
+    def invalidate(self, *keys: str) -> None:
+        self.local.delete(*keys)
+        self.shared.invalidate(*keys)
+
+
+def cache_key(*parts: Any) -> str:
+    """Monta uma chave de cache a partir das partes informadas.
+
+    Example:
+        >>> cache_key('customers', 'cpf', '123')
+        'customers:cpf:123'
+    """
+    return ':'.join(str(part) for part in parts)
+
+
+def _default_sqlite_path() -> str:
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else (
+        tempfile.gettempdir()
+    )
+    return os.path.join(directory, 'auth-service-cache.sqlite3')
+
+
+def create_cache() -> CacheBackend:
+    """Cria o backend de cache configurado pelas variáveis de ambiente.
+
+    - `CACHE_BACKEND`: `memory` (padrão), `sqlite` ou `redis`.
+    - `CACHE_MAX_ENTRIES`: tamanho do LRU em memória (padrão 10000).
+    - `CACHE_PATH`: arquivo do backend `sqlite`.
+    - `CACHE_SQLITE_MAX_ENTRIES`: linhas mantidas pelo backend `sqlite`
+      (padrão 100000).
+    - `CACHE_URL`: URL do backend `redis`.
+    - `CACHE_LOCAL_TTL`: quando maior que zero, adiciona um L1 em memória
+      com esse TTL na frente dos backends `sqlite` e `redis`.
+
+    Returns:
+        CacheBackend: O backend configurado.
+    """
+    backend = env.get('CACHE_BACKEND', 'memory').lower()
+    max_entries = int(env.get('CACHE_MAX_ENTRIES', '10000'))
+    local_ttl = float(env.get('CACHE_LOCAL_TTL', '0'))
+
+    if backend == 'memory':
+        return LRUCache(maxsize=max_entries)
+    if backend == 'sqlite':
+        shared: CacheBackend = SQLiteCache(
+            env.get('CACHE_PATH') or _default_sqlite_path(),
+            max_entries=int(env.get('CACHE_SQLITE_MAX_ENTRIES', '100000')),
+        )
+    elif backend == 'redis':
+        shared = RedisCache.from_url(
+            env.get('CACHE_URL', 'redis://localhost:6379/0')
+        )
+    else:
+        raise ValueError(f'CACHE_BACKEND inválido: {backend}')
+
+    if local_ttl > 0:
+        return TieredCache(LRUCache(max_entries, ttl=local_ttl), shared)
+    return shared
+
+
+_cache: Optional[CacheBackend] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> CacheBackend:
+    """Retorna o cache do processo, criando-o no primeiro uso."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = create_cache()
+    return _cache
+
+
+def set_cache(cache: Optional[CacheBackend]) -> None:
+    """Substitui o cache do processo (útil em testes)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def invalidate(keys: Iterable[str]) -> None:
+    """Invalida as chaves no cache do processo e em todos os assinantes."""
+    keys = [key for key in keys if key]
+    if keys:
+        get_cache().invalidate(*keys)
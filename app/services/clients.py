@@ -0,0 +1,292 @@
+"""Clientes de serviço e o fluxo OAuth2 `client_credentials`.
+
+Serviços internos se autenticam com `client_id` e `client_secret` em vez
+de usuário e senha. Os segredos são gerados aleatoriamente (256 bits), então
+basta guardar o seu HMAC-SHA256 e compará-lo em tempo constante: a
+verificação leva microssegundos, sem o bcrypt do login de usuários.
+
+Os clientes ativos ficam em memória (`ClientRegistry`), recarregados do
+banco a cada `refresh_interval` segundos ou quando a chave `clients` é
+invalidada no cache (por exemplo, ao registrar um cliente). Os tokens
+emitidos também ficam em cache e são reaproveitados enquanto tiverem mais da
+metade da validade, de modo que a emissão não precise de banco nem de uma
+nova assinatura. O `sub` desses tokens é `client:<client_id>`, separado dos
+IDs de clientes (usuários).
+"""
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from datetime import timedelta
+from os import environ as env
+from typing import (
+    Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+)
+
+from sqlalchemy.orm import Session
+
+from ..database.database import SessionLocal, get_engine
+from ..tools.logging import logger
+from . import cache, repository, security, tenancy
+
+CLIENTS_CACHE_KEY = cache.cache_key('clients')
+
+
+class InvalidClient(Exception):
+    """Cliente desconhecido, inativo ou com segredo incorreto."""
+
+
+class InvalidScope(Exception):
+    """Escopo solicitado não permitido ao cliente."""
+
+
+def hash_secret(secret: str) -> str:
+    """Calcula o HMAC-SHA256 do segredo de um cliente.
+
+    A chave do HMAC vem de `CLIENT_SECRET_KEY` (padrão: `SECRET_KEY`).
+
+    Args:
+        secret (str): O segredo em texto claro.
+
+    Returns:
+        str: O HMAC em hexadecimal.
+    """
+    key = (env.get('CLIENT_SECRET_KEY') or security.SECRET_KEY).encode()
+    return hmac.new(key, secret.encode(), hashlib.sha256).hexdigest()
+
+
+class RegisteredClient(NamedTuple):
+    """Cliente de serviço carregado em memória."""
+
+    client_id: str
+    secret_hash: str
+    tenant_id: str
+    scope: str
+
+    @property
+    def scopes(self) -> FrozenSet[str]:
+        """Os escopos que o cliente pode solicitar."""
+        return frozenset(self.scope.split())
+
+    def verify_secret(self, secret: str) -> bool:
+        """Compara o segredo informado em tempo constante."""
+        return hmac.compare_digest(self.secret_hash, hash_secret(secret))
+
+
+class IssuedToken(NamedTuple):
+    """Token emitido para um cliente de serviço."""
+
+    access_token: str
+    expires_at: float
+    scope: str
+
+
+def load_clients() -> List[RegisteredClient]:
+    """Carrega do banco os clientes de serviço ativos."""
+    db = SessionLocal(bind=get_engine())
+    try:
+        return [
+            RegisteredClient(row.client_id, row.secret_hash, row.tenant_id,
+                             row.scope)
+            for row in repository.get_active_clients(db)
+        ]
+    finally:
+        db.close()
+
+
+class ClientRegistry:
+    """Clientes de serviço em memória, com recarga periódica.
+
+    Attributes:
+        loader (Callable[[], Iterable[RegisteredClient]]): Carrega os
+        clientes ativos.
+        refresh_interval (float): Intervalo entre as recargas, em segundos.
+        token_ttl (timedelta): Validade dos tokens emitidos.
+    """
+
+    def __init__(self,
+                 loader: Callable[[], Iterable[RegisteredClient]] = (
+                     load_clients),
+                 refresh_interval: float = 30.0,
+                 token_ttl: timedelta = timedelta(minutes=60)) -> None:
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self.token_ttl = token_ttl
+        self._clients: Dict[str, RegisteredClient] = {}
+        self._tokens: Dict[Tuple[str, str], IssuedToken] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._reloading = False
+
+    @property
+    def loaded(self) -> bool:
+        """Se os clientes já foram carregados ao menos uma vez."""
+        return self._loaded_at is not None
+
+    def reload(self) -> None:
+        """Recarrega os clientes e descarta os tokens em cache."""
+        clients = {client.client_id: client for client in self.loader()}
+        with self._lock:
+            self._clients = clients
+            self._tokens = {}
+            self._loaded_at = time.monotonic()
+        logger.info(f'Loaded {len(clients)} service clients')
+
+    def mark_stale(self) -> None:
+        """Força a recarga na próxima consulta."""
+        with self._lock:
+            if self._loaded_at is not None:
+                self._loaded_at = 0.0
+
+    def on_invalidate(self, keys: List[str]) -> None:
+        """Callback de invalidação do cache (`cache.subscribe`)."""
+        if CLIENTS_CACHE_KEY in keys:
+            self.mark_stale()
+
+    def refresh_if_stale(self) -> None:
+        """Recarrega os clientes em segundo plano se o intervalo passou.
+
+        Enquanto a recarga acontece, as consultas usam a versão anterior.
+        """
+        with self._lock:
+            if (self._loaded_at is None or self._reloading
+                    or time.monotonic() - self._loaded_at
+                    < self.refresh_interval):
+                return
+            self._reloading = True
+
+        def run() -> None:
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f'Error reloading service clients: {e}')
+            finally:
+                with self._lock:
+                    self._reloading = False
+
+        threading.Thread(
+            target=run, name='client-registry-reload', daemon=True
+        ).start()
+
+    def authenticate(self, client_id: str,
+                     client_secret: str) -> RegisteredClient:
+        """Valida as credenciais de um cliente.
+
+        Args:
+            client_id (str): O identificador do cliente.
+            client_secret (str): O segredo informado.
+
+        Raises:
+            InvalidClient: Se o cliente não existir ou o segredo não
+            conferir.
+
+        Returns:
+            RegisteredClient: O cliente autenticado.
+        """
+        self.refresh_if_stale()
+        client = self._clients.get(client_id)
+        if client is None:
+            # Mesmo custo para clientes inexistentes
+            hash_secret(client_secret)
+            raise InvalidClient(client_id)
+        if not client.verify_secret(client_secret):
+            raise InvalidClient(client_id)
+        return client
+
+    def issue_token(self, client: RegisteredClient,
+                    scope: Optional[str] = None) -> IssuedToken:
+        """Emite (ou reaproveita) um token para o cliente.
+
+        Args:
+            client (RegisteredClient): O cliente autenticado.
+            scope (Optional[str]): Os escopos solicitados; todos os
+            permitidos ao cliente quando omitido.
+
+        Raises:
+            InvalidScope: Se algum escopo não for permitido ao cliente.
+
+        Returns:
+            IssuedToken: O token, a sua expiração e os escopos concedidos.
+        """
+        requested = frozenset(scope.split()) if scope else client.scopes
+        if not requested <= client.scopes:
+            raise InvalidScope(' '.join(sorted(requested - client.scopes)))
+        granted = ' '.join(sorted(requested))
+
+        key = (client.client_id, granted)
+        now = time.time()
+        issued = self._tokens.get(key)
+        ttl = self.token_ttl.total_seconds()
+        if issued is not None and issued.expires_at - now > ttl / 2:
+            return issued
+
+        access_token = security.create_access_token(
+            data={
+                'sub': security.SERVICE_SUBJECT_PREFIX + client.client_id,
+                tenancy.TENANT_CLAIM: client.tenant_id,
+                'role': security.ROLE_SERVICE,
+                'scope': granted,
+            },
+            expires_delta=self.token_ttl,
+        )
+        issued = IssuedToken(access_token, now + ttl, granted)
+        self._tokens[key] = issued
+        return issued
+
+
+def register_client(
+    db: Session, client_id: str, scope: str = '',
+    tenant_id: str = tenancy.DEFAULT_TENANT
+) -> str:
+    """Registra um cliente de serviço e retorna o seu segredo.
+
+    O segredo só existe em texto claro neste retorno. Os registros de
+    clientes dos workers são avisados pela invalidação da chave `clients`.
+
+    Args:
+        db (Session): Sessão do banco de dados.
+        client_id (str): O identificador do cliente.
+        scope (str): Os escopos permitidos, separados por espaço.
+        tenant_id (str): O tenant do cliente.
+
+    Returns:
+        str: O segredo gerado.
+    """
+    secret = secrets.token_urlsafe(32)
+    repository.create_client(
+        db, client_id, hash_secret(secret), scope=scope, tenant_id=tenant_id
+    )
+    cache.invalidate([CLIENTS_CACHE_KEY])
+    return secret
+
+
+_registry: Optional[ClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ClientRegistry:
+    """Retorna o registro de clientes do processo, criando-o no primeiro
+    uso.
+
+    Configurado por `CLIENT_REGISTRY_REFRESH` (segundos entre recargas,
+    padrão 30) e `CLIENT_TOKEN_EXPIRE_MINUTES` (padrão 60).
+
+    Returns:
+        ClientRegistry: O registro compartilhado pelo processo.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                registry = ClientRegistry(
+                    refresh_interval=float(
+                        env.get('CLIENT_REGISTRY_REFRESH', '30')
+                    ),
+                    token_ttl=timedelta(minutes=int(
+                        env.get('CLIENT_TOKEN_EXPIRE_MINUTES', '60')
+                    )),
+                )
+                cache.get_cache().subscribe(registry.on_invalidate)
+                _registry = registry
+    return _registry
@@ -0,0 +1,213 @@
+"""Verificações de prontidão (readiness) do worker.
+
+`/readyz` deve ser barato: o Kubernetes o consulta a cada poucos segundos
+em todos os pods. A conexão com o banco é testada no máximo uma vez por
+`db_cache_ttl` segundos e as requisições simultâneas compartilham o mesmo
+teste; a saturação do pool de conexões e a fila do bcrypt são lidas da
+memória.
+
+O teste do banco usa uma conexão própria, fora do pool, com o tempo de
+conexão e de consulta limitados no próprio driver (`connect_timeout` e
+`statement_timeout` no Postgres), de modo que um banco travado não prenda
+threads indefinidamente; enquanto um teste não termina, nenhum outro é
+iniciado.
+"""
+import asyncio
+import math
+import time
+from os import environ as env
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+
+from ..database.database import get_engine
+from ..tools.logging import logger
+from . import kdf
+
+
+def pool_capacity(engine: Engine) -> Optional[int]:
+    """Retorna o número máximo de conexões do pool.
+
+    Args:
+        engine (Engine): A engine cujo pool é inspecionado.
+
+    Returns:
+        Optional[int]: `pool_size + max_overflow`, ou None se o pool não
+        tiver limite.
+    """
+    pool = engine.pool
+    size = getattr(pool, 'size', None)
+    if size is None or getattr(pool, 'checkedout', None) is None:
+        return None
+    max_overflow = getattr(pool, '_max_overflow', 0)
+    if max_overflow < 0:
+        return None
+    return size() + max_overflow
+
+
+def pool_saturation(engine: Engine) -> Optional[float]:
+    """Retorna a fração das conexões do pool em uso.
+
+    Args:
+        engine (Engine): A engine cujo pool é inspecionado.
+
+    Returns:
+        Optional[float]: De 0 a 1, ou None se o pool não tiver limite.
+    """
+    capacity = pool_capacity(engine)
+    if not capacity:
+        return None
+    return engine.pool.checkedout() / capacity
+
+
+class ReadinessProbe:
+    """Avalia se o worker deve receber tráfego.
+
+    Attributes:
+        engine_factory (Callable[[], Engine]): Retorna a engine do banco.
+        db_cache_ttl (float): Validade do último teste do banco, em
+        segundos.
+        db_timeout (float): Tempo máximo do teste do banco, em segundos.
+        max_pool_saturation (float): Saturação do pool acima da qual o
+        worker deixa de estar pronto.
+        max_kdf_queue (int): Tamanho da fila do bcrypt acima do qual o
+        worker deixa de estar pronto.
+    """
+
+    def __init__(self, engine_factory: Callable[[], Engine] = get_engine,
+                 db_cache_ttl: float = 2.0, db_timeout: float = 1.0,
+                 max_pool_saturation: float = 1.0,
+                 max_kdf_queue: Optional[int] = None) -> None:
+        self.engine_factory = engine_factory
+        self.db_cache_ttl = db_cache_ttl
+        self.db_timeout = db_timeout
+        self.max_pool_saturation = max_pool_saturation
+        self.max_kdf_queue = max_kdf_queue
+        self._db_result: Optional[Tuple[float, bool]] = None
+        self._db_check: Optional[asyncio.Future] = None
+        self._ping_running = False
+
+    def _ping(self) -> bool:
+        engine = self.engine_factory()
+        dialect = engine.dialect
+        cargs, cparams = dialect.create_connect_args(engine.url)
+        if dialect.name == 'postgresql':
+            # A libpq arredonda para segundos inteiros, com mínimo de 2
+            cparams['connect_timeout'] = max(2, math.ceil(self.db_timeout))
+        elif dialect.name == 'sqlite':
+            cparams['timeout'] = self.db_timeout
+        connection = dialect.connect(*cargs, **cparams)
+        try:
+            cursor = connection.cursor()
+            if dialect.name == 'postgresql':
+                cursor.execute(
+                    f'SET statement_timeout = {int(self.db_timeout * 1000)}'
+                )
+            cursor.execute('SELECT 1')
+            cursor.fetchall()
+            cursor.close()
+        finally:
+            connection.close()
+        return True
+
+    def _ping_once(self) -> bool:
+        self._ping_running = True
+        try:
+            return self._ping()
+        finally:
+            self._ping_running = False
+
+    async def _run_db_check(self) -> bool:
+        if self._ping_running:
+            # O teste anterior expirou e ainda ocupa um thread
+            logger.warning('Readiness: teste anterior do banco em execução')
+            return False
+        try:
+            return await asyncio.wait_for(
+                asyncio.to_thread(self._ping_once), self.db_timeout
+            )
+        except Exception as e:
+            logger.warning(f'Readiness: banco indisponível: {e}')
+            return False
+
+    async def check_database(self) -> bool:
+        """Testa a conexão com o banco, usando o resultado em cache.
+
+        Returns:
+            bool: Se o banco respondeu.
+        """
+        now = time.monotonic()
+        if self._db_result is not None:
+            checked_at, reachable = self._db_result
+            if now - checked_at < self.db_cache_ttl:
+                return reachable
+        loop = asyncio.get_running_loop()
+        if (self._db_check is None or self._db_check.done()
+                or self._db_check.get_loop() is not loop):
+            self._db_check = asyncio.ensure_future(self._run_db_check())
+        reachable = await asyncio.shield(self._db_check)
+        self._db_result = (time.monotonic(), reachable)
+        return reachable
+
+    async def check(self, draining: bool = False
+                    ) -> Tuple[bool, Dict[str, Any]]:
+        """Executa todas as verificações.
+
+        Args:
+            draining (bool): Se o worker está encerrando.
+
+        Returns:
+            Tuple[bool, Dict[str, Any]]: Se o worker está pronto e os
+            detalhes de cada verificação.
+        """
+        database = await self.check_database()
+        saturation = pool_saturation(self.engine_factory())
+        kdf_pool = kdf.get_kdf_pool()
+        max_kdf_queue = self.max_kdf_queue
+        if max_kdf_queue is None:
+            max_kdf_queue = 4 * kdf_pool.max_workers
+
+        checks = {
+            'draining': draining,
+            'database': database,
+            'pool_saturation': saturation,
+            'kdf_queue_depth': kdf_pool.queue_depth,
+        }
+        ready = (
+            not draining
+            and database
+            and (saturation is None
+                 or saturation < self.max_pool_saturation)
+            and kdf_pool.queue_depth <= max_kdf_queue
+        )
+        return ready, checks
+
+
+_probe: Optional[ReadinessProbe] = None
+
+
+def get_probe() -> ReadinessProbe:
+    """Retorna a verificação de prontidão do processo.
+
+    Configurada por `READINESS_DB_CACHE_MS` (padrão 2000),
+    `READINESS_DB_TIMEOUT_MS` (padrão 1000),
+    `READINESS_MAX_POOL_SATURATION` (padrão 1.0, pool esgotado) e
+    `READINESS_MAX_KDF_QUEUE` (padrão: 4 vezes `KDF_WORKERS`).
+
+    Returns:
+        ReadinessProbe: A verificação configurada.
+    """
+    global _probe
+    if _probe is None:
+        max_kdf_queue = env.get('READINESS_MAX_KDF_QUEUE')
+        _probe = ReadinessProbe(
+            db_cache_ttl=int(env.get('READINESS_DB_CACHE_MS', '2000')) / 1000,
+            db_timeout=int(env.get('READINESS_DB_TIMEOUT_MS', '1000')) / 1000,
+            max_pool_saturation=float(
+                env.get('READINESS_MAX_POOL_SATURATION', '1.0')
+            ),
+            max_kdf_queue=(
+                int(max_kdf_queue) if max_kdf_queue is not None else None
+            ),
+        )
+    return _probe
@@ -0,0 +1,248 @@
+"""Chaves de idempotência (`Idempotency-Key`) das rotas de criação.
+
+Totens repetem `POST /customers/register` e `/customers/anonymous` quando a
+resposta demora. Com o cabeçalho `Idempotency-Key`, a primeira requisição
+reserva a chave no backend (`CacheBackend.add`, atômico entre os workers que
+compartilham o backend) e grava a resposta ao terminar; as repetições
+recebem a resposta gravada, sem novo bcrypt nem novo insert.
+
+As chaves ficam em um backend próprio (`create_backend`), separado do cache
+das leituras de clientes, para que as consultas não as removam antes do
+prazo. Em produção ele precisa ser compartilhado (`sqlite` no nó ou `redis`
+entre pods): com o backend em memória, uma repetição atendida por outro
+worker executa de novo, e um aviso é registrado no startup.
+
+Duplicatas que chegam enquanto a original executa no mesmo processo
+aguardam o seu resultado por até `wait_timeout` segundos; se a original
+executa em outro processo, a duplicata é recusada na hora
+(`IdempotencyInProgress`), sem ocupar um thread esperando. Se a original
+falhar, a reserva é desfeita e a próxima tentativa executa de novo.
+
+Cada entrada guarda só a impressão digital do corpo da requisição e o
+corpo da resposta, por `IDEMPOTENCY_TTL` segundos (padrão 24 h).
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from os import environ as env
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..tools.logging import logger
+from . import cache
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+_PENDING = 'pending'
+_DONE = 'done'
+
+
+class IdempotencyConflict(Exception):
+    """A chave já foi usada com um corpo de requisição diferente."""
+
+
+class IdempotencyInProgress(Exception):
+    """A requisição original ainda não terminou."""
+
+
+def idempotency_key(tenant_id: str, subject: str, operation: str,
+                    key: str) -> str:
+    """Chave de cache da `Idempotency-Key`, isolada por tenant, por quem
+    chama e por operação."""
+    return cache.cache_key('idempotency', tenant_id, subject, operation, key)
+
+
+def fingerprint(payload: Any) -> str:
+    """Resumo do corpo da requisição, para detectar chaves reutilizadas.
+
+    Args:
+        payload (Any): O corpo da requisição, serializável em JSON.
+
+    Returns:
+        str: Os primeiros 32 dígitos hexadecimais do SHA-256.
+    """
+    data = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(data.encode()).hexdigest()[:32]
+
+
+class IdempotencyStore:
+    """Executa operações no máximo uma vez por chave.
+
+    Attributes:
+        backend (cache.CacheBackend): Onde as chaves são guardadas.
+        ttl (float): Por quantos segundos a resposta fica gravada.
+        pending_ttl (float): Validade da reserva enquanto a operação
+        executa; expira se o worker morrer no meio.
+        wait_timeout (float): Quanto uma duplicata aguarda a original do
+        mesmo processo.
+    """
+
+    def __init__(self, backend: Optional[cache.CacheBackend] = None,
+                 ttl: float = 86400.0, pending_ttl: float = 30.0,
+                 wait_timeout: float = 10.0) -> None:
+        self.backend = backend if backend is not None else cache.LRUCache()
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+        self.wait_timeout = wait_timeout
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def run(self, key: str, request_fingerprint: str,
+            operation: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Executa a operação, ou devolve a resposta gravada para a chave.
+
+        Args:
+            key (str): A chave (ver `idempotency_key`).
+            request_fingerprint (str): O resumo do corpo da requisição.
+            operation (Callable[[], Any]): Produz a resposta, serializável
+            em JSON.
+
+        Raises:
+            IdempotencyConflict: Se a chave foi usada com outro corpo.
+            IdempotencyInProgress: Se a original executa em outro processo
+            ou não terminou a tempo.
+
+        Returns:
+            Tuple[Any, bool]: A resposta e se ela foi reaproveitada.
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        rechecked = False
+        while True:
+            entry = self.backend.get(key)
+            if entry is None and self.backend.add(
+                key, {'state': _PENDING, 'fp': request_fingerprint},
+                ttl=self.pending_ttl
+            ):
+                body = self._execute(key, request_fingerprint, operation)
+                return body, False
+            if entry is not None:
+                if entry['fp'] != request_fingerprint:
+                    raise IdempotencyConflict(key)
+                if entry['state'] == _DONE:
+                    return entry['body'], True
+            with self._lock:
+                done = self._inflight.get(key)
+            if done is None and not rechecked:
+                # A original local pode ter terminado (ou a reserva vencido)
+                # entre a leitura e aqui: lê a chave mais uma vez
+                rechecked = True
+                continue
+            remaining = deadline - time.monotonic()
+            if done is None or remaining <= 0:
+                # Original em outro processo: o cliente repete mais tarde
+                raise IdempotencyInProgress(key)
+            done.wait(remaining)
+
+    def _execute(self, key: str, request_fingerprint: str,
+                 operation: Callable[[], Any]) -> Any:
+        done = threading.Event()
+        with self._lock:
+            self._inflight[key] = done
+        try:
+            try:
+                body = operation()
+            except Exception:
+                # Sem resposta gravada: a próxima tentativa executa de novo
+                self.backend.delete(key)
+                raise
+            self.backend.set(
+                key,
+                {'state': _DONE, 'fp': request_fingerprint, 'body': body},
+                ttl=self.ttl
+            )
+            return body
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            done.set()
+
+
+def _default_sqlite_path() -> str:
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else (
+        tempfile.gettempdir()
+    )
+    return os.path.join(directory, 'auth-service-idempotency.sqlite3')
+
+
+def create_backend() -> cache.CacheBackend:
+    """Cria o backend das chaves de idempotência.
+
+    - `IDEMPOTENCY_BACKEND`: `memory`, `sqlite` ou `redis` (padrão: o
+      `CACHE_BACKEND`).
+    - `IDEMPOTENCY_PATH`: arquivo do backend `sqlite`, separado do cache.
+    - `IDEMPOTENCY_URL`: URL do backend `redis` (padrão: `CACHE_URL`); as
+      chaves usam o prefixo `auth:idempotency:`.
+    - `IDEMPOTENCY_MAX_ENTRIES`: tamanho do backend `memory` (padrão
+      100000).
+
+    Returns:
+        cache.CacheBackend: O backend configurado.
+    """
+    backend = env.get(
+        'IDEMPOTENCY_BACKEND', env.get('CACHE_BACKEND', 'memory')
+    ).lower()
+    if backend == 'memory':
+        return cache.LRUCache(
+            maxsize=int(env.get('IDEMPOTENCY_MAX_ENTRIES', '100000'))
+        )
+    if backend == 'sqlite':
+        return cache.SQLiteCache(
+            env.get('IDEMPOTENCY_PATH') or _default_sqlite_path()
+        )
+    if backend == 'redis':
+        return cache.RedisCache.from_url(
+            env.get('IDEMPOTENCY_URL')
+            or env.get('CACHE_URL', 'redis://localhost:6379/0'),
+            prefix='auth:idempotency:',
+            channel='auth:idempotency:invalidations',
+        )
+    raise ValueError(f'IDEMPOTENCY_BACKEND inválido: {backend}')
+
+
+_store: Optional[IdempotencyStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> IdempotencyStore:
+    """Retorna o armazenamento de idempotência do processo.
+
+    O backend vem de `create_backend`; com o backend em memória, avisa
+    que as chaves não valem entre workers. Os prazos vêm de
+    `IDEMPOTENCY_TTL` (segundos, padrão 86400), `IDEMPOTENCY_PENDING_TTL`
+    (padrão 30) e `IDEMPOTENCY_WAIT_TIMEOUT` (padrão 10).
+
+    Returns:
+        IdempotencyStore: O armazenamento compartilhado pelo processo.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = create_backend()
+                if isinstance(backend, cache.LRUCache):
+                    logger.warning(
+                        'Idempotency keys are kept in memory and are not '
+                        'shared between workers; set IDEMPOTENCY_BACKEND '
+                        'to sqlite or redis'
+                    )
+                _store = IdempotencyStore(
+                    backend,
+                    ttl=float(env.get('IDEMPOTENCY_TTL', '86400')),
+                    pending_ttl=float(
+                        env.get('IDEMPOTENCY_PENDING_TTL', '30')
+                    ),
+                    wait_timeout=float(
+                        env.get('IDEMPOTENCY_WAIT_TIMEOUT', '10')
+                    ),
+                )
+    return _store
+
+
+def set_store(store: Optional[IdempotencyStore]) -> None:
+    """Substitui o armazenamento do processo (útil em testes)."""
+    global _store
+    with _store_lock:
+        _store = store
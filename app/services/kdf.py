@@ -0,0 +1,218 @@
+"""Pool dedicado às derivações de senha (bcrypt).
+
+O bcrypt é limitado pela CPU e leva dezenas de milissegundos por chamada.
+Executá-lo em um pool próprio, com um thread por núcleo, evita que os
+logins ocupem o threadpool usado pelos endpoints ligados ao banco e torna
+a fila de derivações observável (ver `/readyz`).
+
+Logins de e-mails inexistentes (ou de clientes sem senha) verificam a senha
+contra `DUMMY_HASH`, com o mesmo custo de um login real: o tempo de
+resposta não revela se o e-mail está cadastrado.
+
+Derivações ainda na fila são canceladas quando o cliente desconecta (ver
+`KDFPool.run`): em tempestades de retentativas, o cliente que desistiu
+não deve consumir um núcleo por uma resposta que ninguém vai ler. As que já
+começaram vão até o fim, pois o bcrypt não pode ser interrompido.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from os import environ as env
+from typing import Any, Awaitable, Callable, Optional
+
+from . import security
+
+# Hash bcrypt (custo 12, o padrão do `pwd_context`) de um segredo aleatório
+# descartado. Deve acompanhar o custo dos hashes reais se ele mudar.
+DUMMY_HASH = '$2b$12$frjMiGN.xU3lbTjUaoiy/.qR.V/FDpq2bDtIkon5iELtkJccNMIHi'
+
+# Intervalo, em segundos, entre as verificações de desconexão enquanto a
+# derivação aguarda na fila
+DISCONNECT_POLL_INTERVAL = 0.05
+
+DisconnectCheck = Callable[[], Awaitable[bool]]
+
+
+class ClientDisconnected(Exception):
+    """O cliente desconectou antes de a derivação começar."""
+
+
+class KDFPool:
+    """Executor de derivações de senha com contagem da fila.
+
+    Attributes:
+        max_workers (int): O número de threads do pool.
+        abandoned (int): Derivações canceladas antes de começar (cliente
+        desconectado ou requisição cancelada).
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='kdf'
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._active = 0
+        self.abandoned = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """O número de derivações aguardando um thread livre."""
+        return self._pending - self._active
+
+    @property
+    def active(self) -> int:
+        """O número de derivações em execução."""
+        return self._active
+
+    def submit(self, fn: Callable, *args: Any) -> Future:
+        """Agenda uma derivação no pool.
+
+        Args:
+            fn (Callable): A função de derivação.
+            *args: Os argumentos da função.
+
+        Returns:
+            Future: O resultado da derivação.
+        """
+        def run() -> Any:
+            with self._lock:
+                self._active += 1
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._pending -= 1
+
+        def on_done(future: Future) -> None:
+            # Cancelada na fila: `run` nunca executa
+            if future.cancelled():
+                with self._lock:
+                    self._pending -= 1
+                    self.abandoned += 1
+
+        # O contexto (span atual do tracing) acompanha a derivação
+        context = contextvars.copy_context()
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._executor.submit(context.run, run)
+        except RuntimeError:
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(on_done)
+        return future
+
+    async def run(self, fn: Callable, *args: Any,
+                  is_disconnected: Optional[DisconnectCheck] = None) -> Any:
+        """Executa uma derivação no pool sem bloquear o event loop.
+
+        Enquanto a derivação aguarda na fila, `is_disconnected` é
+        consultado a cada `DISCONNECT_POLL_INTERVAL` segundos; se o cliente
+        desconectou, a derivação é cancelada. Cancelar a tarefa que aguarda
+        também a retira da fila.
+
+        Args:
+            fn (Callable): A função de derivação.
+            *args: Os argumentos da função.
+            is_disconnected (Optional[DisconnectCheck]): Indica se o
+            cliente desconectou (ex.: `Request.is_disconnected`).
+
+        Raises:
+            ClientDisconnected: Se a derivação foi cancelada na fila.
+
+        Returns:
+            Any: O resultado da derivação.
+        """
+        future = self.submit(fn, *args)
+        waiter = asyncio.wrap_future(future)
+        try:
+            if is_disconnected is not None:
+                while not (future.running() or future.done()):
+                    done, _ = await asyncio.wait(
+                        {waiter}, timeout=DISCONNECT_POLL_INTERVAL
+                    )
+                    if (not done and await is_disconnected()
+                            and future.cancel()):
+                        raise ClientDisconnected()
+            return await waiter
+        except asyncio.CancelledError:
+            # Sem efeito se a derivação já começou
+            future.cancel()
+            raise
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Encerra o pool, aguardando as derivações em andamento."""
+        self._executor.shutdown(wait=wait)
+
+
+_pool: Optional[KDFPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_kdf_pool() -> KDFPool:
+    """Retorna o pool de derivações do processo, criando-o no primeiro uso.
+
+    O número de threads vem de `KDF_WORKERS` (padrão: número de CPUs).
+
+    Returns:
+        KDFPool: O pool compartilhado pelo processo.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = KDFPool(
+                    int(env.get('KDF_WORKERS', os.cpu_count() or 1))
+                )
+    return _pool
+
+
+def shutdown_kdf_pool() -> None:
+    """Encerra o pool de derivações, aguardando as que estão em curso."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+async def verify_password(
+    plain_password: str, hashed_password: Optional[str],
+    is_disconnected: Optional[DisconnectCheck] = None
+) -> bool:
+    """Verifica uma senha no pool de derivações.
+
+    Sem hash (usuário inexistente ou sem senha), a senha é verificada
+    contra `DUMMY_HASH` e o resultado é sempre False, com o mesmo custo de
+    uma verificação real.
+
+    Args:
+        plain_password (str): A senha informada.
+        hashed_password (Optional[str]): O hash armazenado, se houver.
+        is_disconnected (Optional[DisconnectCheck]): Indica se o cliente
+        desconectou, para cancelar a derivação ainda na fila.
+
+    Raises:
+        ClientDisconnected: Se o cliente desconectou antes de a derivação
+        começar.
+
+    Returns:
+        bool: Se a senha confere.
+    """
+    pool = get_kdf_pool()
+    if not hashed_password:
+        await pool.run(
+            security.verify_password, plain_password, DUMMY_HASH,
+            is_disconnected=is_disconnected
+        )
+        return False
+    return await pool.run(
+        security.verify_password, plain_password, hashed_password,
+        is_disconnected=is_disconnected
+    )
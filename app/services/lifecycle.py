@@ -0,0 +1,87 @@
+"""Ciclo de vida do worker: drenagem e encerramento ordenado.
+
+Ao receber SIGTERM o worker entra em drenagem (`start_draining`): o
+`/readyz` passa a responder 503 para que o Kubernetes o retire da rotação,
+mas as requisições continuam sendo atendidas por `SERVER_DRAIN_DELAY`
+segundos (ver `app.server`). Depois disso o uvicorn para de aceitar
+conexões, aguarda as requisições em andamento e o `lifespan` chama
+`shutdown_resources`, que libera os recursos na ordem em que deixam de ser
+necessários.
+"""
+import logging
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from ..database.database import dispose_engine
+from ..tools import tracing
+from ..tools.logging import logger
+from . import batch_writer, kdf
+
+_draining = threading.Event()
+
+
+def start_draining() -> None:
+    """Marca o worker como em drenagem (não pronto para novo tráfego)."""
+    if not _draining.is_set():
+        logger.info('Iniciando drenagem: readiness desabilitado')
+    _draining.set()
+
+
+def is_draining() -> bool:
+    """Indica se o worker está em drenagem."""
+    return _draining.is_set()
+
+
+def reset() -> None:
+    """Volta ao estado inicial (usado nos testes)."""
+    _draining.clear()
+
+
+def _flush_logs() -> None:
+    for handler in logging.getLogger().handlers + logger.handlers:
+        handler.flush()
+
+
+def shutdown_resources(timeout: Optional[float] = None) -> List[str]:
+    """Encerra os recursos do worker em ordem.
+
+    1. O pool do bcrypt, aguardando os logins em andamento.
+    2. O writer em lote, gravando as linhas pendentes.
+    3. O tracer, exportando os spans pendentes.
+    4. A engine, fechando as conexões do pool com o banco.
+
+    Ao final os handlers de log são descarregados.
+
+    Falhas em uma etapa são registradas e não impedem as seguintes.
+
+    Args:
+        timeout (Optional[float]): Tempo máximo de espera pelo writer em
+        lote, em segundos.
+
+    Returns:
+        List[str]: As etapas que falharam.
+    """
+    start_draining()
+    steps: List[Tuple[str, Callable[[], None]]] = [
+        ('kdf', kdf.shutdown_kdf_pool),
+        ('batch_writer',
+         lambda: batch_writer.close_customer_writer(timeout)),
+        ('tracing', lambda: tracing.set_tracer(None)),
+        ('database', dispose_engine),
+    ]
+    failed = []
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            failed.append(name)
+            logger.error(f'Erro ao encerrar {name}: {e}')
+            continue
+        logger.info(
+            f'Encerrado {name} em '
+            f'{(time.perf_counter() - started) * 1000:.1f}ms'
+        )
+    _flush_logs()
+    return failed
@@ -0,0 +1,389 @@
+"""Sinais de escalonamento no formato de exposição do Prometheus.
+
+`/metrics` expõe o que satura primeiro neste serviço, para que o HPA (via
+prometheus-adapter) ou o KEDA escalem pela fila do bcrypt e não pela média
+de CPU, que reage tarde:
+
+- fila, derivações ativas e saturação do pool do bcrypt (`kdf`);
+- utilização do threadpool dos endpoints síncronos;
+- saturação do pool de conexões e espera por conexão;
+- requisições em andamento, na fila e recusadas por classe de endpoint
+  (controle de admissão).
+
+No modelo pre-fork (`app.server`) cada worker guarda os próprios valores e
+qualquer um deles pode atender a coleta. Por isso cada worker publica uma
+amostra em `METRICS_MULTIPROC_DIR` (criado pelo supervisor) a cada
+`METRICS_PUBLISH_INTERVAL` segundos, e `/metrics` soma as amostras de todos
+os workers do pod. Os contadores de workers encerrados são consolidados pelo
+supervisor (`mark_process_dead`), de modo que não regridem quando um worker
+é recriado. Sem o diretório (um único processo), só o próprio worker é
+reportado. A amostra é lida no event loop, mas a leitura e a escrita dos
+arquivos rodam em um thread (`asyncio.to_thread`) para não bloqueá-lo.
+"""
+import asyncio
+import glob
+import json
+import os
+import tempfile
+from collections import defaultdict
+from os import environ as env
+from typing import (
+    Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+)
+
+from anyio import to_thread
+
+from ..database.database import get_engine
+from ..database.pool_stats import pool_wait
+from ..tools.logging import logger
+from . import admission, health, kdf
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+MULTIPROC_DIR_ENV = 'METRICS_MULTIPROC_DIR'
+
+# Intervalo, em segundos, entre as publicações da amostra de cada worker
+PUBLISH_INTERVAL = float(env.get('METRICS_PUBLISH_INTERVAL', '1'))
+
+# Contadores dos workers já encerrados, mantidos pelo supervisor
+_ARCHIVE = 'archived.json'
+
+Labels = Dict[str, str]
+Sample = Dict[str, Any]
+
+
+class Metric(NamedTuple):
+    """Uma métrica e as suas amostras (sufixo do nome, labels e valor)."""
+
+    name: str
+    type: str
+    help: str
+    samples: List[Tuple[str, Labels, float]]
+
+
+def sample() -> Sample:
+    """Lê os valores do worker atual.
+
+    Deve ser chamada no event loop (o limitador do threadpool é do loop).
+
+    Returns:
+        Sample: Os valores brutos, serializáveis em JSON.
+    """
+    pool = kdf.get_kdf_pool()
+    limiter = to_thread.current_default_thread_limiter()
+    engine = get_engine()
+    checked_out = getattr(engine.pool, 'checkedout', None)
+    wait_count, wait_sum = pool_wait.snapshot()
+    controller = admission.get_controller()
+    limiters = controller.limiters if controller is not None else {}
+    return {
+        'kdf_workers': pool.max_workers,
+        'kdf_active': pool.active,
+        'kdf_queue_depth': pool.queue_depth,
+        'kdf_abandoned': pool.abandoned,
+        'threadpool_size': limiter.total_tokens,
+        'threadpool_in_use': limiter.borrowed_tokens,
+        'db_checked_out': checked_out() if checked_out else None,
+        'db_capacity': health.pool_capacity(engine),
+        'db_wait_count': wait_count,
+        'db_wait_sum': wait_sum,
+        'admission': {
+            name: {
+                'inflight': limiter.inflight,
+                'queued': limiter.queued,
+                'limit': int(limiter.limit),
+                'rejected': limiter.rejected,
+            }
+            for name, limiter in limiters.items()
+        },
+    }
+
+
+def _counters(values: Sample) -> Dict[str, float]:
+    """Os contadores da amostra, em um dicionário plano."""
+    counters = {
+        'kdf_abandoned': values['kdf_abandoned'],
+        'db_wait_count': values['db_wait_count'],
+        'db_wait_sum': values['db_wait_sum'],
+    }
+    for name, limiter in values['admission'].items():
+        counters[f'admission_rejected:{name}'] = limiter['rejected']
+    return counters
+
+
+def _sum(samples: List[Sample], key: str) -> Optional[float]:
+    values = [s[key] for s in samples]
+    return None if None in values else sum(values)
+
+
+def _ratio(numerator: Optional[float],
+           denominator: Optional[float]) -> Optional[float]:
+    if numerator is None or not denominator:
+        return None
+    return numerator / denominator
+
+
+def _gauge(name: str, help: str, value: Optional[float]) -> Metric:
+    samples = [] if value is None else [('', {}, value)]
+    return Metric(name, 'gauge', help, samples)
+
+
+def aggregate(samples: List[Sample],
+              archived: Optional[Dict[str, float]] = None) -> List[Metric]:
+    """Soma as amostras dos workers nas métricas do pod.
+
+    Os gauges somam os workers vivos e as frações são recalculadas a partir
+    das somas; os contadores incluem os workers já encerrados (`archived`).
+
+    Args:
+        samples (List[Sample]): As amostras dos workers vivos.
+        archived (Optional[Dict[str, float]]): Os contadores consolidados
+        dos workers encerrados.
+
+    Returns:
+        List[Metric]: As métricas agregadas.
+    """
+    counters: Dict[str, float] = defaultdict(float, archived or {})
+    for values in samples:
+        for key, value in _counters(values).items():
+            counters[key] += value
+
+    kdf_workers = _sum(samples, 'kdf_workers')
+    kdf_busy = _sum(samples, 'kdf_active') + _sum(samples, 'kdf_queue_depth')
+    threadpool_size = _sum(samples, 'threadpool_size')
+    threadpool_in_use = _sum(samples, 'threadpool_in_use')
+    db_checked_out = _sum(samples, 'db_checked_out')
+
+    classes: Dict[str, Dict[str, float]] = defaultdict(
+        lambda: defaultdict(float)
+    )
+    for values in samples:
+        for name, limiter in values['admission'].items():
+            for key in ('inflight', 'queued', 'limit'):
+                classes[name][key] += limiter[key]
+    for key, value in counters.items():
+        if key.startswith('admission_rejected:'):
+            classes[key.split(':', 1)[1]]['rejected'] = value
+
+    def per_class(key: str) -> List[Tuple[str, Labels, float]]:
+        return [
+            ('', {'class': name}, classes[name][key])
+            for name in sorted(classes)
+        ]
+
+    return [
+        _gauge('auth_kdf_workers', 'Threads do pool do bcrypt.',
+               kdf_workers),
+        _gauge('auth_kdf_active', 'Derivações bcrypt em execução.',
+               _sum(samples, 'kdf_active')),
+        _gauge('auth_kdf_queue_depth',
+               'Derivações bcrypt aguardando um thread.',
+               _sum(samples, 'kdf_queue_depth')),
+        _gauge('auth_kdf_saturation',
+               'Derivações (ativas e na fila) por thread do bcrypt.',
+               _ratio(kdf_busy, kdf_workers)),
+        Metric('auth_kdf_abandoned_total', 'counter',
+               'Derivações canceladas na fila (cliente desconectado).',
+               [('', {}, counters['kdf_abandoned'])]),
+        _gauge('auth_threadpool_size',
+               'Threads do threadpool dos endpoints síncronos.',
+               threadpool_size),
+        _gauge('auth_threadpool_in_use',
+               'Threads do threadpool em uso.', threadpool_in_use),
+        _gauge('auth_threadpool_utilization',
+               'Fração do threadpool em uso.',
+               _ratio(threadpool_in_use, threadpool_size)),
+        _gauge('auth_db_pool_checked_out', 'Conexões do pool em uso.',
+               db_checked_out),
+        _gauge('auth_db_pool_saturation',
+               'Fração das conexões do pool em uso.',
+               _ratio(db_checked_out, _sum(samples, 'db_capacity'))),
+        Metric('auth_db_pool_wait_seconds', 'summary',
+               'Espera por uma conexão livre do pool.', [
+                   ('_count', {}, counters['db_wait_count']),
+                   ('_sum', {}, counters['db_wait_sum']),
+               ]),
+        Metric('auth_requests_inflight', 'gauge',
+               'Requisições em execução por classe de endpoint.',
+               per_class('inflight')),
+        Metric('auth_requests_queued', 'gauge',
+               'Requisições aguardando vaga por classe de endpoint.',
+               per_class('queued')),
+        Metric('auth_admission_limit', 'gauge',
+               'Limite de concorrência atual por classe de endpoint '
+               '(soma dos workers).', per_class('limit')),
+        Metric('auth_admission_rejected_total', 'counter',
+               'Requisições recusadas pelo controle de admissão.',
+               per_class('rejected')),
+    ]
+
+
+def multiprocess_dir() -> Optional[str]:
+    """O diretório das amostras dos workers, se configurado."""
+    return env.get(MULTIPROC_DIR_ENV) or None
+
+
+def _write_json(path: str, data: Any) -> None:
+    # Escrita atômica: quem lê nunca vê um arquivo pela metade
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(data, file)
+    os.replace(temporary, path)
+
+
+def _read_json(path: str) -> Optional[Any]:
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _sample_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f'{pid}.json')
+
+
+async def publish(directory: Optional[str] = None) -> Sample:
+    """Grava a amostra do worker no diretório compartilhado.
+
+    Deve ser chamada no event loop; a escrita roda em um thread.
+
+    Args:
+        directory (Optional[str]): O diretório; `METRICS_MULTIPROC_DIR`
+        quando omitido.
+
+    Returns:
+        Sample: A amostra gravada.
+    """
+    values = sample()
+    directory = directory or multiprocess_dir()
+    if directory is not None:
+        await asyncio.to_thread(
+            _write_json, _sample_path(directory, os.getpid()), values
+        )
+    return values
+
+
+async def publish_periodically(interval: float = PUBLISH_INTERVAL) -> None:
+    """Publica a amostra do worker até ser cancelada (ver `lifespan`)."""
+    while True:
+        try:
+            await publish()
+        except Exception as e:
+            logger.warning(f'Erro ao publicar as métricas: {e}')
+        await asyncio.sleep(interval)
+
+
+def _collect_from(directory: str, own: Sample) -> List[Metric]:
+    """Grava a amostra do worker e soma as dos demais (roda em um thread)."""
+    own_path = _sample_path(directory, os.getpid())
+    _write_json(own_path, own)
+    samples = [own]
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        if path == own_path or os.path.basename(path) == _ARCHIVE:
+            continue
+        values = _read_json(path)
+        if values is not None:
+            samples.append(values)
+    archived = _read_json(os.path.join(directory, _ARCHIVE)) or {}
+    return aggregate(samples, archived)
+
+
+async def collect() -> List[Metric]:
+    """Coleta as métricas de todos os workers do pod.
+
+    Deve ser chamada no event loop (o limitador do threadpool é do loop);
+    os arquivos dos workers são lidos em um thread.
+
+    Returns:
+        List[Metric]: As métricas agregadas.
+    """
+    directory = multiprocess_dir()
+    own = sample()
+    if directory is None:
+        return aggregate([own])
+    return await asyncio.to_thread(_collect_from, directory, own)
+
+
+def prepare_multiprocess_dir() -> str:
+    """Cria (ou limpa) o diretório das amostras e o exporta aos workers.
+
+    Chamada pelo supervisor antes do fork. Usa `METRICS_MULTIPROC_DIR` se
+    definido; caso contrário, um diretório temporário.
+
+    Returns:
+        str: O diretório.
+    """
+    directory = multiprocess_dir() or tempfile.mkdtemp(prefix='auth-metrics-')
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        os.remove(path)
+    env[MULTIPROC_DIR_ENV] = directory
+    return directory
+
+
+def mark_process_dead(pid: int, directory: Optional[str] = None) -> None:
+    """Consolida os contadores de um worker encerrado.
+
+    Chamada apenas pelo supervisor, o único que escreve o arquivo
+    consolidado. Os gauges do worker deixam de ser somados.
+
+    Args:
+        pid (int): O PID do worker encerrado.
+        directory (Optional[str]): O diretório; `METRICS_MULTIPROC_DIR`
+        quando omitido.
+    """
+    directory = directory or multiprocess_dir()
+    if directory is None:
+        return
+    path = _sample_path(directory, pid)
+    values = _read_json(path)
+    if values is not None:
+        archive_path = os.path.join(directory, _ARCHIVE)
+        archived = _read_json(archive_path) or {}
+        for key, value in _counters(values).items():
+            archived[key] = archived.get(key, 0) + value
+        _write_json(archive_path, archived)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            key, str(value).replace('\\', '\\\\').replace('"', '\\"')
+        )
+        for key, value in labels.items()
+    )
+    return '{' + pairs + '}'
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render(metrics: Iterable[Metric]) -> str:
+    """Formata as métricas no formato de texto do Prometheus.
+
+    Args:
+        metrics (Iterable[Metric]): As métricas a formatar.
+
+    Returns:
+        str: O corpo da resposta de `/metrics`.
+    """
+    lines = []
+    for metric in metrics:
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        for suffix, labels, value in metric.samples:
+            lines.append(
+                f'{metric.name}{suffix}{_format_labels(labels)} '
+                f'{_format_value(value)}'
+            )
+    return '\n'.join(lines) + '\n'
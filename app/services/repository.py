@@ -1,23 +1,102 @@
 import os
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from dotenv import load_dotenv
+from sqlalchemy import Row, case, func, or_
 from sqlalchemy.orm import Session
 
 from ..models import models, schemas
 from ..tools.logging import logger
-from . import security
+from ..tools.tracing import traced
+from . import cache, security, tenancy
 
 load_dotenv()
 
+# Projeção com as colunas de `schemas.Customer`: as leituras retornam tuplas
+# leves (sem `hashed_password` e fora do identity map da sessão).
+CUSTOMER_COLUMNS = (
+    models.Customer.id,
+    models.Customer.name,
+    models.Customer.email,
+    models.Customer.cpf,
+)
+
+# Tempo de vida das leituras de clientes em cache, em segundos
+CUSTOMER_CACHE_TTL = 300.0
+
+
+def negative_lookup_ttl() -> float:
+    """Por quantos segundos a ausência de um cliente fica em cache.
+
+    Poupa o banco em ataques de credential stuffing, mas só é segura com um
+    cache compartilhado por todos os pods: nos demais backends, o cadastro
+    invalida a ausência apenas no próprio processo (ou nó), e os outros
+    continuariam negando o login. Por isso o padrão é 60 com
+    `CACHE_BACKEND=redis` e 0 (desabilitado) nos demais; `NEGATIVE_LOOKUP_TTL`
+    define o valor explicitamente.
+
+    Returns:
+        float: O tempo de vida, em segundos; 0 desabilita.
+    """
+    value = os.getenv('NEGATIVE_LOOKUP_TTL')
+    if value:
+        return float(value)
+    backend = os.getenv('CACHE_BACKEND', 'memory').lower()
+    return 60.0 if backend == 'redis' else 0.0
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """Normaliza um endereço de e-mail para armazenamento e comparação.
+
+    Remove espaços nas extremidades e converte para minúsculas, de modo que
+    a consulta em `lower(email)` use o índice funcional do banco.
+
+    Args:
+        email (Optional[str]): O endereço de e-mail informado.
+
+    Returns:
+        Optional[str]: O e-mail normalizado, ou None se não informado.
+    """
+    if email is None:
+        return None
+    return email.strip().lower()
+
+
+def count_cache_key(tenant_id: str) -> str:
+    """Chave de cache da contagem de clientes do tenant."""
+    return cache.cache_key('customers', tenant_id, 'count')
+
+
+def cpf_cache_key(tenant_id: str, cpf: str) -> str:
+    """Chave de cache da busca por CPF no tenant."""
+    return cache.cache_key('customers', tenant_id, 'cpf', cpf)
+
+
+def email_miss_cache_key(tenant_id: str, email: str) -> str:
+    """Chave de cache da ausência de um e-mail no tenant."""
+    return cache.cache_key('customers', tenant_id, 'email-miss', email)
+
+
+def _invalidate_customer(customer: models.Customer) -> None:
+    """Invalida, em todos os workers, as entradas de cache afetadas pela
+    escrita do cliente."""
+    cache.invalidate([
+        count_cache_key(customer.tenant_id),
+        cpf_cache_key(customer.tenant_id, customer.cpf)
+        if customer.cpf else None,
+        email_miss_cache_key(customer.tenant_id, customer.email)
+        if customer.email else None,
+    ])
+
 # ======= CUSTOMER ADMIN ======= #
 
 
+@traced()
 def create_admin_user(db: Session) -> None:
     """Cria um usuário administrador se ele ainda não existir.
 
     Os detalhes do administrador (nome, email, senha, CPF) devem ser fornecidos
     através de variáveis de ambiente: `ADMIN_EMAIL`, `ADMIN_PASSWORD`,
-    `ADMIN_CPF`, `ADMIN_NAME`.
+    `ADMIN_CPF`, `ADMIN_NAME`. O administrador pertence ao tenant padrão.
 
     Args:
         db (Session): Sessão do banco de dados.
@@ -26,7 +105,7 @@ def create_admin_user(db: Session) -> None:
         Exception: Se houver algum erro ao criar o usuário administrador.
     """
     try:
-        admin_email = os.getenv('ADMIN_EMAIL')
+        admin_email = normalize_email(os.getenv('ADMIN_EMAIL'))
         admin_password = os.getenv('ADMIN_PASSWORD')
         admin_cpf = os.getenv('ADMIN_CPF')
         admin_name = os.getenv('ADMIN_NAME')
@@ -39,21 +118,26 @@ def create_admin_user(db: Session) -> None:
 
         logger.debug(f'Admin email: {admin_email}, Admin name: {admin_name}')
 
-        user = db.query(models.Customer) \
-                 .filter(models.Customer.email == admin_email) \
-                 .first()
+        user = get_user_by_email(db, admin_email)
         if not user:
             hashed_password = security.get_password_hash(admin_password)
             admin_user = models.Customer(
+                tenant_id=tenancy.DEFAULT_TENANT,
                 name=admin_name,
                 email=admin_email,
                 cpf=admin_cpf,
-                hashed_password=hashed_password
+                hashed_password=hashed_password,
+                role=security.ROLE_ADMIN
             )
             db.add(admin_user)
             db.commit()
             db.refresh(admin_user)
+            _invalidate_customer(admin_user)
             logger.debug(f'Admin user created with email: {admin_email}')
+        elif user.role != security.ROLE_ADMIN:
+            user.role = security.ROLE_ADMIN
+            db.commit()
+            logger.debug(f'Admin role granted to: {admin_email}')
         else:
             logger.debug(
                 f'Admin user already exists with email: {admin_email}'
@@ -62,12 +146,17 @@ def create_admin_user(db: Session) -> None:
         logger.error(f'Error creating admin user: {e}')
 
 
-def create_user(db: Session, user: schemas.CustomerCreate) -> models.Customer:
+@traced()
+def create_user(
+    db: Session, user: schemas.CustomerCreate,
+    tenant_id: str = tenancy.DEFAULT_TENANT
+) -> models.Customer:
     """Cria um novo usuário.
 
     Args:
         db (Session): Sessão do banco de dados.
         user (schemas.CustomerCreate): Os dados do usuário a ser criado.
+        tenant_id (str): O tenant do usuário.
 
     Returns:
         models.Customer: O usuário criado.
@@ -75,142 +164,352 @@ def create_user(db: Session, user: schemas.CustomerCreate) -> models.Customer:
     logger.debug(f'Creating user with email: {user.email}')
     hashed_password = security.get_password_hash(user.password)
     db_user = models.Customer(
+        tenant_id=tenant_id,
         name=user.name,
-        email=user.email,
+        email=normalize_email(user.email),
         cpf=user.cpf,
         hashed_password=hashed_password
     )
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    _invalidate_customer(db_user)
     logger.info(f'User created with ID: {db_user.id}')
     return db_user
 
 
+@traced()
 def create_customer(
-    db: Session, customer: schemas.CustomerCreate
+    db: Session, customer: schemas.CustomerCreate,
+    tenant_id: str = tenancy.DEFAULT_TENANT
 ) -> models.Customer:
     """Cria um novo cliente.
 
     Args:
         db (Session): Sessão do banco de dados.
         customer (schemas.CustomerCreate): Dados do cliente a ser criado.
+        tenant_id (str): O tenant do cliente.
 
     Returns:
         models.Customer: O cliente criado.
     """
     logger.debug(f'Creating customer with email: {customer.email}')
     db_customer = models.Customer(
+        tenant_id=tenant_id,
         name=customer.name,
-        email=customer.email,
+        email=normalize_email(customer.email),
         cpf=customer.cpf
     )
     db.add(db_customer)
     db.commit()
     db.refresh(db_customer)
+    _invalidate_customer(db_customer)
     logger.info(f'Customer created with ID: {db_customer.id}')
     return db_customer
 
 
-def create_anonymous_customer(db: Session) -> models.Customer:
+@traced()
+def create_anonymous_customer(
+    db: Session, tenant_id: str = tenancy.DEFAULT_TENANT
+) -> models.Customer:
     """Cria um cliente anônimo.
 
     Args:
         db (Session): Sessão do banco de dados.
+        tenant_id (str): O tenant do cliente.
 
     Returns:
         models.Customer: O cliente anônimo criado.
     """
     logger.debug('Creating anonymous customer')
     anonymous_customer = models.Customer(
-        name='Anonymous', email=None, cpf=None, hashed_password=None
+        tenant_id=tenant_id, name='Anonymous', email=None, cpf=None,
+        hashed_password=None
     )
     db.add(anonymous_customer)
     db.commit()
     db.refresh(anonymous_customer)
+    _invalidate_customer(anonymous_customer)
     logger.info(f'Anonymous customer created with ID: {anonymous_customer.id}')
     return anonymous_customer
 
 
-def get_user_by_email(db: Session, email: str) -> models.Customer:
-    """Obtém um usuário pelo endereço de e-mail.
+@traced()
+def get_user_by_email(
+    db: Session, email: str, tenant_id: str = tenancy.DEFAULT_TENANT
+) -> models.Customer:
+    """Obtém um usuário pelo endereço de e-mail dentro do tenant.
+
+    Apenas a ausência do usuário fica em cache (por `negative_lookup_ttl()`
+    segundos, invalidada quando o e-mail é cadastrado); usuários
+    encontrados são sempre lidos do banco. A ausência não é gravada se o
+    e-mail for cadastrado durante a consulta.
 
     Args:
         db (Session): Sessão do banco de dados.
         email (str): O endereço de e-mail do usuário.
+        tenant_id (str): O tenant do usuário.
 
     Returns:
         models.Customer: O usuário encontrado,
         ou None se nenhum usuário for encontrado.
     """
     logger.info(f'Fetching user with email: {email}')
-    return db.query(models.Customer) \
-             .filter(models.Customer.email == email) \
+    email = normalize_email(email)
+    miss_key = email_miss_cache_key(tenant_id, email)
+    if cache.get_cache().get(miss_key):
+        return None
+    generation = cache.get_cache().generation(miss_key)
+
+    user = db.query(models.Customer) \
+             .filter(models.Customer.tenant_id == tenant_id,
+                     func.lower(models.Customer.email) == email) \
              .first()
+    ttl = negative_lookup_ttl()
+    if user is None and ttl > 0:
+        cache.get_cache().add_if_unchanged(miss_key, True, ttl, generation)
+    return user
+
 
+@traced()
+def get_customer_by_cpf(
+    db: Session, cpf: str, tenant_id: str = tenancy.DEFAULT_TENANT
+) -> Optional[schemas.Customer]:
+    """Obtém um cliente pelo CPF dentro do tenant.
 
-def get_customer_by_cpf(db: Session, cpf: str) -> models.Customer:
-    """Obtém um cliente pelo CPF.
+    O cliente encontrado fica em cache por `CUSTOMER_CACHE_TTL` segundos e a
+    sua ausência por `negative_lookup_ttl()`; a entrada é invalidada quando
+    um cliente com o mesmo CPF é criado e não é gravada se isso acontecer
+    durante a consulta.
 
     Args:
         db (Session): Sessão do banco de dados.
         cpf (str): O CPF do cliente.
+        tenant_id (str): O tenant do cliente.
 
     Returns:
-        models.Customer: O cliente encontrado, ou None se nenhum cliente
-        for encontrado.
+        Optional[schemas.Customer]: O cliente encontrado (vindo do cache ou
+        do banco), ou None se nenhum cliente for encontrado.
     """
     logger.debug(f'Fetching customer with CPF: {cpf}')
-    return db.query(models.Customer).filter(models.Customer.cpf == cpf).first()
+    key = cpf_cache_key(tenant_id, cpf)
+    cached = cache.get_cache().get(key)
+    if cached is not None:
+        return schemas.Customer(**cached) if cached else None
+    generation = cache.get_cache().generation(key)
+
+    row = db.query(*CUSTOMER_COLUMNS) \
+            .filter(models.Customer.tenant_id == tenant_id,
+                    models.Customer.cpf == cpf) \
+            .first()
+    if row is None:
+        if negative_lookup_ttl() > 0:
+            cache.get_cache().add_if_unchanged(
+                key, {}, negative_lookup_ttl(), generation
+            )
+        return None
+    customer = schemas.Customer.model_validate(row)
+    cache.get_cache().add_if_unchanged(
+        key, customer.model_dump(), CUSTOMER_CACHE_TTL, generation
+    )
+    return customer
+
 
+@traced()
+def get_customers_count(
+    db: Session, tenant_id: str = tenancy.DEFAULT_TENANT
+) -> int:
+    """Obtém a contagem total de clientes do tenant.
 
-def get_customers_count(db: Session) -> int:
-    """Obtém a contagem total de clientes.
+    A contagem fica em cache por `CUSTOMER_CACHE_TTL` segundos e não é
+    gravada se um cliente for criado durante a consulta.
 
     Args:
         db (Session): Sessão do banco de dados.
+        tenant_id (str): O tenant dos clientes.
 
     Returns:
         int: O número total de clientes.
     """
     logger.info('Fetching total count of customers')
-    return db.query(models.Customer).count()
-
-
-def get_customer(db: Session, customer_id: int) -> Optional[models.Customer]:
-    """Obtém um cliente pelo ID.
+    key = count_cache_key(tenant_id)
+    count = cache.get_cache().get(key)
+    if count is None:
+        generation = cache.get_cache().generation(key)
+        count = db.query(models.Customer) \
+                  .filter(models.Customer.tenant_id == tenant_id) \
+                  .count()
+        cache.get_cache().add_if_unchanged(
+            key, count, CUSTOMER_CACHE_TTL, generation
+        )
+    return count
+
+
+@traced()
+def get_customer(
+    db: Session, customer_id: int, tenant_id: str = tenancy.DEFAULT_TENANT
+) -> Optional[Row]:
+    """Obtém um cliente pelo ID dentro do tenant.
 
     Args:
         db (Session): Sessão do banco de dados.
         customer_id (int): ID do cliente.
+        tenant_id (str): O tenant do cliente.
 
     Returns:
-        Optional[models.Customer]: O cliente encontrado ou None se nenhum
-        cliente for encontrado.
+        Optional[Row]: Linha com `id`, `name`, `email`, `cpf` e
+        `tenant_id` do cliente encontrado, ou None se nenhum cliente for
+        encontrado.
     """
     logger.debug(f'Fetching customer with ID: {customer_id}')
     try:
-        return db.query(models.Customer) \
-                 .filter(models.Customer.id == customer_id) \
+        return db.query(*CUSTOMER_COLUMNS, models.Customer.tenant_id) \
+                 .filter(models.Customer.tenant_id == tenant_id,
+                         models.Customer.id == customer_id) \
                  .first()
     except Exception as e:
         logger.error(f'Error fetching customer: {e}')
         return None
 
 
+@traced()
 def get_customers(
-    db: Session, skip: int = 0, limit: int = 10
-) -> List[models.Customer]:
-    """Obtém uma lista de clientes com paginação.
+    db: Session, skip: int = 0, limit: int = 10,
+    tenant_id: str = tenancy.DEFAULT_TENANT
+) -> List[Row]:
+    """Obtém uma lista de clientes do tenant com paginação.
 
     Args:
         db (Session): Sessão do banco de dados.
         skip (int, optional): Número de registros a pular. Defaults to 0.
         limit (int, optional): Número máximo de registros a retornar.
         Defaults to 10.
+        tenant_id (str): O tenant dos clientes.
 
     Returns:
-        List[models.Customer]: Lista de clientes.
+        List[Row]: Linhas com `id`, `name`, `email` e `cpf` dos clientes.
     """
     logger.debug(f'Fetching customers with skip: {skip}, limit: {limit}')
-    return db.query(models.Customer).offset(skip).limit(limit).all()
+    return db.query(*CUSTOMER_COLUMNS) \
+             .filter(models.Customer.tenant_id == tenant_id) \
+             .offset(skip) \
+             .limit(limit) \
+             .all()
+
+
+def _search_criteria(dialect: str, query: str) -> Tuple[list, list]:
+    """Monta o filtro e a ordenação da busca de clientes para o dialeto.
+
+    No Postgres, combina prefixo (`ILIKE 'q%'`) com similaridade de trigramas
+    (operador `%` do `pg_trgm`), ambos atendidos pelos índices GIN da
+    migração `0003`. Nos demais bancos (SQLite nos testes) a parte fuzzy é
+    aproximada por busca de substring.
+
+    Args:
+        dialect (str): Nome do dialeto SQLAlchemy (ex.: `postgresql`).
+        query (str): O termo buscado.
+
+    Returns:
+        Tuple[list, list]: Os critérios de filtro e as expressões de
+        ordenação (maior relevância primeiro).
+    """
+    name, email = models.Customer.name, models.Customer.email
+    escaped = (
+        query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    )
+    prefix = f'{escaped}%'
+    is_prefix = or_(
+        name.ilike(prefix, escape='\\'), email.ilike(prefix, escape='\\')
+    )
+    prefix_rank = case((is_prefix, 0), else_=1)
+
+    if dialect == 'postgresql':
+        similarity = func.greatest(
+            func.similarity(name, query), func.similarity(email, query)
+        )
+        criteria = [or_(is_prefix, name.op('%')(query), email.op('%')(query))]
+        order_by = [prefix_rank, similarity.desc(), models.Customer.id]
+    else:
+        contains = f'%{escaped}%'
+        criteria = [or_(
+            name.ilike(contains, escape='\\'),
+            email.ilike(contains, escape='\\'),
+        )]
+        order_by = [prefix_rank, func.length(name), models.Customer.id]
+
+    return criteria, order_by
+
+
+@traced()
+def search_customers(
+    db: Session, query: str, limit: int = 10,
+    tenant_id: str = tenancy.DEFAULT_TENANT
+) -> List[Row]:
+    """Busca clientes do tenant por prefixo ou similaridade de nome e
+    e-mail.
+
+    Args:
+        db (Session): Sessão do banco de dados.
+        query (str): O termo buscado.
+        limit (int, optional): Número máximo de resultados. Defaults to 10.
+        tenant_id (str): O tenant dos clientes.
+
+    Returns:
+        List[Row]: Linhas com `id`, `name`, `email` e `cpf` dos clientes,
+        ordenadas por relevância.
+    """
+    logger.debug(f'Searching customers with query: {query}, limit: {limit}')
+    query = query.strip()
+    criteria, order_by = _search_criteria(db.get_bind().dialect.name, query)
+    return db.query(*CUSTOMER_COLUMNS) \
+             .filter(models.Customer.tenant_id == tenant_id, *criteria) \
+             .order_by(*order_by) \
+             .limit(limit) \
+             .all()
+
+
+# ======= SERVICE CLIENTS ======= #
+
+
+@traced()
+def get_active_clients(db: Session) -> List[models.Client]:
+    """Obtém os clientes de serviço ativos.
+
+    Args:
+        db (Session): Sessão do banco de dados.
+
+    Returns:
+        List[models.Client]: Os clientes que podem emitir tokens.
+    """
+    return db.query(models.Client) \
+             .filter(models.Client.active.is_(True)) \
+             .all()
+
+
+@traced()
+def create_client(
+    db: Session, client_id: str, secret_hash: str, scope: str = '',
+    tenant_id: str = tenancy.DEFAULT_TENANT
+) -> models.Client:
+    """Registra um cliente de serviço.
+
+    Args:
+        db (Session): Sessão do banco de dados.
+        client_id (str): Identificador público do cliente.
+        secret_hash (str): HMAC do segredo do cliente.
+        scope (str): Escopos permitidos, separados por espaço.
+        tenant_id (str): O tenant do cliente.
+
+    Returns:
+        models.Client: O cliente registrado.
+    """
+    logger.debug(f'Creating service client: {client_id}')
+    client = models.Client(
+        client_id=client_id, secret_hash=secret_hash, scope=scope,
+        tenant_id=tenant_id
+    )
+    db.add(client)
+    db.commit()
+    db.refresh(client)
+    logger.info(f'Service client created: {client_id}')
+    return client
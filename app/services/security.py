@@ -1,3 +1,5 @@
+from typing import Callable, Dict, Tuple
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
@@ -8,40 +10,209 @@ from passlib.context import CryptContext
 
 from ..database.database import get_db
 from ..models import schemas
-from ..services import repository
+from ..services import repository, tenancy
 from ..tools.logging import logger
+from ..tools.tracing import start_span
 
 # Configuração do JWT
 SECRET_KEY = env.get("SECRET_KEY", "")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Papéis dos clientes e escopos emitidos nos tokens de cada papel. A
+# autorização lê apenas as claims, sem consultar o banco.
+ROLE_CUSTOMER = "customer"
+ROLE_SERVICE = "service"
+ROLE_ADMIN = "admin"
+
+# Prefixo do `sub` dos tokens de clientes de serviço, para não colidir com os
+# IDs numéricos de clientes (GET /auth, chaves de idempotência)
+SERVICE_SUBJECT_PREFIX = "client:"
+
+SCOPE_CUSTOMERS_READ = "customers:read"
+SCOPE_CUSTOMERS_WRITE = "customers:write"
+SCOPE_CUSTOMERS_ADMIN = "customers:admin"
+SCOPE_DEBUG = "debug"
+# Concedido apenas a clientes de serviço (gateways) que consultam
+# `/introspect`; não faz parte de nenhum papel de usuário
+SCOPE_INTROSPECT = "tokens:introspect"
+
+ROLE_SCOPES: Dict[str, Tuple[str, ...]] = {
+    ROLE_CUSTOMER: (SCOPE_CUSTOMERS_READ, SCOPE_CUSTOMERS_WRITE),
+    ROLE_SERVICE: (SCOPE_CUSTOMERS_READ, SCOPE_CUSTOMERS_WRITE),
+    ROLE_ADMIN: (
+        SCOPE_CUSTOMERS_READ, SCOPE_CUSTOMERS_WRITE, SCOPE_CUSTOMERS_ADMIN,
+        SCOPE_DEBUG,
+    ),
+}
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-def get_user_by_email(db: Session, email: str):
+def get_user_by_email(db: Session, email: str,
+                      tenant_id: str = tenancy.DEFAULT_TENANT):
     """Movendo a importação para dentro da função para evitar erro de
     importação circular"""
     from ..services.repository import get_user_by_email
-    return get_user_by_email(db, email)
+    return get_user_by_email(db, email, tenant_id)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with start_span('bcrypt.verify'):
+        return pwd_context.verify(plain_password, hashed_password)
+
+
+def scopes_for_role(role: str) -> str:
+    """Retorna os escopos do papel, separados por espaço.
+
+    Args:
+        role (str): O papel do cliente.
+
+    Returns:
+        str: Os escopos concedidos ao papel (vazio se desconhecido).
+    """
+    return " ".join(ROLE_SCOPES.get(role, ()))
 
 
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
+    """Emite um token de acesso.
+
+    Quando `data` traz a claim `role`, a claim `scope` é preenchida com os
+    escopos do papel (se não informada).
+    """
     to_encode = data.copy()
+    if "role" in to_encode:
+        to_encode.setdefault("scope", scopes_for_role(to_encode["role"]))
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(
         minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    with start_span('jwt.encode'):
+        return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def claims_from_payload(payload: dict) -> schemas.TokenClaims:
+    """Extrai as claims de autorização de um token já decodificado.
+
+    Tokens emitidos antes das claims `role`/`scope` recebem o papel
+    `customer` e os seus escopos; sem `tenant`, o tenant padrão.
+
+    Args:
+        payload (dict): O conteúdo do token.
+
+    Raises:
+        JWTError: Se o token não tiver `sub`.
+
+    Returns:
+        schemas.TokenClaims: As claims do token.
+    """
+    if payload.get("sub") is None:
+        raise JWTError("Token sem sub")
+    role = payload.get("role", ROLE_CUSTOMER)
+    return schemas.TokenClaims(
+        sub=str(payload["sub"]),
+        tenant=payload.get(tenancy.TENANT_CLAIM, tenancy.DEFAULT_TENANT),
+        role=role,
+        scope=payload.get("scope", scopes_for_role(role)),
+    )
+
+
+def decode_access_token(token: str) -> dict:
+    """Verifica a assinatura e a expiração do token e retorna o conteúdo.
+
+    Raises:
+        JWTError: Se o token for inválido ou estiver expirado.
+    """
+    with start_span('jwt.decode'):
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+
+def introspect_token(token: str) -> dict:
+    """Valida o token apenas pelas claims, sem consultar o banco (RFC 7662).
+
+    Args:
+        token (str): O token JWT.
+
+    Returns:
+        dict: `active` e, para tokens válidos, `sub`, `exp`, `scope` e
+        `tenant`.
+    """
+    try:
+        payload = decode_access_token(token)
+        claims = claims_from_payload(payload)
+    except JWTError:
+        return {"active": False}
+    if payload.get("exp") is None:
+        return {"active": False}
+    return {
+        "active": True,
+        "sub": claims.sub,
+        "exp": int(payload["exp"]),
+        "scope": claims.scope,
+        "tenant": claims.tenant,
+    }
+
+
+def get_token_claims(
+    token: str = Depends(oauth2_scheme)
+) -> schemas.TokenClaims:
+    """Valida o token e retorna as suas claims, sem consultar o banco.
+
+    Raises:
+        HTTPException: 401 se o token for inválido ou estiver expirado.
+    """
+    try:
+        return claims_from_payload(decode_access_token(token))
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Credenciais inválidas ou expiradas",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+def require_scopes(*scopes: str) -> Callable[..., schemas.TokenClaims]:
+    """Cria uma dependência que exige os escopos informados no token.
+
+    Example:
+        >>> @router.get('/', dependencies=[
+        ...     Depends(require_scopes(SCOPE_CUSTOMERS_READ))])
+
+    Args:
+        *scopes (str): Os escopos exigidos.
+
+    Returns:
+        Callable[..., schemas.TokenClaims]: A dependência, que retorna as
+        claims do token ou levanta 403 se faltar algum escopo.
+    """
+    required = frozenset(scopes)
+
+    def check_scopes(
+        claims: schemas.TokenClaims = Depends(get_token_claims)
+    ) -> schemas.TokenClaims:
+        missing = required - claims.scopes
+        if missing:
+            logger.warning(
+                f"Escopos {sorted(missing)} ausentes no token de "
+                f"{claims.sub}"
+            )
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Permissão insuficiente",
+            )
+        return claims
+
+    return check_scopes
 
 
 def get_current_user(db: Session = Depends(get_db),
                      token: str = Depends(oauth2_scheme)) -> schemas.Customer:
-    """Verifica e retorna o usuário autenticado a partir do token JWT."""
+    """Verifica e retorna o usuário autenticado a partir do token JWT.
+
+    O usuário é buscado no tenant da claim `tenant` (tokens emitidos antes
+    dela pertencem ao tenant padrão). Tokens de clientes de serviço não
+    representam um usuário e são recusados.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Credenciais inválidas ou expiradas",
@@ -49,17 +220,24 @@ def get_current_user(db: Session = Depends(get_db),
     )
 
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         user_id: str = payload.get("sub")
+        tenant_id: str = payload.get(
+            tenancy.TENANT_CLAIM, tenancy.DEFAULT_TENANT
+        )
 
-        if user_id is None:
+        if user_id is None or str(user_id).startswith(
+            SERVICE_SUBJECT_PREFIX
+        ):
             raise credentials_exception
 
     except JWTError:
         raise credentials_exception
 
     # Buscar usuário no banco de dados
-    user = repository.get_customer(db, customer_id=user_id)
+    user = repository.get_customer(
+        db, customer_id=user_id, tenant_id=tenant_id
+    )
     if user is None:
         raise credentials_exception
 
@@ -76,4 +254,46 @@ def get_password_hash(password: str) -> str:
         str: Senha criptografada.
     """
     logger.debug('Hashing password')
-    return pwd_context.hash(password)
+    with start_span('bcrypt.hash'):
+        return pwd_context.hash(password)
+
+
+def get_current_tenant(
+    claims: schemas.TokenClaims = Depends(get_token_claims)
+) -> str:
+    """Retorna o tenant do token.
+
+    Args:
+        claims (schemas.TokenClaims): As claims do token.
+
+    Returns:
+        str: O tenant ao qual as consultas da requisição se restringem.
+    """
+    return claims.tenant
+
+
+def get_current_admin(
+    claims: schemas.TokenClaims = Depends(get_token_claims)
+) -> schemas.TokenClaims:
+    """Garante que o token é de um administrador do tenant padrão.
+
+    A verificação usa apenas as claims `role` e `tenant`, sem consultar o
+    banco.
+
+    Args:
+        claims (schemas.TokenClaims): As claims do token.
+
+    Raises:
+        HTTPException: 403 se o token não for de um administrador.
+
+    Returns:
+        schemas.TokenClaims: As claims do administrador.
+    """
+    if (claims.role != ROLE_ADMIN
+            or claims.tenant != tenancy.DEFAULT_TENANT):
+        logger.warning(f"Acesso administrativo negado ao ID {claims.sub}")
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso restrito ao administrador",
+        )
+    return claims
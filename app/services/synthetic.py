@@ -0,0 +1,210 @@
+"""Clientes sintéticos para testes de escala.
+
+Gera clientes com CPFs válidos e e-mails únicos a partir de um índice, de
+modo que as cargas sejam reproduzíveis e possam continuar de onde pararam
+(`start`). Todos recebem o mesmo hash de senha, calculado uma única vez: um
+bcrypt por linha levaria dias para dez milhões de clientes.
+
+A carga usa `COPY` no Postgres e `executemany` nos demais bancos, em lotes
+de `batch_size` linhas, cada um na sua transação.
+"""
+import io
+import time
+from typing import Dict, Iterable, Iterator, List
+
+from sqlalchemy import insert, text
+from sqlalchemy.engine import Connection, Engine
+
+from ..models import models
+from ..tools.logging import logger
+from . import cache, repository, security, tenancy
+
+SYNTHETIC_PASSWORD = 'synthetic-password'
+
+COPY_COLUMNS = (
+    'tenant_id', 'name', 'email', 'cpf', 'hashed_password', 'role'
+)
+
+_FIRST_NAMES = (
+    'Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Felipe', 'Gabriela',
+    'Heitor', 'Isabela', 'João', 'Larissa', 'Marcos', 'Natália', 'Otávio',
+    'Paula', 'Rafael', 'Sofia', 'Tiago', 'Vitória', 'Yuri',
+)
+_LAST_NAMES = (
+    'Almeida', 'Barbosa', 'Cardoso', 'Dias', 'Esteves', 'Ferreira',
+    'Gomes', 'Lima', 'Martins', 'Nunes', 'Oliveira', 'Pereira', 'Ribeiro',
+    'Santos', 'Teixeira', 'Vieira',
+)
+
+
+def _check_digit(digits: str) -> str:
+    weight = len(digits) + 1
+    total = sum(int(digit) * (weight - i) for i, digit in enumerate(digits))
+    remainder = total * 10 % 11
+    return '0' if remainder == 10 else str(remainder)
+
+
+def synthetic_cpf(index: int) -> str:
+    """Retorna o CPF válido derivado do índice.
+
+    Os nove primeiros dígitos são o próprio índice, então índices
+    diferentes geram CPFs diferentes.
+
+    Args:
+        index (int): O índice do cliente (menor que 10^9).
+
+    Raises:
+        ValueError: Se o índice gerar um CPF com todos os dígitos iguais,
+        considerado inválido (ver `is_valid_index`).
+
+    Returns:
+        str: O CPF, somente dígitos.
+    """
+    if not is_valid_index(index):
+        raise ValueError(f'Índice sem CPF válido: {index}')
+    base = f'{index:09d}'
+    first = _check_digit(base)
+    return base + first + _check_digit(base + first)
+
+
+def is_valid_index(index: int) -> bool:
+    """Indica se o índice gera um CPF válido (não repetido, como
+    `111.111.111-11`)."""
+    return 0 <= index < 10 ** 9 and len(set(f'{index:09d}')) > 1
+
+
+def synthetic_email(index: int) -> str:
+    """Retorna o e-mail do cliente sintético de índice `index`."""
+    return f'cliente{index}@example.com'
+
+
+def synthetic_customers(
+    count: int, hashed_password: str, start: int = 0,
+    tenant_id: str = tenancy.DEFAULT_TENANT
+) -> Iterator[Dict[str, str]]:
+    """Gera as linhas de `count` clientes sintéticos.
+
+    Os índices sem CPF válido são pulados, então sempre são geradas
+    `count` linhas.
+
+    Args:
+        count (int): O número de clientes.
+        hashed_password (str): O hash de senha usado por todos.
+        start (int): O primeiro índice.
+        tenant_id (str): O tenant dos clientes.
+
+    Yields:
+        Dict[str, str]: As colunas de `COPY_COLUMNS` de cada cliente.
+    """
+    index = start
+    generated = 0
+    while generated < count:
+        if is_valid_index(index):
+            first, rest = divmod(index, len(_FIRST_NAMES))
+            yield {
+                'tenant_id': tenant_id,
+                'name': (
+                    f'{_FIRST_NAMES[rest]} '
+                    f'{_LAST_NAMES[first % len(_LAST_NAMES)]}'
+                ),
+                'email': synthetic_email(index),
+                'cpf': synthetic_cpf(index),
+                'hashed_password': hashed_password,
+                'role': security.ROLE_CUSTOMER,
+            }
+            generated += 1
+        index += 1
+
+
+def _batches(rows: Iterable[Dict[str, str]],
+             size: int) -> Iterator[List[Dict[str, str]]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _copy(connection: Connection, batch: List[Dict[str, str]]) -> None:
+    # Valores gerados aqui não têm tabulações, quebras de linha nem barras
+    buffer = io.StringIO()
+    for row in batch:
+        buffer.write('\t'.join(row[column] for column in COPY_COLUMNS))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f'COPY customers ({", ".join(COPY_COLUMNS)}) FROM STDIN',
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def load_customers(engine: Engine, rows: Iterable[Dict[str, str]],
+                   batch_size: int = 10000) -> int:
+    """Insere as linhas em lotes, com `COPY` no Postgres.
+
+    Args:
+        engine (Engine): A engine do banco.
+        rows (Iterable[Dict[str, str]]): As linhas a inserir.
+        batch_size (int): Linhas por lote (e por transação).
+
+    Returns:
+        int: O número de linhas inseridas.
+    """
+    postgres = engine.dialect.name == 'postgresql'
+    statement = insert(models.Customer.__table__)
+    loaded = 0
+    for batch in _batches(rows, batch_size):
+        with engine.begin() as connection:
+            if postgres:
+                _copy(connection, batch)
+            else:
+                connection.execute(statement, batch)
+        loaded += len(batch)
+    if postgres:
+        # Estatísticas atualizadas para o planner depois da carga
+        with engine.begin() as connection:
+            connection.execute(text('ANALYZE customers'))
+    return loaded
+
+
+def seed_customers(
+    engine: Engine, count: int, start: int = 0,
+    tenant_id: str = tenancy.DEFAULT_TENANT,
+    password: str = SYNTHETIC_PASSWORD, batch_size: int = 10000
+) -> int:
+    """Carrega `count` clientes sintéticos no tenant.
+
+    Os clientes de índice `i` têm e-mail `cliente{i}@example.com`, o CPF
+    de `synthetic_cpf(i)` e a senha `password`. Para continuar uma carga,
+    use como `start` o índice seguinte ao último carregado.
+
+    Args:
+        engine (Engine): A engine do banco.
+        count (int): O número de clientes.
+        start (int): O primeiro índice.
+        tenant_id (str): O tenant dos clientes.
+        password (str): A senha de todos os clientes.
+        batch_size (int): Linhas por lote.
+
+    Returns:
+        int: O número de clientes carregados.
+    """
+    started = time.perf_counter()
+    rows = synthetic_customers(
+        count, security.get_password_hash(password), start=start,
+        tenant_id=tenant_id
+    )
+    loaded = load_customers(engine, rows, batch_size=batch_size)
+    cache.invalidate([repository.count_cache_key(tenant_id)])
+    logger.info(
+        f'Loaded {loaded} synthetic customers into tenant {tenant_id} in '
+        f'{time.perf_counter() - started:.1f}s'
+    )
+    return loaded
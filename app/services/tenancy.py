@@ -0,0 +1,60 @@
+"""Identificação da unidade (tenant) das requisições.
+
+Cada restaurante é um tenant: os clientes pertencem a uma unidade, o
+e-mail e o CPF são únicos dentro dela e todas as consultas do repositório
+filtram pelo tenant. No login a unidade vem do cabeçalho `X-Tenant-ID`
+(ou `DEFAULT_TENANT`, quando ausente) e passa a viajar no token, na claim
+`tenant`.
+"""
+import re
+from os import environ as env
+from typing import Optional
+
+from fastapi import Header, HTTPException, status
+
+DEFAULT_TENANT: str = env.get('DEFAULT_TENANT', 'default')
+TENANT_HEADER = 'X-Tenant-ID'
+TENANT_CLAIM = 'tenant'
+
+_TENANT_ID = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$')
+
+
+def validate_tenant(tenant_id: str) -> str:
+    """Valida o identificador de um tenant.
+
+    Args:
+        tenant_id (str): O identificador informado.
+
+    Raises:
+        ValueError: Se o identificador for inválido.
+
+    Returns:
+        str: O identificador validado.
+    """
+    if not _TENANT_ID.match(tenant_id):
+        raise ValueError(f'Tenant inválido: {tenant_id!r}')
+    return tenant_id
+
+
+def get_request_tenant(
+    x_tenant_id: Optional[str] = Header(None, alias=TENANT_HEADER)
+) -> str:
+    """Retorna o tenant informado no cabeçalho `X-Tenant-ID`.
+
+    Args:
+        x_tenant_id (Optional[str]): O valor do cabeçalho.
+
+    Raises:
+        HTTPException: 400 se o identificador for inválido.
+
+    Returns:
+        str: O tenant da requisição, ou `DEFAULT_TENANT` se ausente.
+    """
+    if x_tenant_id is None:
+        return DEFAULT_TENANT
+    try:
+        return validate_tenant(x_tenant_id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        )
@@ -1,2 +1,16 @@
 import os
 os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+
+import pytest  # noqa: E402
+
+from app.services import cache, idempotency  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache():
+    """Cada teste usa um cache e chaves de idempotência em memória vazios."""
+    cache.set_cache(cache.LRUCache())
+    idempotency.set_store(idempotency.IdempotencyStore())
+    yield
+    cache.set_cache(None)
+    idempotency.set_store(None)
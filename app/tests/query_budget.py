@@ -0,0 +1,46 @@
+"""Asserções de orçamento de consultas SQL para os testes.
+
+Uso em testes de rota (lê o cabeçalho `Server-Timing`):
+
+    response = client.post("/customers/register", ...)
+    assert_max_queries(response, 4)
+
+Uso em testes de serviço:
+
+    with max_queries(2):
+        repository.get_customer(db, 1)
+"""
+import re
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.database import query_stats
+
+_DB_TIMING = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+def query_count(response) -> int:
+    """Retorna o número de consultas informado no `Server-Timing`."""
+    match = _DB_TIMING.search(response.headers.get('Server-Timing', ''))
+    assert match, 'Resposta sem métrica de banco no Server-Timing'
+    return int(match.group(1))
+
+
+def assert_max_queries(response, limit: int) -> None:
+    """Falha se a requisição executou mais de `limit` consultas."""
+    count = query_count(response)
+    assert count <= limit, (
+        f'{count} consultas executadas; o orçamento é {limit}'
+    )
+
+
+@contextmanager
+def max_queries(limit: int) -> Iterator[query_stats.QueryStats]:
+    """Falha se o bloco executar mais de `limit` consultas."""
+    with query_stats.track_queries() as stats:
+        yield stats
+    statements = '\n'.join(stats.statements)
+    assert stats.count <= limit, (
+        f'{stats.count} consultas executadas; o orçamento é {limit}:\n'
+        f'{statements}'
+    )
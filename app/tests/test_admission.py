@@ -0,0 +1,170 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware import AdmissionMiddleware
+from app.services import admission
+from app.services.admission import AdaptiveLimiter, AdmissionRejected
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected_with_429():
+    limiter = AdaptiveLimiter("login", limit=1, max_queue=1,
+                              queue_timeout=1)
+    await limiter.acquire()
+    queued = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as excinfo:
+        await limiter.acquire()
+    assert excinfo.value.status_code == 429
+    assert excinfo.value.retry_after >= 1
+
+    limiter.release(0.01)
+    await queued
+    assert limiter.inflight == 1
+    assert limiter.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout_is_rejected_with_503():
+    limiter = AdaptiveLimiter("write", limit=1, queue_timeout=0.01)
+    await limiter.acquire()
+
+    with pytest.raises(AdmissionRejected) as excinfo:
+        await limiter.acquire()
+
+    assert excinfo.value.status_code == 503
+    assert limiter.queued == 0
+    assert limiter.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_after_grant_returns_the_slot():
+    limiter = AdaptiveLimiter("login", limit=1, queue_timeout=1)
+    await limiter.acquire()
+    granted = asyncio.ensure_future(limiter.acquire())
+    waiting = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+
+    # A vaga é entregue a `granted`, cancelada antes de ele retomar
+    limiter.release(0.01)
+    granted.cancel()
+    try:
+        await granted
+    except asyncio.CancelledError:
+        pass
+    else:
+        # Até o Python 3.11, o `wait_for` entrega a vaga mesmo cancelado
+        limiter.release(0.01)
+
+    await asyncio.wait_for(waiting, 1)
+    assert limiter.inflight == 1
+    assert limiter.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_while_queued_leaves_the_queue():
+    limiter = AdaptiveLimiter("login", limit=1, queue_timeout=1)
+    await limiter.acquire()
+    queued = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+
+    queued.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+
+    assert limiter.queued == 0
+    limiter.release(0.01)
+    assert limiter.inflight == 0
+
+
+def test_limit_decreases_when_latency_rises():
+    limiter = AdaptiveLimiter("validation", limit=10)
+    limiter._inflight = 1
+    limiter.release(0.01)
+    limiter._inflight = 1
+    limiter.release(0.5)
+
+    assert limiter.limit == pytest.approx(9.0)
+    assert limiter.baseline < 0.02
+
+
+def test_limit_grows_while_in_use_and_fast():
+    limiter = AdaptiveLimiter("validation", limit=4, max_limit=5)
+    for _ in range(100):
+        limiter._inflight = 4
+        limiter.release(0.01)
+
+    assert limiter.limit == 5
+
+
+def test_idle_class_does_not_grow():
+    limiter = AdaptiveLimiter("validation", limit=10)
+    for _ in range(10):
+        limiter._inflight = 1
+        limiter.release(0.01)
+
+    assert limiter.limit == 10
+
+
+def test_server_errors_decrease_limit():
+    limiter = AdaptiveLimiter("write", limit=10)
+    limiter._inflight = 1
+    limiter.release(0.01, failed=True)
+
+    assert limiter.limit == pytest.approx(9.0)
+
+
+@pytest.mark.parametrize("method, path, expected", [
+    ("POST", "/token", admission.LOGIN),
+    ("GET", "/auth", admission.VALIDATION),
+    ("POST", "/introspect", admission.VALIDATION),
+    ("POST", "/customers/identify", admission.VALIDATION),
+    ("POST", "/customers/register", admission.WRITE),
+    ("POST", "/customers/anonymous/", admission.WRITE),
+    ("GET", "/customers/", admission.ADMIN_LIST),
+    ("GET", "/customers/search", admission.ADMIN_LIST),
+    ("GET", "/debug/profile", admission.ADMIN_LIST),
+    ("GET", "/health", None),
+])
+def test_classify(method, path, expected):
+    assert admission.classify(method, path) == expected
+
+
+def test_create_controller_reads_env(monkeypatch):
+    monkeypatch.setenv("ADMISSION_LOGIN_LIMIT", "3")
+    monkeypatch.setenv("ADMISSION_LOGIN_QUEUE_TIMEOUT_MS", "50")
+    login = admission.create_controller().limiters[admission.LOGIN]
+    assert login.limit == 3
+    assert login.queue_timeout == 0.05
+
+    monkeypatch.setenv("ADMISSION_CONTROL", "off")
+    assert admission.create_controller() is None
+
+
+def test_middleware_rejects_with_retry_after():
+    limiter = AdaptiveLimiter(admission.LOGIN, limit=1, max_queue=0)
+    controller = admission.AdmissionController({admission.LOGIN: limiter})
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+
+    @app.post("/token")
+    def token():
+        return {"ok": True}
+
+    @app.get("/health")
+    def health():
+        return {"ok": True}
+
+    client = TestClient(app)
+    assert client.post("/token").status_code == 200
+    assert limiter.inflight == 0
+
+    limiter.limit, limiter._inflight = 1, 1
+    response = client.post("/token")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert client.get("/health").status_code == 200
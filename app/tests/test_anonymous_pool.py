@@ -0,0 +1,103 @@
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.database import Base
+from app.models import models
+from app.services import anonymous_pool
+from app.services.anonymous_pool import AnonymousCustomerPool
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def test_acquire_reserves_a_batch_in_one_transaction(session_factory):
+    commits = []
+
+    def counting_factory():
+        session = session_factory()
+        original_commit = session.commit
+
+        def commit():
+            commits.append(1)
+            original_commit()
+        session.commit = commit
+        return session
+
+    pool = AnonymousCustomerPool(counting_factory, batch_size=5,
+                                 low_watermark=0)
+    pool._refill_in_background = lambda: None
+
+    customers = [pool.acquire() for _ in range(5)]
+
+    assert len({customer.id for customer in customers}) == 5
+    assert all(customer.name == "Anonymous" for customer in customers)
+    assert len(commits) == 1
+
+    with session_factory() as db:
+        stored = db.query(models.Customer).all()
+    assert sorted(c.id for c in stored) == sorted(c.id for c in customers)
+    assert all(c.email is None and c.cpf is None for c in stored)
+
+
+def test_acquire_refills_in_background(session_factory):
+    pool = AnonymousCustomerPool(session_factory, batch_size=4,
+                                 low_watermark=2)
+    refilled = []
+    pool._refill_in_background = lambda: refilled.append(True)
+
+    pool.acquire()
+    assert refilled == []
+    pool.acquire()
+    assert refilled == [True]
+
+
+def test_background_refill_extends_stock(session_factory):
+    pool = AnonymousCustomerPool(session_factory, batch_size=4,
+                                 low_watermark=3)
+    pool.acquire()
+
+    for _ in range(50):
+        if len(pool) > 3:
+            break
+        time.sleep(0.05)
+    assert len(pool) == 7
+
+
+def test_get_pool_is_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("ANONYMOUS_POOL_BATCH", raising=False)
+    assert anonymous_pool.get_pool() is None
+
+    monkeypatch.setenv("ANONYMOUS_POOL_BATCH", "0")
+    assert anonymous_pool.get_pool() is None
+
+
+def test_pool_reserves_customers_in_its_tenant(session_factory):
+    pool = AnonymousCustomerPool(session_factory, batch_size=2,
+                                 low_watermark=0, tenant_id="loja-2")
+    pool._refill_in_background = lambda: None
+
+    customer = pool.acquire()
+
+    with session_factory() as db:
+        stored = db.get(models.Customer, customer.id)
+    assert stored.tenant_id == "loja-2"
+
+
+def test_get_pool_is_per_tenant(monkeypatch):
+    monkeypatch.setenv("ANONYMOUS_POOL_BATCH", "10")
+    monkeypatch.setattr(anonymous_pool, "_pools", {})
+
+    default = anonymous_pool.get_pool()
+    other = anonymous_pool.get_pool("loja-2")
+
+    assert default is not other
+    assert anonymous_pool.get_pool("loja-2") is other
+    assert other.tenant_id == "loja-2"
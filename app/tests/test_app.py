@@ -18,3 +18,39 @@ def test_redoc():
     response = client.get("/redoc")
     assert response.status_code == status.HTTP_200_OK
     assert "ReDoc" in response.text
+
+
+def test_livez():
+    """Testa a rota de liveness, que não depende do banco"""
+    response = client.get("/livez")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"status": "alive"}
+
+
+def test_metrics():
+    """Testa a exposição dos sinais de escalonamento"""
+    response = client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE auth_kdf_queue_depth gauge" in response.text
+    assert "auth_threadpool_utilization" in response.text
+
+
+def test_readyz(mocker):
+    """Testa a rota de readiness com o worker pronto e indisponível"""
+    checks = {"draining": False, "database": True}
+    check = mocker.patch(
+        "app.services.health.ReadinessProbe.check",
+        return_value=(True, checks)
+    )
+
+    response = client.get("/readyz")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["status"] == "ready"
+
+    check.return_value = (False, {**checks, "database": False})
+    response = client.get("/readyz")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json() == {
+        "status": "unavailable", "draining": False, "database": False
+    }
@@ -0,0 +1,144 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.database import Base
+from app.models import models
+from app.services import batch_writer
+from app.services.batch_writer import GroupCommitWriter, WriterOverloaded
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'writer.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def test_concurrent_submits_share_one_batch(session_factory):
+    flushed = []
+    writer = GroupCommitWriter(
+        session_factory, models.Customer, max_batch=50, max_delay=0.2,
+        on_flush=flushed.append
+    )
+
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        ids = list(pool.map(
+            lambda i: writer.submit({'name': f'Anonymous {i}'}), range(10)
+        ))
+    writer.close(timeout=5)
+
+    assert len(set(ids)) == 10
+    assert sum(len(batch) for batch in flushed) == 10
+    assert len(flushed) < 10
+    with session_factory() as db:
+        names = {c.id: c.name for c in db.query(models.Customer)}
+    assert all(names[row_id].startswith('Anonymous') for row_id in ids)
+
+
+def test_ids_match_submitted_rows(session_factory):
+    writer = GroupCommitWriter(session_factory, models.Customer,
+                               max_delay=0.05)
+    futures = [
+        writer.submit_async({'name': name}) for name in ('a', 'b', 'c')
+    ]
+    ids = [future.result(timeout=5) for future in futures]
+    writer.close(timeout=5)
+
+    with session_factory() as db:
+        names = [db.get(models.Customer, row_id).name for row_id in ids]
+    assert names == ['a', 'b', 'c']
+
+
+def test_full_queue_applies_backpressure(session_factory):
+    gate = threading.Event()
+
+    def blocked_factory():
+        gate.wait(timeout=5)
+        return session_factory()
+
+    writer = GroupCommitWriter(
+        blocked_factory, models.Customer, max_batch=1, max_delay=0,
+        max_queue=1, enqueue_timeout=0.01
+    )
+    first = writer.submit_async({'name': 'a'})
+    # O primeiro item é retirado pelo thread, que fica bloqueado no flush
+    while writer.qsize():
+        pass
+    writer.submit_async({'name': 'b'})
+
+    with pytest.raises(WriterOverloaded):
+        writer.submit_async({'name': 'c'})
+
+    gate.set()
+    assert first.result(timeout=5)
+    writer.close(timeout=5)
+    with pytest.raises(WriterOverloaded):
+        writer.submit_async({'name': 'd'})
+
+
+def test_timed_out_row_is_not_written(session_factory):
+    gate = threading.Event()
+
+    def blocked_factory():
+        gate.wait(timeout=5)
+        return session_factory()
+
+    writer = GroupCommitWriter(
+        blocked_factory, models.Customer, max_batch=1, max_delay=0
+    )
+    first = writer.submit_async({'name': 'a'})
+    while writer.qsize():
+        pass
+
+    with pytest.raises(WriterOverloaded):
+        writer.submit({'name': 'b'}, timeout=0.05)
+
+    gate.set()
+    assert first.result(timeout=5)
+    writer.close(timeout=5)
+    with session_factory() as db:
+        assert [c.name for c in db.query(models.Customer)] == ['a']
+
+
+def test_close_fails_rows_left_in_full_queue(session_factory):
+    gate = threading.Event()
+
+    def blocked_factory():
+        gate.wait(timeout=5)
+        return session_factory()
+
+    writer = GroupCommitWriter(
+        blocked_factory, models.Customer, max_batch=1, max_delay=0,
+        max_queue=1
+    )
+    first = writer.submit_async({'name': 'a'})
+    while writer.qsize():
+        pass
+    queued = writer.submit_async({'name': 'b'})
+
+    writer.close(timeout=0.1)
+
+    with pytest.raises(WriterOverloaded):
+        queued.result(timeout=0)
+    gate.set()
+    assert first.result(timeout=5)
+
+
+def test_flush_error_is_propagated():
+    def broken_factory():
+        raise RuntimeError('db down')
+
+    writer = GroupCommitWriter(broken_factory, models.Customer)
+    with pytest.raises(RuntimeError):
+        writer.submit({'name': 'a'}, timeout=5)
+    writer.close(timeout=5)
+
+
+def test_writer_disabled_by_default(monkeypatch):
+    monkeypatch.delenv('GROUP_COMMIT_DELAY_MS', raising=False)
+    assert batch_writer.get_customer_writer() is None
@@ -0,0 +1,283 @@
+import json
+import queue
+import threading
+from unittest import mock
+
+import pytest
+
+from app.services import cache
+from app.services.cache import (
+    LRUCache,
+    RedisCache,
+    SQLiteCache,
+    TieredCache,
+    cache_key,
+)
+
+
+class FakeRedis:
+    """Subconjunto de `redis.Redis` usado pelo `RedisCache`."""
+
+    def __init__(self):
+        self.data = {}
+        self.channels = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, px=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode()
+        return True
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match):
+        prefix = match.rstrip('*')
+        return [key for key in self.data if key.startswith(prefix)]
+
+    def publish(self, channel, message):
+        for subscriber in self.channels.get(channel, []):
+            subscriber.put({'type': 'message', 'data': message.encode()})
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        fake = self
+
+        class PubSub:
+            def __init__(self):
+                self.messages = queue.Queue()
+
+            def subscribe(self, channel):
+                fake.channels.setdefault(channel, []).append(self.messages)
+
+            def listen(self):
+                while True:
+                    yield self.messages.get()
+
+        return PubSub()
+
+
+def test_cache_key():
+    assert cache_key('customers', 'cpf', 123) == 'customers:cpf:123'
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    lru.get('a')
+    lru.set('c', 3)
+
+    assert lru.get('a') == 1
+    assert lru.get('b') is None
+    assert len(lru) == 2
+
+
+def test_lru_expires_entries():
+    lru = LRUCache()
+    with mock.patch('app.services.cache.time.monotonic', return_value=100):
+        lru.set('a', 1, ttl=5)
+    with mock.patch('app.services.cache.time.monotonic', return_value=106):
+        assert lru.get('a') is None
+
+
+def test_lru_add_only_when_absent_or_expired():
+    lru = LRUCache()
+
+    assert lru.add('a', 1)
+    assert not lru.add('a', 2)
+    assert lru.get('a') == 1
+
+    lru.set('b', 1, ttl=-1)
+    assert lru.add('b', 2)
+    assert lru.get('b') == 2
+
+
+def test_lru_invalidate_notifies_subscribers():
+    lru = LRUCache()
+    received = []
+    lru.subscribe(received.append)
+    lru.set('a', 1)
+
+    lru.invalidate('a')
+
+    assert lru.get('a') is None
+    assert received == [['a']]
+
+
+def test_add_if_unchanged_skips_invalidated_keys():
+    lru = LRUCache()
+    generation = lru.generation('a')
+    assert lru.add_if_unchanged('a', 1, None, generation)
+
+    generation = lru.generation('b')
+    lru.invalidate('b')
+    assert not lru.add_if_unchanged('b', 1, None, generation)
+    assert lru.get('b') is None
+
+
+def test_forgotten_generations_stay_conservative(monkeypatch):
+    lru = LRUCache()
+    monkeypatch.setattr(lru, '_GENERATIONS', 1)
+    generation = lru.generation('a')
+
+    lru.invalidate('a')
+    lru.invalidate('b')
+
+    assert lru.generation('a') != generation
+
+
+def test_sqlite_generation_sees_other_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    worker_a = SQLiteCache(path)
+    worker_b = SQLiteCache(path)
+    generation = worker_b.generation('a')
+
+    worker_a.invalidate('a')
+
+    assert not worker_b.add_if_unchanged('a', 1, None, generation)
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    worker_a = SQLiteCache(path)
+    worker_b = SQLiteCache(path, poll_interval=0)
+    received = []
+    worker_b.subscribe(received.append)
+
+    worker_a.set('customers:count', 10)
+    assert worker_b.get('customers:count') == 10
+
+    worker_a.invalidate('customers:count')
+    assert worker_b.get('customers:count') is None
+    assert received == [['customers:count']]
+
+
+def test_sqlite_cache_expires_entries(tmp_path):
+    sqlite_cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'))
+    sqlite_cache.set('a', {'x': 1}, ttl=-1)
+    assert sqlite_cache.get('a') is None
+
+
+def test_sqlite_cache_purges_expired_and_excess_entries(tmp_path):
+    sqlite_cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'),
+                               max_entries=2)
+    sqlite_cache.set('expired', 1, ttl=-1)
+    sqlite_cache.set('soon', 1, ttl=10)
+    sqlite_cache.set('later', 1, ttl=100)
+    sqlite_cache.set('forever', 1)
+
+    assert sqlite_cache.purge() == 2
+
+    assert sqlite_cache.get('soon') is None
+    assert sqlite_cache.get('later') == 1
+    assert sqlite_cache.get('forever') == 1
+
+
+def test_sqlite_cache_purges_on_write_when_due(tmp_path):
+    sqlite_cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'),
+                               purge_interval=0)
+    sqlite_cache.set('expired', 1, ttl=-1)
+
+    sqlite_cache.set('other', 1)
+
+    count = sqlite_cache._connection().execute(
+        'SELECT COUNT(*) FROM cache_entries'
+    ).fetchone()[0]
+    assert count == 1
+
+
+def test_sqlite_cache_add_is_exclusive_between_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    worker_a = SQLiteCache(path)
+    worker_b = SQLiteCache(path)
+
+    assert worker_a.add('lock', 'a', ttl=10)
+    assert not worker_b.add('lock', 'b', ttl=10)
+    assert worker_b.get('lock') == 'a'
+
+    worker_a.set('expired', 'a', ttl=-1)
+    assert worker_b.add('expired', 'b', ttl=10)
+    assert worker_a.get('expired') == 'b'
+
+
+def test_redis_cache_roundtrip_and_pubsub():
+    client = FakeRedis()
+    worker_a = RedisCache(client)
+    worker_b = RedisCache(client)
+    received = threading.Event()
+    worker_b.subscribe(lambda keys: received.set())
+
+    worker_a.set('a', {'id': 1}, ttl=10)
+    assert json.loads(client.data['auth:a']) == {'id': 1}
+    assert worker_b.get('a') == {'id': 1}
+
+    worker_a.invalidate('a')
+    assert worker_b.get('a') is None
+    assert received.wait(timeout=2)
+
+    worker_a.set('b', 1)
+    worker_a.clear()
+    assert client.data == {}
+
+
+def test_redis_cache_add_uses_nx():
+    redis_cache = RedisCache(FakeRedis())
+
+    assert redis_cache.add('a', 1, ttl=10)
+    assert not redis_cache.add('a', 2, ttl=10)
+    assert redis_cache.get('a') == 1
+
+
+def test_tiered_cache_add_is_decided_by_shared_backend(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    worker_a = TieredCache(LRUCache(), SQLiteCache(path, poll_interval=0))
+    worker_b = TieredCache(LRUCache(), SQLiteCache(path, poll_interval=0))
+
+    assert worker_a.add('lock', 'a', ttl=10)
+    assert not worker_b.add('lock', 'b', ttl=10)
+
+
+def test_redis_from_url_requires_package():
+    with mock.patch.dict('sys.modules', {'redis': None}):
+        with pytest.raises(RuntimeError):
+            RedisCache.from_url('redis://localhost')
+
+
+def test_tiered_cache_evicts_local_copies_everywhere(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    worker_a = TieredCache(LRUCache(), SQLiteCache(path, poll_interval=0))
+    worker_b = TieredCache(LRUCache(), SQLiteCache(path, poll_interval=0))
+
+    worker_a.set('a', 1)
+    assert worker_b.get('a') == 1
+    assert worker_b.local.get('a') == 1
+
+    worker_a.invalidate('a')
+    assert worker_b.get('a') is None
+
+
+@pytest.mark.parametrize('backend, expected', [
+    ('memory', LRUCache),
+    ('sqlite', SQLiteCache),
+])
+def test_create_cache_from_env(monkeypatch, tmp_path, backend, expected):
+    monkeypatch.setenv('CACHE_BACKEND', backend)
+    monkeypatch.setenv('CACHE_PATH', str(tmp_path / 'cache.sqlite3'))
+    assert isinstance(cache.create_cache(), expected)
+
+
+def test_create_cache_with_local_tier(monkeypatch, tmp_path):
+    monkeypatch.setenv('CACHE_BACKEND', 'sqlite')
+    monkeypatch.setenv('CACHE_PATH', str(tmp_path / 'cache.sqlite3'))
+    monkeypatch.setenv('CACHE_LOCAL_TTL', '1')
+    assert isinstance(cache.create_cache(), TieredCache)
+
+
+def test_create_cache_rejects_unknown_backend(monkeypatch):
+    monkeypatch.setenv('CACHE_BACKEND', 'memcached')
+    with pytest.raises(ValueError):
+        cache.create_cache()
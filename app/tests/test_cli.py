@@ -0,0 +1,65 @@
+import pytest
+from unittest import mock
+
+from app import cli
+
+
+def test_create_admin_command_runs_bootstrap():
+    with mock.patch('app.cli.create_admin_user') as create_admin_user:
+        exit_code = cli.main(['create-admin'])
+
+    assert exit_code == 0
+    create_admin_user.assert_called_once()
+
+
+def test_create_admin_command_closes_session():
+    session = mock.MagicMock()
+    with mock.patch('app.cli.SessionLocal', return_value=session), \
+            mock.patch('app.cli.create_admin_user',
+                       side_effect=RuntimeError('boom')):
+        with pytest.raises(RuntimeError):
+            cli.main(['create-admin'])
+
+    session.close.assert_called_once()
+
+
+def test_create_client_command_prints_secret(capsys):
+    session = mock.MagicMock()
+    with mock.patch('app.cli.SessionLocal', return_value=session), \
+            mock.patch('app.cli.register_client',
+                       return_value='s3cret') as register_client:
+        exit_code = cli.main([
+            'create-client', 'orders', '--scope', 'customers:read',
+            'customers:write', '--tenant', 'loja-2'
+        ])
+
+    assert exit_code == 0
+    register_client.assert_called_once_with(
+        session, 'orders', scope='customers:read customers:write',
+        tenant_id='loja-2'
+    )
+    assert 'client_secret=s3cret' in capsys.readouterr().out
+    session.close.assert_called_once()
+
+
+def test_unknown_command_exits():
+    with pytest.raises(SystemExit):
+        cli.main(['unknown'])
+
+
+def test_seed_customers_command(capsys):
+    engine = mock.MagicMock()
+    with mock.patch('app.cli.get_engine', return_value=engine), \
+            mock.patch('app.cli.seed_customers',
+                       return_value=1000) as seed_customers:
+        exit_code = cli.main([
+            'seed-customers', '1000', '--start', '5', '--tenant', 'loja-2',
+            '--batch-size', '500'
+        ])
+
+    assert exit_code == 0
+    seed_customers.assert_called_once_with(
+        engine, 1000, start=5, tenant_id='loja-2',
+        password=cli.SYNTHETIC_PASSWORD, batch_size=500
+    )
+    assert 'customers=1000' in capsys.readouterr().out
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from jose import jwt
+
+from app.client import AsyncAuthClient, AuthClient, AuthError, AuthServiceError
+
+SECRET = "client-secret"
+CUSTOMER = {
+    "id": 1, "name": "Admin", "email": "admin@fiap.com.br", "cpf": None
+}
+
+
+def make_token(minutes=30, secret=SECRET):
+    exp = datetime.now(timezone.utc) + timedelta(minutes=minutes)
+    return jwt.encode({"sub": "1", "exp": exp}, secret, algorithm="HS256")
+
+
+class AuthHandler:
+    """Transporte fake que conta as chamadas a `GET /auth`."""
+
+    def __init__(self, status_code=200, gate=None):
+        self.calls = 0
+        self.status_code = status_code
+        self.gate = gate
+
+    def __call__(self, request):
+        assert request.url.path == "/auth"
+        assert request.headers["Authorization"].startswith("Bearer ")
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(timeout=5)
+        return httpx.Response(self.status_code, json=CUSTOMER)
+
+
+def test_validate_caches_until_expiry():
+    handler = AuthHandler()
+    client = AuthClient("http://auth", transport=httpx.MockTransport(handler))
+    token = make_token()
+
+    assert client.validate(token) == CUSTOMER
+    assert client.validate(token) == CUSTOMER
+    assert handler.calls == 1
+
+
+def test_expired_token_rejected_without_request():
+    handler = AuthHandler()
+    client = AuthClient("http://auth", transport=httpx.MockTransport(handler))
+
+    with pytest.raises(AuthError):
+        client.validate(make_token(minutes=-1))
+    with pytest.raises(AuthError):
+        client.validate("not-a-jwt")
+    assert handler.calls == 0
+
+
+def test_local_signature_check_with_secret():
+    handler = AuthHandler()
+    client = AuthClient(
+        "http://auth", secret_key=SECRET,
+        transport=httpx.MockTransport(handler)
+    )
+
+    assert client.verify(make_token())["sub"] == "1"
+    with pytest.raises(AuthError):
+        client.validate(make_token(secret="other"))
+    assert handler.calls == 0
+
+
+def test_verify_requires_secret():
+    client = AuthClient("http://auth")
+    with pytest.raises(RuntimeError):
+        client.verify(make_token())
+
+
+def test_remote_rejection_and_failures():
+    token = make_token()
+    rejected = AuthClient(
+        "http://auth", transport=httpx.MockTransport(AuthHandler(401))
+    )
+    with pytest.raises(AuthError) as excinfo:
+        rejected.validate(token)
+    assert excinfo.value.status_code == 401
+
+    failing = AuthClient(
+        "http://auth", transport=httpx.MockTransport(AuthHandler(503))
+    )
+    with pytest.raises(AuthServiceError):
+        failing.validate(token)
+
+
+def test_concurrent_validations_are_coalesced():
+    gate = threading.Event()
+    handler = AuthHandler(gate=gate)
+    client = AuthClient("http://auth", transport=httpx.MockTransport(handler))
+    token = make_token()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(client.validate, token) for _ in range(8)]
+        while handler.calls == 0:
+            pass
+        gate.set()
+        results = [future.result(timeout=5) for future in futures]
+
+    assert results == [CUSTOMER] * 8
+    assert handler.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_async_validations_are_coalesced_and_cached():
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json=CUSTOMER)
+
+    async with AsyncAuthClient(
+        "http://auth", transport=httpx.MockTransport(handler)
+    ) as client:
+        token = make_token()
+        results = await asyncio.gather(
+            *(client.validate(token) for _ in range(10))
+        )
+        assert await client.validate(token) == CUSTOMER
+
+    assert results == [CUSTOMER] * 10
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_async_error_propagates_to_followers():
+    async def handler(request):
+        await asyncio.sleep(0.01)
+        return httpx.Response(401)
+
+    client = AsyncAuthClient(
+        "http://auth", transport=httpx.MockTransport(handler)
+    )
+    token = make_token()
+    results = await asyncio.gather(
+        *(client.validate(token) for _ in range(3)), return_exceptions=True
+    )
+    await client.aclose()
+
+    assert all(isinstance(result, AuthError) for result in results)
@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.database.database import Base
+from app.models import models
+from app.services import cache, clients, security
+from app.services.clients import (
+    ClientRegistry, InvalidClient, InvalidScope, RegisteredClient
+)
+
+
+def make_client(secret="s3cret", scope="customers:read customers:write"):
+    return RegisteredClient(
+        "orders", clients.hash_secret(secret), "loja-2", scope
+    )
+
+
+@pytest.fixture
+def registry():
+    registry = ClientRegistry(loader=lambda: [make_client()])
+    registry.reload()
+    return registry
+
+
+def test_authenticate_verifies_hmac_secret(registry):
+    client = registry.authenticate("orders", "s3cret")
+
+    assert client.client_id == "orders"
+    with pytest.raises(InvalidClient):
+        registry.authenticate("orders", "wrong")
+    with pytest.raises(InvalidClient):
+        registry.authenticate("unknown", "s3cret")
+
+
+def test_issue_token_carries_service_claims(registry):
+    client = registry.authenticate("orders", "s3cret")
+
+    issued = registry.issue_token(client, "customers:read")
+
+    claims = security.claims_from_payload(
+        security.decode_access_token(issued.access_token)
+    )
+    assert claims.sub == "client:orders"
+    assert claims.role == security.ROLE_SERVICE
+    assert claims.tenant == "loja-2"
+    assert claims.scopes == {"customers:read"}
+
+
+def test_issue_token_rejects_scope_not_granted(registry):
+    client = registry.authenticate("orders", "s3cret")
+
+    with pytest.raises(InvalidScope):
+        registry.issue_token(client, "customers:admin")
+
+
+def test_issue_token_reuses_cached_token(registry, mocker):
+    client = registry.authenticate("orders", "s3cret")
+    first = registry.issue_token(client)
+    create = mocker.patch("app.services.security.create_access_token")
+
+    second = registry.issue_token(client)
+
+    assert second is first
+    create.assert_not_called()
+
+
+def test_cached_token_is_renewed_after_half_its_lifetime(registry):
+    registry.token_ttl = timedelta(seconds=10)
+    client = registry.authenticate("orders", "s3cret")
+    first = registry.issue_token(client)
+    registry._tokens[("orders", first.scope)] = first._replace(
+        expires_at=first.expires_at - 6
+    )
+
+    assert registry.issue_token(client).expires_at > first.expires_at - 6
+
+
+def test_invalidation_triggers_reload(mocker):
+    loaded = [[make_client()], [make_client(secret="rotated")]]
+    registry = ClientRegistry(loader=lambda: loaded.pop(0))
+    registry.reload()
+    thread = mocker.patch("app.services.clients.threading.Thread")
+    thread.return_value.start.side_effect = registry.reload
+
+    registry.on_invalidate([clients.CLIENTS_CACHE_KEY])
+
+    assert registry.authenticate("orders", "rotated")
+    with pytest.raises(InvalidClient):
+        registry.authenticate("orders", "s3cret")
+
+
+def test_register_client_stores_only_the_hash(mocker):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    invalidate = mocker.spy(cache, "invalidate")
+
+    with Session(bind=engine) as db:
+        secret = clients.register_client(db, "orders", "customers:read")
+        stored = db.query(models.Client).one()
+
+    assert stored.secret_hash == clients.hash_secret(secret)
+    assert stored.scope == "customers:read"
+    invalidate.assert_called_once_with([clients.CLIENTS_CACHE_KEY])
+    engine.dispose()
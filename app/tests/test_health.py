@@ -0,0 +1,144 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from app.services import health
+from app.services.health import ReadinessProbe, pool_saturation
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'health.db'}", poolclass=QueuePool,
+        pool_size=1, max_overflow=1
+    )
+    yield engine
+    engine.dispose()
+
+
+def test_pool_saturation(engine):
+    assert pool_saturation(engine) == 0
+    first = engine.connect()
+    assert pool_saturation(engine) == 0.5
+    second = engine.connect()
+    assert pool_saturation(engine) == 1
+    first.close()
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_ready_with_reachable_database(engine):
+    probe = ReadinessProbe(lambda: engine)
+
+    ready, checks = await probe.check()
+
+    assert ready
+    assert checks["database"] is True
+    assert checks["kdf_queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_database_check_is_cached(engine, mocker):
+    probe = ReadinessProbe(lambda: engine, db_cache_ttl=60)
+    ping = mocker.spy(probe, "_ping")
+
+    assert await probe.check_database()
+    assert await probe.check_database()
+    assert ping.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_unreachable_database_is_not_ready(engine):
+    def broken():
+        raise RuntimeError("connection refused")
+
+    probe = ReadinessProbe(lambda: engine)
+    probe._ping = broken
+
+    ready, checks = await probe.check()
+
+    assert not ready
+    assert checks["database"] is False
+
+
+@pytest.mark.asyncio
+async def test_ping_does_not_use_the_pool(engine):
+    probe = ReadinessProbe(lambda: engine)
+    held = [engine.connect(), engine.connect()]
+
+    assert await probe.check_database()
+    for connection in held:
+        connection.close()
+
+
+@pytest.mark.asyncio
+async def test_hung_ping_is_not_started_again(engine):
+    release = threading.Event()
+    calls = []
+
+    def hung():
+        calls.append(1)
+        release.wait(5)
+        return True
+
+    probe = ReadinessProbe(lambda: engine, db_cache_ttl=0, db_timeout=0.05)
+    probe._ping = hung
+
+    assert not await probe.check_database()
+    assert not await probe.check_database()
+    assert calls == [1]
+
+    release.set()
+    while probe._ping_running:
+        await asyncio.sleep(0.01)
+    assert await probe.check_database()
+    assert calls == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_saturated_pool_is_not_ready(engine):
+    probe = ReadinessProbe(lambda: engine)
+    await probe.check_database()
+    connections = [engine.connect(), engine.connect()]
+
+    ready, checks = await probe.check()
+
+    assert not ready
+    assert checks["pool_saturation"] == 1
+    for connection in connections:
+        connection.close()
+
+
+@pytest.mark.asyncio
+async def test_kdf_backlog_and_draining_are_not_ready(engine, mocker):
+    mocker.patch(
+        "app.services.kdf.get_kdf_pool",
+        return_value=SimpleNamespace(queue_depth=5, max_workers=1)
+    )
+    probe = ReadinessProbe(lambda: engine, max_kdf_queue=4)
+
+    ready, checks = await probe.check()
+    assert not ready
+    assert checks["kdf_queue_depth"] == 5
+
+    mocker.patch(
+        "app.services.kdf.get_kdf_pool",
+        return_value=SimpleNamespace(queue_depth=0, max_workers=1)
+    )
+    assert (await probe.check())[0]
+    assert not (await probe.check(draining=True))[0]
+
+
+def test_get_probe_reads_env(monkeypatch):
+    monkeypatch.setattr(health, "_probe", None)
+    monkeypatch.setenv("READINESS_DB_CACHE_MS", "500")
+    monkeypatch.setenv("READINESS_MAX_KDF_QUEUE", "8")
+
+    probe = health.get_probe()
+
+    assert probe.db_cache_ttl == 0.5
+    assert probe.max_kdf_queue == 8
@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pytest
+
+from app.services import cache, idempotency
+from app.services.idempotency import (
+    IdempotencyConflict, IdempotencyInProgress, IdempotencyStore
+)
+
+
+def test_fingerprint_ignores_key_order():
+    assert idempotency.fingerprint({'a': 1, 'b': 2}) == (
+        idempotency.fingerprint({'b': 2, 'a': 1})
+    )
+    assert idempotency.fingerprint({'a': 1}) != (
+        idempotency.fingerprint({'a': 2})
+    )
+
+
+def test_idempotency_key_is_scoped():
+    assert idempotency.idempotency_key('loja-2', '7', 'register', 'k') == (
+        'idempotency:loja-2:7:register:k'
+    )
+
+
+def test_replay_returns_stored_response():
+    store = IdempotencyStore()
+    calls = []
+
+    def create():
+        calls.append(1)
+        return {'id': len(calls)}
+
+    assert store.run('k', 'fp', create) == ({'id': 1}, False)
+    assert store.run('k', 'fp', create) == ({'id': 1}, True)
+    assert calls == [1]
+
+
+def test_reused_key_with_other_request_conflicts():
+    store = IdempotencyStore()
+    store.run('k', 'fp', lambda: {'id': 1})
+
+    with pytest.raises(IdempotencyConflict):
+        store.run('k', 'other', lambda: {'id': 2})
+
+
+def test_failure_releases_key():
+    store = IdempotencyStore()
+
+    def fail():
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        store.run('k', 'fp', fail)
+
+    assert store.run('k', 'fp', lambda: {'id': 2}) == ({'id': 2}, False)
+
+
+def test_concurrent_duplicates_are_coalesced():
+    store = IdempotencyStore()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def create():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'id': 1}
+
+    def request():
+        results.append(store.run('k', 'fp', create))
+
+    first = threading.Thread(target=request)
+    first.start()
+    assert started.wait(5)
+    duplicates = [threading.Thread(target=request) for _ in range(3)]
+    for thread in duplicates:
+        thread.start()
+    release.set()
+    for thread in [first] + duplicates:
+        thread.join(5)
+
+    assert calls == [1]
+    assert sorted(results, key=lambda result: result[1]) == [
+        ({'id': 1}, False), ({'id': 1}, True), ({'id': 1}, True),
+        ({'id': 1}, True),
+    ]
+
+
+def test_duplicate_of_request_in_another_worker_is_refused_at_once():
+    store = IdempotencyStore(wait_timeout=5)
+    store.backend.set('k', {'state': 'pending', 'fp': 'fp'}, ttl=30)
+
+    started = time.monotonic()
+    with pytest.raises(IdempotencyInProgress):
+        store.run('k', 'fp', lambda: {'id': 1})
+    assert time.monotonic() - started < 1
+
+
+def test_expired_reservation_runs_again():
+    store = IdempotencyStore()
+    store.backend.set('k', {'state': 'pending', 'fp': 'fp'}, ttl=-1)
+
+    assert store.run('k', 'fp', lambda: {'id': 3}) == ({'id': 3}, False)
+
+
+def test_keys_survive_customer_cache_eviction():
+    store = IdempotencyStore()
+    store.run('k', 'fp', lambda: {'id': 1})
+
+    cache.get_cache().clear()
+
+    assert store.run('k', 'fp', lambda: {'id': 2}) == ({'id': 1}, True)
+
+
+def test_backend_defaults_to_cache_backend(tmp_path, monkeypatch):
+    monkeypatch.delenv('IDEMPOTENCY_BACKEND', raising=False)
+    monkeypatch.setenv('CACHE_BACKEND', 'sqlite')
+    monkeypatch.setenv('IDEMPOTENCY_PATH', str(tmp_path / 'keys.db'))
+
+    backend = idempotency.create_backend()
+
+    assert isinstance(backend, cache.SQLiteCache)
+    assert backend.path == str(tmp_path / 'keys.db')
+
+
+def test_memory_backend_warns(monkeypatch, mocker):
+    monkeypatch.setenv('IDEMPOTENCY_BACKEND', 'memory')
+    warning = mocker.patch.object(idempotency.logger, 'warning')
+    idempotency.set_store(None)
+
+    assert isinstance(idempotency.get_store().backend, cache.LRUCache)
+    warning.assert_called_once()
@@ -0,0 +1,180 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services import kdf, security
+from app.services.kdf import KDFPool
+from app.tools import tracing
+
+
+def test_queue_depth_counts_waiting_jobs():
+    pool = KDFPool(max_workers=1)
+    gate = threading.Event()
+    first = pool.submit(gate.wait, 5)
+    second = pool.submit(lambda: "done")
+
+    while pool.active == 0:
+        pass
+    assert pool.queue_depth == 1
+
+    gate.set()
+    assert first.result(timeout=5) is True
+    assert second.result(timeout=5) == "done"
+    assert pool.queue_depth == 0
+    assert pool.active == 0
+    pool.shutdown()
+
+
+def test_submit_after_shutdown_keeps_counters():
+    pool = KDFPool(max_workers=1)
+    pool.shutdown()
+    with pytest.raises(RuntimeError):
+        pool.submit(lambda: None)
+    assert pool.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_verify_password_runs_in_pool_with_trace_context(mocker):
+    exporter = tracing.InMemorySpanExporter()
+    tracing.set_tracer(tracing.Tracer(tracing.SimpleSpanProcessor(exporter)))
+    threads = []
+
+    def verify(plain, hashed):
+        threads.append(threading.current_thread().name)
+        with tracing.start_span("bcrypt.verify"):
+            return plain == hashed
+
+    mocker.patch("app.services.security.verify_password", side_effect=verify)
+    try:
+        with tracing.start_span("login") as login:
+            assert await kdf.verify_password("secret", "secret")
+    finally:
+        tracing.set_tracer(None)
+
+    assert threads[0].startswith("kdf")
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert spans["bcrypt.verify"].parent_id == login.context.span_id
+
+
+def test_shutdown_kdf_pool_resets_singleton():
+    pool = kdf.get_kdf_pool()
+    kdf.shutdown_kdf_pool()
+
+    with pytest.raises(RuntimeError):
+        pool.submit(lambda: None)
+    assert kdf.get_kdf_pool() is not pool
+
+
+def test_dummy_hash_matches_real_hash_cost():
+    scheme = security.pwd_context.identify(kdf.DUMMY_HASH)
+    real = security.pwd_context.hash("password")
+
+    assert scheme == "bcrypt"
+    assert kdf.DUMMY_HASH[:7] == real[:7]
+
+
+@pytest.mark.asyncio
+async def test_verify_password_without_hash_pays_dummy_verify(mocker):
+    verify = mocker.patch(
+        "app.services.security.verify_password", return_value=True
+    )
+
+    assert await kdf.verify_password("secret", None) is False
+    verify.assert_called_once_with("secret", kdf.DUMMY_HASH)
+
+
+@pytest.mark.asyncio
+async def test_run_cancels_queued_job_when_client_disconnects():
+    pool = KDFPool(max_workers=1)
+    gate = threading.Event()
+    calls = []
+    blocker = pool.submit(gate.wait, 5)
+
+    async def disconnected():
+        return True
+
+    with pytest.raises(kdf.ClientDisconnected):
+        await pool.run(calls.append, "queued", is_disconnected=disconnected)
+
+    gate.set()
+    assert blocker.result(timeout=5) is True
+    pool.shutdown()
+    assert calls == []
+    assert pool.abandoned == 1
+    assert pool.queue_depth == 0
+    assert pool.active == 0
+
+
+@pytest.mark.asyncio
+async def test_run_finishes_started_job_after_disconnect():
+    pool = KDFPool(max_workers=1)
+
+    async def disconnected():
+        return True
+
+    # Com o pool livre a derivação começa de imediato e não é cancelada
+    assert await pool.run(
+        lambda: "done", is_disconnected=disconnected
+    ) == "done"
+    assert pool.abandoned == 0
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_keeps_waiting_while_client_connected():
+    pool = KDFPool(max_workers=1)
+    gate = threading.Event()
+    blocker = pool.submit(gate.wait, 5)
+
+    async def connected():
+        gate.set()
+        return False
+
+    assert await pool.run(lambda: "done", is_disconnected=connected) == "done"
+    assert blocker.result(timeout=5) is True
+    assert pool.abandoned == 0
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_request_abandons_queued_job():
+    pool = KDFPool(max_workers=1)
+    gate = threading.Event()
+    pool.submit(gate.wait, 5)
+
+    task = asyncio.ensure_future(pool.run(lambda: "done"))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    gate.set()
+    pool.shutdown()
+    assert pool.abandoned == 1
+    assert pool.queue_depth == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_request_abandons_job_while_polling_disconnect():
+    pool = KDFPool(max_workers=1)
+    gate = threading.Event()
+    calls = []
+    pool.submit(gate.wait, 5)
+
+    async def connected():
+        return False
+
+    task = asyncio.ensure_future(
+        pool.run(calls.append, "queued", is_disconnected=connected)
+    )
+    await asyncio.sleep(kdf.DISCONNECT_POLL_INTERVAL * 2)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    gate.set()
+    pool.shutdown()
+    assert calls == []
+    assert pool.abandoned == 1
+    assert pool.queue_depth == 0
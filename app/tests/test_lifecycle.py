@@ -0,0 +1,60 @@
+import pytest
+
+from app.services import lifecycle
+
+
+@pytest.fixture(autouse=True)
+def reset_lifecycle():
+    yield
+    lifecycle.reset()
+
+
+@pytest.fixture
+def steps(mocker):
+    manager = mocker.Mock()
+    mocker.patch(
+        "app.services.kdf.shutdown_kdf_pool", manager.kdf
+    )
+    mocker.patch(
+        "app.services.batch_writer.close_customer_writer",
+        manager.batch_writer
+    )
+    mocker.patch("app.tools.tracing.set_tracer", manager.tracing)
+    mocker.patch("app.services.lifecycle.dispose_engine", manager.database)
+    return manager
+
+
+def test_start_draining():
+    assert not lifecycle.is_draining()
+    lifecycle.start_draining()
+    assert lifecycle.is_draining()
+
+
+def test_shutdown_releases_resources_in_order(steps):
+    assert lifecycle.shutdown_resources(timeout=1) == []
+
+    assert lifecycle.is_draining()
+    assert [call[0] for call in steps.mock_calls] == [
+        "kdf", "batch_writer", "tracing", "database"
+    ]
+    steps.batch_writer.assert_called_once_with(1)
+    steps.tracing.assert_called_once_with(None)
+
+
+def test_shutdown_continues_after_failure(steps):
+    steps.kdf.side_effect = RuntimeError("boom")
+
+    assert lifecycle.shutdown_resources() == ["kdf"]
+    steps.database.assert_called_once_with()
+
+
+def test_close_customer_writer_flushes(mocker):
+    from app.services import batch_writer
+
+    writer = mocker.Mock()
+    mocker.patch.object(batch_writer, "_writer", writer)
+
+    batch_writer.close_customer_writer(2)
+
+    writer.close.assert_called_once_with(2)
+    assert batch_writer._writer is None
@@ -0,0 +1,215 @@
+import json
+import os
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.database.pool_stats import PoolWaitStats, TimedQueuePool
+from app.services import admission, metrics
+from app.services.metrics import Metric, render
+
+
+def test_render_text_format():
+    body = render([
+        Metric('auth_kdf_queue_depth', 'gauge', 'Fila.', [('', {}, 3)]),
+        Metric('auth_requests_queued', 'gauge', 'Fila por classe.', [
+            ('', {'class': 'login'}, 2),
+            ('', {'class': 'write'}, 0.5),
+        ]),
+        Metric('auth_db_pool_wait_seconds', 'summary', 'Espera.', [
+            ('_count', {}, 10),
+            ('_sum', {}, 0.25),
+        ]),
+    ])
+
+    assert body.splitlines() == [
+        '# HELP auth_kdf_queue_depth Fila.',
+        '# TYPE auth_kdf_queue_depth gauge',
+        'auth_kdf_queue_depth 3',
+        '# HELP auth_requests_queued Fila por classe.',
+        '# TYPE auth_requests_queued gauge',
+        'auth_requests_queued{class="login"} 2',
+        'auth_requests_queued{class="write"} 0.5',
+        '# HELP auth_db_pool_wait_seconds Espera.',
+        '# TYPE auth_db_pool_wait_seconds summary',
+        'auth_db_pool_wait_seconds_count 10',
+        'auth_db_pool_wait_seconds_sum 0.25',
+    ]
+    assert body.endswith('\n')
+
+
+def test_render_escapes_label_values():
+    body = render([
+        Metric('m', 'gauge', 'h', [('', {'class': 'a"b\\c'}, 1)]),
+    ])
+
+    assert 'm{class="a\\"b\\\\c"} 1' in body
+
+
+@pytest.mark.asyncio
+async def test_collect_reports_admission_per_class(mocker):
+    controller = admission.AdmissionController({
+        admission.LOGIN: admission.AdaptiveLimiter(admission.LOGIN, 4),
+    })
+    controller.limiters[admission.LOGIN].rejected = 7
+    mocker.patch.object(admission, 'get_controller', return_value=controller)
+
+    collected = {metric.name: metric for metric in await metrics.collect()}
+
+    assert collected['auth_admission_limit'].samples == [
+        ('', {'class': admission.LOGIN}, 4)
+    ]
+    assert collected['auth_admission_rejected_total'].samples == [
+        ('', {'class': admission.LOGIN}, 7)
+    ]
+    assert collected['auth_kdf_saturation'].samples[0][2] == 0
+    assert 0 <= collected['auth_threadpool_utilization'].samples[0][2] <= 1
+
+
+@pytest.mark.asyncio
+async def test_collect_without_admission(mocker):
+    mocker.patch.object(admission, 'get_controller', return_value=None)
+
+    collected = {metric.name: metric for metric in await metrics.collect()}
+
+    assert collected['auth_requests_inflight'].samples == []
+
+
+def _worker_sample(**overrides):
+    values = {
+        'kdf_workers': 4, 'kdf_active': 2, 'kdf_queue_depth': 2,
+        'kdf_abandoned': 1, 'threadpool_size': 40, 'threadpool_in_use': 10,
+        'db_checked_out': 5, 'db_capacity': 10, 'db_wait_count': 3,
+        'db_wait_sum': 0.5,
+        'admission': {'login': {
+            'inflight': 2, 'queued': 1, 'limit': 8, 'rejected': 2,
+        }},
+    }
+    values.update(overrides)
+    return values
+
+
+def _values(collected, name):
+    metric = next(m for m in collected if m.name == name)
+    return {(suffix, tuple(labels.items())): value
+            for suffix, labels, value in metric.samples}
+
+
+def test_aggregate_sums_workers():
+    collected = metrics.aggregate(
+        [_worker_sample(), _worker_sample(kdf_active=0, kdf_queue_depth=0)],
+        archived={'kdf_abandoned': 5, 'admission_rejected:login': 1},
+    )
+
+    assert _values(collected, 'auth_kdf_workers') == {('', ()): 8}
+    assert _values(collected, 'auth_kdf_saturation') == {('', ()): 0.5}
+    assert _values(collected, 'auth_kdf_abandoned_total') == {('', ()): 7}
+    assert _values(collected, 'auth_db_pool_saturation') == {('', ()): 0.5}
+    assert _values(collected, 'auth_db_pool_wait_seconds') == {
+        ('_count', ()): 6, ('_sum', ()): 1.0,
+    }
+    assert _values(collected, 'auth_requests_queued') == {
+        ('', (('class', 'login'),)): 2,
+    }
+    assert _values(collected, 'auth_admission_rejected_total') == {
+        ('', (('class', 'login'),)): 5,
+    }
+
+
+@pytest.mark.asyncio
+async def test_collect_sums_other_workers(tmp_path, monkeypatch, mocker):
+    monkeypatch.setenv(metrics.MULTIPROC_DIR_ENV, str(tmp_path))
+    mocker.patch.object(admission, 'get_controller', return_value=None)
+    (tmp_path / '999999.json').write_text(json.dumps(_worker_sample()))
+
+    own = await metrics.collect()
+
+    assert (tmp_path / f'{os.getpid()}.json').exists()
+    assert _values(own, 'auth_kdf_abandoned_total') == {('', ()): 1}
+    assert _values(own, 'auth_requests_queued') == {
+        ('', (('class', 'login'),)): 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_collect_reads_worker_files_off_the_event_loop(
+    tmp_path, monkeypatch, mocker
+):
+    monkeypatch.setenv(metrics.MULTIPROC_DIR_ENV, str(tmp_path))
+    mocker.patch.object(admission, 'get_controller', return_value=None)
+    loop_thread = threading.get_ident()
+    threads = []
+
+    def tracking(function):
+        def run(*args):
+            threads.append(threading.get_ident())
+            return function(*args)
+        return run
+
+    for name in ('_read_json', '_write_json'):
+        mocker.patch.object(
+            metrics, name, side_effect=tracking(getattr(metrics, name))
+        )
+    (tmp_path / '999999.json').write_text(json.dumps(_worker_sample()))
+
+    await metrics.collect()
+    await metrics.publish()
+
+    assert threads
+    assert loop_thread not in threads
+
+
+def test_dead_worker_counters_do_not_regress(tmp_path):
+    (tmp_path / '4242.json').write_text(json.dumps(_worker_sample()))
+
+    metrics.mark_process_dead(4242, str(tmp_path))
+    metrics.mark_process_dead(4242, str(tmp_path))
+
+    assert not (tmp_path / '4242.json').exists()
+    collected = metrics.aggregate(
+        [_worker_sample(kdf_abandoned=0)],
+        json.loads((tmp_path / 'archived.json').read_text()),
+    )
+    assert _values(collected, 'auth_kdf_abandoned_total') == {('', ()): 1}
+    assert _values(collected, 'auth_admission_rejected_total') == {
+        ('', (('class', 'login'),)): 4,
+    }
+
+
+def test_prepare_multiprocess_dir_clears_samples(tmp_path, monkeypatch):
+    monkeypatch.setenv(metrics.MULTIPROC_DIR_ENV, str(tmp_path))
+    (tmp_path / '1.json').write_text('{}')
+    (tmp_path / 'archived.json').write_text('{}')
+
+    assert metrics.prepare_multiprocess_dir() == str(tmp_path)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_pool_wait_stats():
+    stats = PoolWaitStats()
+    stats.observe(0.5)
+    stats.observe(0.25)
+
+    assert stats.snapshot() == (2, 0.75)
+
+
+def test_timed_queue_pool_records_waits(tmp_path, mocker):
+    stats = PoolWaitStats()
+    mocker.patch('app.database.pool_stats.pool_wait', stats)
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=TimedQueuePool,
+        pool_size=1, max_overflow=0, pool_timeout=5
+    )
+    first = engine.connect()
+    released = threading.Timer(0.1, first.close)
+    released.start()
+
+    second = engine.connect()
+    second.close()
+    released.join()
+    engine.dispose()
+
+    count, total = stats.snapshot()
+    assert count == 2
+    assert total >= 0.05
@@ -0,0 +1,106 @@
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+@pytest.fixture
+def alembic_config(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        yield config, connection
+    engine.dispose()
+
+
+def _customer_indexes(connection):
+    # O inspector do SQLite ignora índices de expressão (`lower(email)`),
+    # então a verificação é feita direto no catálogo.
+    rows = connection.execute(text(
+        "SELECT name, sql FROM sqlite_master "
+        "WHERE type = 'index' AND tbl_name = 'customers'"
+    ))
+    return {name: sql or "" for name, sql in rows}
+
+
+def test_upgrade_creates_lookup_indexes(alembic_config):
+    config, connection = alembic_config
+    command.upgrade(config, "0003")
+
+    indexes = _customer_indexes(connection)
+    assert "ix_customers_email_lower" in indexes
+    assert "UNIQUE" in indexes["ix_customers_cpf_covering"]
+    assert "ix_customers_name" not in indexes
+    assert "ix_customers_cpf" not in indexes
+
+
+def test_downgrade_restores_initial_indexes(alembic_config):
+    config, connection = alembic_config
+    command.upgrade(config, "head")
+    command.downgrade(config, "0001")
+
+    indexes = _customer_indexes(connection)
+    assert "ix_customers_name" in indexes
+    assert "ix_customers_cpf" in indexes
+    assert "ix_customers_email_lower" not in indexes
+
+
+def test_upgrade_scopes_lookup_indexes_by_tenant(alembic_config):
+    config, connection = alembic_config
+    command.upgrade(config, "0003")
+    connection.execute(text(
+        "INSERT INTO customers (name, email, cpf) "
+        "VALUES ('Ana', 'ana@example.com', '12345678901')"
+    ))
+    command.upgrade(config, "head")
+
+    indexes = _customer_indexes(connection)
+    assert "ix_customers_email_lower" not in indexes
+    assert "ix_customers_cpf_covering" not in indexes
+    assert "(tenant_id, email)" in indexes["ix_customers_tenant_email"]
+    assert "UNIQUE" in indexes["ix_customers_tenant_cpf"]
+    assert "ix_customers_tenant_email_lower" in indexes
+    tenant = connection.execute(text(
+        "SELECT tenant_id FROM customers WHERE email = 'ana@example.com'"
+    )).scalar_one()
+    assert tenant == "default"
+
+
+def test_upgrade_grants_admin_role(alembic_config, monkeypatch):
+    monkeypatch.setenv("ADMIN_EMAIL", "Admin@Example.com")
+    config, connection = alembic_config
+    command.upgrade(config, "0004")
+    connection.execute(text(
+        "INSERT INTO customers (name, email) VALUES "
+        "('Admin', 'admin@example.com'), ('Ana', 'ana@example.com')"
+    ))
+    command.upgrade(config, "head")
+
+    roles = dict(connection.execute(text(
+        "SELECT email, role FROM customers"
+    )).all())
+    assert roles == {
+        "admin@example.com": "admin", "ana@example.com": "customer"
+    }
+    command.downgrade(config, "0004")
+    assert "ix_customers_tenant_email_lower" in _customer_indexes(connection)
+
+
+def test_upgrade_creates_clients_table(alembic_config):
+    config, connection = alembic_config
+    command.upgrade(config, "head")
+
+    tables = {name for (name,) in connection.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'table'"
+    ))}
+    assert "clients" in tables
+    command.downgrade(config, "0005")
+    assert "clients" not in {name for (name,) in connection.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'table'"
+    ))}
@@ -0,0 +1,53 @@
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from app.tools import profiler
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sample_collects_collapsed_stacks():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy")
+    worker.start()
+    try:
+        stacks = profiler.sample(0.1, interval=0.005)
+    finally:
+        stop.set()
+        worker.join()
+
+    busy = [stack for stack in stacks if stack.startswith("busy;")]
+    assert busy
+    assert any("test_profiler:busy_loop:" in stack for stack in busy)
+    assert not any("profiler:sample:" in stack for stack in stacks)
+
+
+def test_only_one_session_at_a_time():
+    started = threading.Event()
+    result = {}
+
+    def run():
+        started.set()
+        result["stacks"] = profiler.sample(0.2)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    started.wait()
+    time.sleep(0.05)
+    with pytest.raises(profiler.ProfilerBusy):
+        profiler.sample(0.01)
+    thread.join()
+    assert result["stacks"]
+
+
+def test_format_collapsed_orders_by_count():
+    output = profiler.format_collapsed(
+        Counter({"main;a": 1, "main;b": 3})
+    )
+    assert output == "main;b 3\nmain;a 1\n"
@@ -0,0 +1,118 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.database.database import Base, get_db
+from app.database.query_stats import current_stats, track_queries
+from app.main import app
+from app.middleware import QueryStatsMiddleware
+from app.models import models
+from app.services import repository, security
+from app.tests.query_budget import assert_max_queries, max_queries, query_count
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def client(engine):
+    with Session(bind=engine) as db:
+        db.add(models.Customer(
+            name="Admin", email="admin@fiap.com.br", cpf="12345678900",
+            hashed_password="hashed_password"
+        ))
+        db.commit()
+
+    def override_get_db():
+        db = Session(bind=engine)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    token = security.create_access_token(data={"sub": "1"})
+    yield TestClient(app, headers={"Authorization": f"Bearer {token}"})
+    app.dependency_overrides.clear()
+
+
+def test_track_queries_counts_statements(engine):
+    assert current_stats() is None
+    with track_queries() as stats, engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 1"))
+    assert stats.count == 2
+    assert stats.duration > 0
+    assert stats.repeated(2) == [("SELECT 1", 2)]
+    assert current_stats() is None
+
+
+def test_max_queries_fails_over_budget(engine):
+    with pytest.raises(AssertionError):
+        with max_queries(1), engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+
+
+def test_server_timing_and_n_plus_one_warning(engine, mocker):
+    test_app = FastAPI()
+    test_app.add_middleware(QueryStatsMiddleware, repeat_threshold=3)
+    warning = mocker.patch("app.middleware.middleware.logger.warning")
+
+    @test_app.get("/items")
+    def items():
+        with engine.connect() as conn:
+            for item_id in range(3):
+                conn.execute(text("SELECT :id"), {"id": item_id})
+        return []
+
+    response = TestClient(test_app).get("/items")
+
+    assert query_count(response) == 3
+    assert "app;dur=" in response.headers["Server-Timing"]
+    warning.assert_called_once()
+    assert "N+1" in warning.call_args.args[0]
+
+
+# Orçamentos de consultas por endpoint: um aumento indica regressão (por
+# exemplo, uma consulta extra por item ou um refresh desnecessário).
+
+def test_register_query_budget(client):
+    response = client.post("/customers/register", json={
+        "name": "Maria", "email": "maria@example.com",
+        "cpf": "98765432100", "password": "secret123"
+    })
+    assert response.status_code == 200
+    # verificação do e-mail, insert e refresh; a autorização usa só o token
+    assert_max_queries(response, 3)
+
+
+def test_identify_query_budget(client):
+    first = client.post("/customers/identify", json={"cpf": "12345678900"})
+    second = client.post("/customers/identify", json={"cpf": "12345678900"})
+    assert first.status_code == second.status_code == 200
+    assert_max_queries(first, 1)
+    # a segunda leitura do CPF vem do cache
+    assert_max_queries(second, 0)
+
+
+def test_list_customers_query_budget(client):
+    response = client.get("/customers/", params={"limit": 50})
+    assert response.status_code == 200
+    assert_max_queries(response, 1)
+
+
+def test_repository_read_budget(engine):
+    with Session(bind=engine) as db, max_queries(1):
+        repository.get_customers(db, skip=0, limit=10)
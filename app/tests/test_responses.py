@@ -0,0 +1,31 @@
+import json
+from types import SimpleNamespace
+from typing import List
+
+from app.models import schemas
+from app.tools.responses import get_adapter, serialize
+
+
+def test_get_adapter_is_cached():
+    assert get_adapter(List[schemas.Customer]) is get_adapter(
+        List[schemas.Customer]
+    )
+
+
+def test_serialize_reads_attributes():
+    rows = [
+        SimpleNamespace(
+            id=1, name="John", email="john@example.com", cpf="123",
+            hashed_password="secret"
+        ),
+        SimpleNamespace(id=2, name="Anonymous", email=None, cpf=None),
+    ]
+
+    response = serialize(List[schemas.Customer], rows)
+
+    assert response.status_code == 200
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == [
+        {"id": 1, "name": "John", "email": "john@example.com", "cpf": "123"},
+        {"id": 2, "name": "Anonymous", "email": None, "cpf": None},
+    ]
@@ -1,8 +1,12 @@
+import time
+from datetime import timedelta
+
 import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
 from types import SimpleNamespace
 from app.main import app
+from app.services import clients, kdf, security
 
 client = TestClient(app)
 
@@ -13,6 +17,7 @@ def mock_user():
     return SimpleNamespace(
         id=1,
         email="admin@fiap.com.br",
+        role="admin",
         hashed_password=(
             "$2b$12$wU3o3gQxELZfiMjri7FxNODcDbUGbeLy8wPOpvpb1JHxH33jWrxvq"
         )
@@ -54,3 +59,230 @@ def test_auth_invalid_credentials(mocker):
 
     assert response.status_code == status.HTTP_400_BAD_REQUEST
     assert "msg" in response.json()
+
+
+def test_auth_scopes_login_to_tenant_header(mocker, mock_user):
+    lookup = mocker.patch(
+        "app.services.repository.get_user_by_email", return_value=mock_user
+    )
+    mocker.patch("app.services.security.verify_password", return_value=True)
+    create_token = mocker.patch(
+        "app.services.security.create_access_token",
+        return_value="mock_access_token"
+    )
+
+    form_data = {"username": "admin@fiap.com.br", "password": "valid_password"}
+    response = client.post(
+        "/token", data=form_data, headers={"X-Tenant-ID": "loja-2"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert lookup.call_args.args[2] == "loja-2"
+    create_token.assert_called_once_with(
+        data={"sub": "1", "tenant": "loja-2", "role": "admin"}
+    )
+
+
+def test_auth_rejects_invalid_tenant_header():
+    form_data = {"username": "admin@fiap.com.br", "password": "valid_password"}
+    response = client.post(
+        "/token", data=form_data, headers={"X-Tenant-ID": "../other"}
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.fixture
+def gateway(mocker):
+    registry = clients.ClientRegistry(loader=lambda: [
+        clients.RegisteredClient(
+            "gateway", clients.hash_secret("g4teway"), "default",
+            security.SCOPE_INTROSPECT
+        ),
+        clients.RegisteredClient(
+            "orders", clients.hash_secret("s3cret"), "default",
+            "customers:read"
+        ),
+    ])
+    mocker.patch("app.services.clients.get_registry", return_value=registry)
+    return ("gateway", "g4teway")
+
+
+def test_introspect_active_token_is_privately_cacheable(gateway):
+    token = security.create_access_token(data={"sub": "1"})
+
+    response = client.post("/introspect", data={"token": token}, auth=gateway)
+
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert body["active"] is True
+    assert body["sub"] == "1"
+    cache_control = response.headers["Cache-Control"]
+    assert cache_control.startswith("private, ")
+    max_age = int(cache_control.split("max-age=")[1])
+    assert 0 < max_age <= min(60, body["exp"] - int(time.time()) + 1)
+    assert response.headers["ETag"]
+
+
+def test_introspect_max_age_is_bounded_by_expiry(gateway):
+    token = security.create_access_token(
+        data={"sub": "1"}, expires_delta=timedelta(seconds=10)
+    )
+
+    response = client.get(
+        "/introspect", headers={"X-Introspect-Token": f"Bearer {token}"},
+        auth=gateway
+    )
+
+    assert response.json()["active"] is True
+    cache_control = response.headers["Cache-Control"]
+    assert cache_control.startswith("public, ")
+    assert int(cache_control.split("max-age=")[1]) <= 10
+    assert response.headers["Vary"] == "Authorization, X-Introspect-Token"
+
+
+def test_introspect_revalidates_with_etag(gateway):
+    token = security.create_access_token(data={"sub": "1"})
+    headers = {"X-Introspect-Token": token}
+    etag = client.get(
+        "/introspect", headers=headers, auth=gateway
+    ).headers["ETag"]
+
+    response = client.get(
+        "/introspect", headers={**headers, "If-None-Match": etag},
+        auth=gateway
+    )
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+
+
+def test_introspect_inactive_token_is_not_stored(gateway):
+    response = client.post(
+        "/introspect", data={"token": "invalid"}, auth=gateway
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"active": False}
+    assert response.headers["Cache-Control"] == "no-store"
+
+
+@pytest.mark.parametrize("auth, expected", [
+    (None, status.HTTP_401_UNAUTHORIZED),
+    (("gateway", "wrong"), status.HTTP_401_UNAUTHORIZED),
+    (("orders", "s3cret"), status.HTTP_403_FORBIDDEN),
+])
+def test_introspect_requires_authorized_client(gateway, auth, expected):
+    token = security.create_access_token(data={"sub": "1"})
+
+    response = client.post("/introspect", data={"token": token}, auth=auth)
+
+    assert response.status_code == expected
+    assert "sub" not in response.json()
+
+
+@pytest.fixture
+def service_client(mocker):
+    registry = clients.ClientRegistry(loader=lambda: [clients.RegisteredClient(
+        "orders", clients.hash_secret("s3cret"), "default", "customers:read"
+    )])
+    mocker.patch("app.services.clients.get_registry", return_value=registry)
+    return registry
+
+
+def test_client_credentials_issues_service_token(service_client, mocker):
+    verify = mocker.patch("app.services.kdf.verify_password")
+
+    response = client.post("/token", data={
+        "grant_type": "client_credentials",
+        "client_id": "orders", "client_secret": "s3cret",
+    })
+
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert body["token_type"] == "bearer"
+    assert body["scope"] == "customers:read"
+    assert 0 < body["expires_in"] <= 3600
+    claims = security.get_token_claims(body["access_token"])
+    assert claims.role == "service"
+    verify.assert_not_called()
+
+
+def test_service_token_with_numeric_client_id_is_not_a_user(mocker):
+    registry = clients.ClientRegistry(loader=lambda: [clients.RegisteredClient(
+        "1", clients.hash_secret("s3cret"), "default", "customers:read"
+    )])
+    mocker.patch("app.services.clients.get_registry", return_value=registry)
+    get_customer = mocker.patch("app.services.repository.get_customer")
+
+    token = client.post("/token", data={
+        "grant_type": "client_credentials",
+        "client_id": "1", "client_secret": "s3cret",
+    }).json()["access_token"]
+    response = client.get(
+        "/auth", headers={"Authorization": f"Bearer {token}"}
+    )
+
+    assert security.get_token_claims(token).sub == "client:1"
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    get_customer.assert_not_called()
+
+
+def test_client_credentials_accepts_basic_auth(service_client):
+    response = client.post(
+        "/token", data={"grant_type": "client_credentials"},
+        auth=("orders", "s3cret"),
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_client_credentials_rejects_wrong_secret(service_client):
+    response = client.post("/token", data={
+        "grant_type": "client_credentials",
+        "client_id": "orders", "client_secret": "wrong",
+    })
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_token_rejects_unsupported_grant():
+    response = client.post("/token", data={"grant_type": "implicit"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_unknown_user_still_pays_password_verification(mocker):
+    mocker.patch(
+        "app.services.repository.get_user_by_email", return_value=None
+    )
+    verify = mocker.patch(
+        "app.services.kdf.verify_password", return_value=False
+    )
+
+    response = client.post("/token", data={
+        "username": "ghost@example.com", "password": "guess"
+    })
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    verify.assert_awaited_once()
+    assert verify.await_args.args == ("guess", None)
+    assert verify.await_args.kwargs["is_disconnected"] is not None
+
+
+def test_token_client_disconnected_before_verification(mocker, mock_user):
+    mocker.patch(
+        "app.services.repository.get_user_by_email", return_value=mock_user
+    )
+    mocker.patch(
+        "app.services.kdf.verify_password",
+        side_effect=kdf.ClientDisconnected()
+    )
+    create_token = mocker.patch("app.services.security.create_access_token")
+
+    response = client.post("/token", data={
+        "username": "admin@fiap.com.br", "password": "admin"
+    })
+
+    assert response.status_code == 499
+    create_token.assert_not_called()
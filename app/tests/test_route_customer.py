@@ -0,0 +1,259 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.database.database import get_db
+from app.main import app
+from app.models import schemas
+from app.services import security
+from app.services.batch_writer import WriterOverloaded
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[get_db] = lambda: None
+    app.dependency_overrides[security.get_token_claims] = (
+        lambda: schemas.TokenClaims(
+            sub="1", tenant="default", role="customer",
+            scope=security.scopes_for_role("customer"),
+        )
+    )
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def db_customer():
+    return SimpleNamespace(
+        id=7, name="Customer", email="customer@fiap.com.br",
+        cpf="12345678900", hashed_password="hash"
+    )
+
+
+def test_get_customers_list(mocker, client, db_customer):
+    mocker.patch(
+        "app.services.repository.get_customers", return_value=[db_customer]
+    )
+
+    response = client.get("/customers/")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [{
+        "id": 7, "name": "Customer", "email": "customer@fiap.com.br",
+        "cpf": "12345678900",
+    }]
+
+
+def test_get_customer_by_id(mocker, client, db_customer):
+    mocker.patch(
+        "app.services.repository.get_customer", return_value=db_customer
+    )
+
+    response = client.get("/customers/", params={"customer_id": 7})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["id"] == 7
+    assert "hashed_password" not in response.json()
+
+
+def test_get_customer_by_id_not_found(mocker, client):
+    mocker.patch("app.services.repository.get_customer", return_value=None)
+
+    response = client.get("/customers/", params={"customer_id": 99})
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_search_customers(mocker, client, db_customer):
+    search = mocker.patch(
+        "app.services.repository.search_customers",
+        return_value=[db_customer]
+    )
+
+    response = client.get("/customers/search", params={"q": "cust"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()[0]["email"] == "customer@fiap.com.br"
+    search.assert_called_once_with(
+        None, query="cust", limit=10, tenant_id="default"
+    )
+
+
+def test_search_customers_validates_limit(client):
+    response = client.get(
+        "/customers/search", params={"q": "cust", "limit": 500}
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_create_anonymous_customer_uses_pool(mocker, client):
+    pool = mocker.Mock()
+    pool.acquire.return_value = schemas.Customer(id=42, name="Anonymous")
+    mocker.patch(
+        "app.services.anonymous_pool.get_pool", return_value=pool
+    )
+    create = mocker.patch("app.services.repository.create_anonymous_customer")
+
+    response = client.post("/customers/anonymous")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["id"] == 42
+    create.assert_not_called()
+
+
+def test_create_anonymous_customer_without_pool(mocker, client, db_customer):
+    mocker.patch("app.services.anonymous_pool.get_pool", return_value=None)
+    mocker.patch(
+        "app.services.repository.create_anonymous_customer",
+        return_value=db_customer
+    )
+
+    response = client.post("/customers/anonymous")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["id"] == 7
+
+
+def test_create_anonymous_customer_batched(mocker, client):
+    mocker.patch("app.services.anonymous_pool.get_pool", return_value=None)
+    writer = mocker.Mock()
+    writer.submit.return_value = 99
+    mocker.patch(
+        "app.services.batch_writer.get_customer_writer", return_value=writer
+    )
+
+    response = client.post("/customers/anonymous")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["id"] == 99
+    writer.submit.assert_called_once_with(
+        {"tenant_id": "default", "name": "Anonymous"}
+    )
+
+
+def test_create_anonymous_customer_backpressure(mocker, client):
+    mocker.patch("app.services.anonymous_pool.get_pool", return_value=None)
+    writer = mocker.Mock()
+    writer.submit.side_effect = WriterOverloaded()
+    mocker.patch(
+        "app.services.batch_writer.get_customer_writer", return_value=writer
+    )
+
+    response = client.post("/customers/anonymous")
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_create_customer_requires_admin_scope(mocker, client):
+    create = mocker.patch("app.services.repository.create_user")
+
+    response = client.post("/customers/admin", json={
+        "name": "Maria", "email": "maria@example.com", "cpf": "98765432100"
+    })
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    create.assert_not_called()
+
+
+def test_register_customer_replays_idempotent_request(
+        mocker, client, db_customer):
+    mocker.patch(
+        "app.services.repository.get_user_by_email", return_value=None
+    )
+    create = mocker.patch(
+        "app.services.repository.create_user", return_value=db_customer
+    )
+    payload = {
+        "name": "Customer", "email": "customer@fiap.com.br",
+        "cpf": "12345678900", "password": "secret",
+    }
+    headers = {"Idempotency-Key": "kiosk-1-0001"}
+
+    first = client.post("/customers/register", json=payload, headers=headers)
+    retry = client.post("/customers/register", json=payload, headers=headers)
+
+    assert first.status_code == retry.status_code == status.HTTP_200_OK
+    assert retry.json() == first.json()
+    assert "Idempotent-Replayed" not in first.headers
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    create.assert_called_once()
+
+
+def test_register_customer_rejects_reused_idempotency_key(
+        mocker, client, db_customer):
+    mocker.patch(
+        "app.services.repository.get_user_by_email", return_value=None
+    )
+    mocker.patch(
+        "app.services.repository.create_user", return_value=db_customer
+    )
+    headers = {"Idempotency-Key": "kiosk-1-0002"}
+
+    client.post(
+        "/customers/register", json={"email": "a@example.com"},
+        headers=headers
+    )
+    response = client.post(
+        "/customers/register", json={"email": "b@example.com"},
+        headers=headers
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_register_customer_without_idempotency_key_runs_each_time(
+        mocker, client, db_customer):
+    mocker.patch(
+        "app.services.repository.get_user_by_email", return_value=None
+    )
+    create = mocker.patch(
+        "app.services.repository.create_user", return_value=db_customer
+    )
+
+    client.post("/customers/register", json={"email": "a@example.com"})
+    client.post("/customers/register", json={"email": "a@example.com"})
+
+    assert create.call_count == 2
+
+
+def test_create_anonymous_customer_idempotent(mocker, client):
+    pool = mocker.Mock()
+    pool.acquire.side_effect = [
+        schemas.Customer(id=42, name="Anonymous"),
+        schemas.Customer(id=43, name="Anonymous"),
+    ]
+    mocker.patch(
+        "app.services.anonymous_pool.get_pool", return_value=pool
+    )
+    headers = {"Idempotency-Key": "kiosk-1-0003"}
+
+    first = client.post("/customers/anonymous", headers=headers)
+    retry = client.post("/customers/anonymous", headers=headers)
+    other = client.post(
+        "/customers/anonymous", headers={"Idempotency-Key": "kiosk-1-0004"}
+    )
+
+    assert first.json()["id"] == retry.json()["id"] == 42
+    assert other.json()["id"] == 43
+    assert pool.acquire.call_count == 2
+
+
+def test_failed_idempotent_request_can_be_retried(mocker, client):
+    mocker.patch("app.services.anonymous_pool.get_pool", return_value=None)
+    writer = mocker.Mock()
+    writer.submit.side_effect = [WriterOverloaded(), 99]
+    mocker.patch(
+        "app.services.batch_writer.get_customer_writer", return_value=writer
+    )
+    headers = {"Idempotency-Key": "kiosk-1-0005"}
+
+    overloaded = client.post("/customers/anonymous", headers=headers)
+    retry = client.post("/customers/anonymous", headers=headers)
+
+    assert overloaded.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert retry.status_code == status.HTTP_200_OK
+    assert retry.json()["id"] == 99
@@ -0,0 +1,77 @@
+from collections import Counter
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.database.database import get_db
+from app.main import app
+from app.models import schemas
+from app.services import security
+from app.tools import profiler
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[get_db] = lambda: None
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def login_as(role, tenant_id="default"):
+    app.dependency_overrides[security.get_token_claims] = (
+        lambda: schemas.TokenClaims(
+            sub="1", tenant=tenant_id, role=role,
+            scope=security.scopes_for_role(role),
+        )
+    )
+
+
+def test_profile_returns_collapsed_stacks(mocker, client):
+    login_as("admin")
+    sample = mocker.patch(
+        "app.tools.profiler.sample",
+        return_value=Counter({"MainThread;app:run:1": 4})
+    )
+
+    response = client.get("/debug/profile", params={"seconds": 2})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.text == "MainThread;app:run:1 4\n"
+    sample.assert_called_once_with(2.0, 0.005)
+
+
+def test_profile_requires_admin(client):
+    login_as("customer")
+
+    response = client.get("/debug/profile")
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_profile_requires_default_tenant(client):
+    login_as("admin", tenant_id="loja-2")
+
+    response = client.get("/debug/profile")
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_profile_busy(mocker, client):
+    login_as("admin")
+    mocker.patch(
+        "app.tools.profiler.sample", side_effect=profiler.ProfilerBusy()
+    )
+
+    response = client.get("/debug/profile")
+
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+
+def test_profile_limits_duration(client):
+    login_as("admin")
+
+    response = client.get("/debug/profile", params={"seconds": 600})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
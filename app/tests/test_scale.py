@@ -0,0 +1,158 @@
+"""Testes de escala: latência das consultas com muitos clientes.
+
+Carrega clientes sintéticos (`app.services.synthetic`) em tenants de 10^4,
+10^6 e 10^7 linhas e mede paginação, identificação por CPF, contagem e a
+consulta do login. Por padrão só o caso de 10^4 roda, em um SQLite
+temporário; os maiores exigem um banco real:
+
+    SCALE_TEST_DATABASE_URL=postgresql://... SCALE_TEST_MAX_ROWS=10000000 \\
+        pytest -m scale -s
+
+As cargas são reaproveitadas entre execuções (tenant `scale-<linhas>`). O
+bcrypt do login tem custo fixo e é verificado uma vez por tamanho, fora da
+medição. Consultas por índice precisam ficar abaixo de
+`SCALE_TEST_LOOKUP_BUDGET_MS`; a contagem e a paginação profunda (por
+`OFFSET`) crescem com a tabela e são apenas reportadas.
+"""
+import os
+import random
+import statistics
+import time
+from typing import Callable, Dict
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.database.database import Base
+from app.models import models
+from app.services import cache, repository, security
+from app.services.synthetic import (
+    SYNTHETIC_PASSWORD, seed_customers, synthetic_cpf, synthetic_email
+)
+
+SIZES = [10 ** 4, 10 ** 6, 10 ** 7]
+MAX_ROWS = int(os.getenv('SCALE_TEST_MAX_ROWS', str(10 ** 4)))
+DATABASE_URL = os.getenv('SCALE_TEST_DATABASE_URL')
+SAMPLES = int(os.getenv('SCALE_TEST_SAMPLES', '200'))
+LOOKUP_BUDGET_MS = float(os.getenv('SCALE_TEST_LOOKUP_BUDGET_MS', '50'))
+
+pytestmark = pytest.mark.scale
+
+
+@pytest.fixture(scope='module')
+def engine(tmp_path_factory):
+    if DATABASE_URL:
+        engine = create_engine(DATABASE_URL)
+    else:
+        path = tmp_path_factory.mktemp('scale') / 'scale.db'
+        engine = create_engine(f'sqlite:///{path}')
+        Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope='module', params=SIZES, ids=lambda rows: f'{rows}')
+def tenant(request, engine):
+    """Tenant com `rows` clientes sintéticos, de índices 1 a `rows`."""
+    rows = request.param
+    if rows > MAX_ROWS:
+        pytest.skip(f'{rows} linhas acima de SCALE_TEST_MAX_ROWS')
+    tenant_id = f'scale-{rows}'
+    with Session(engine) as db:
+        existing = db.query(models.Customer) \
+                     .filter(models.Customer.tenant_id == tenant_id) \
+                     .count()
+    if existing < rows:
+        # Até 10^8 nenhum índice a partir de 1 é pulado: continua a carga
+        seed_customers(
+            engine, rows - existing, start=existing + 1, tenant_id=tenant_id
+        )
+    return tenant_id, rows
+
+
+@pytest.fixture
+def db(engine):
+    with Session(engine) as session:
+        yield session
+
+
+def _measure(label: str, rows: int,
+             operation: Callable[[int], None]) -> Dict[str, float]:
+    """Executa a operação `SAMPLES` vezes, sem cache, e reporta a latência
+    em milissegundos."""
+    timings = []
+    for sample in range(SAMPLES):
+        cache.get_cache().clear()
+        started = time.perf_counter()
+        operation(sample)
+        timings.append((time.perf_counter() - started) * 1000)
+    cuts = statistics.quantiles(timings, n=100)
+    result = {'p50': cuts[49], 'p95': cuts[94], 'max': max(timings)}
+    print(
+        f'\n[{rows} linhas] {label}: p50={result["p50"]:.2f}ms '
+        f'p95={result["p95"]:.2f}ms max={result["max"]:.2f}ms'
+    )
+    return result
+
+
+def test_identify_latency(tenant, db):
+    tenant_id, rows = tenant
+    indices = random.Random(1).choices(range(1, rows + 1), k=SAMPLES)
+
+    def identify(sample):
+        row = repository.get_customer_by_cpf(
+            db, synthetic_cpf(indices[sample]), tenant_id=tenant_id
+        )
+        assert row is not None
+
+    assert _measure('identify', rows, identify)['p95'] < LOOKUP_BUDGET_MS
+
+
+def test_login_latency(tenant, db):
+    tenant_id, rows = tenant
+    indices = random.Random(2).choices(range(1, rows + 1), k=SAMPLES)
+
+    def login(sample):
+        user = repository.get_user_by_email(
+            db, synthetic_email(indices[sample]), tenant_id=tenant_id
+        )
+        assert user is not None
+
+    assert _measure('login', rows, login)['p95'] < LOOKUP_BUDGET_MS
+
+    user = repository.get_user_by_email(
+        db, synthetic_email(rows), tenant_id=tenant_id
+    )
+    assert security.verify_password(
+        SYNTHETIC_PASSWORD, user.hashed_password
+    )
+
+
+def test_pagination_latency(tenant, db):
+    tenant_id, rows = tenant
+
+    def first_page(sample):
+        page = repository.get_customers(
+            db, skip=0, limit=10, tenant_id=tenant_id
+        )
+        assert len(page) == 10
+
+    def deep_page(sample):
+        page = repository.get_customers(
+            db, skip=rows - 10, limit=10, tenant_id=tenant_id
+        )
+        assert len(page) == 10
+
+    first = _measure('primeira página', rows, first_page)
+    _measure('última página (OFFSET)', rows, deep_page)
+    assert first['p95'] < LOOKUP_BUDGET_MS
+
+
+def test_count_latency(tenant, db):
+    tenant_id, rows = tenant
+
+    def count(sample):
+        assert repository.get_customers_count(db, tenant_id=tenant_id) == rows
+
+    _measure('contagem (sem cache)', rows, count)
@@ -1,3 +1,4 @@
+from types import SimpleNamespace
 import pytest
 from pydantic import ValidationError
 from ..models.schemas import Customer
@@ -36,3 +37,13 @@ def test_customer_optional_fields():
     assert customer.name is None
     assert customer.email is None
     assert customer.cpf is None
+
+
+def test_customer_from_attributes():
+    row = SimpleNamespace(
+        id=1, name="John Doe", email="john.doe@example.com",
+        cpf="12345678900", hashed_password="hash"
+    )
+    customer = Customer.model_validate(row)
+    assert customer.id == 1
+    assert customer.email == "john.doe@example.com"
@@ -4,7 +4,10 @@ from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from jose import jwt
 from datetime import datetime, timedelta, timezone
-from app.services.security import get_current_user, SECRET_KEY, ALGORITHM
+from app.services import security
+from app.services.security import (
+    get_current_user, introspect_token, SECRET_KEY, ALGORITHM
+)
 from ..models import schemas
 
 
@@ -70,3 +73,57 @@ def test_get_current_user_user_not_found(db_session, valid_token):
             get_current_user(db_session, valid_token)
     assert excinfo.value.status_code == status.HTTP_401_UNAUTHORIZED
     assert excinfo.value.detail == "Credenciais inválidas ou expiradas"
+
+
+def test_introspect_token_active(token_data, valid_token):
+    result = introspect_token(valid_token)
+
+    assert result == {
+        "active": True,
+        "sub": "test_user_id",
+        "exp": int(token_data["exp"]),
+        "scope": "customers:read customers:write",
+        "tenant": "default",
+    }
+
+
+def test_introspect_token_inactive(expired_token):
+    assert introspect_token(expired_token) == {"active": False}
+    assert introspect_token("invalid.token.value") == {"active": False}
+
+
+def test_access_token_carries_role_scopes():
+    token = security.create_access_token(data={"sub": "1", "role": "admin"})
+
+    claims = security.claims_from_payload(security.decode_access_token(token))
+
+    assert claims.role == "admin"
+    assert {"customers:admin", "debug"} <= claims.scopes
+
+
+def test_require_scopes_uses_claims_only():
+    check = security.require_scopes(security.SCOPE_CUSTOMERS_ADMIN)
+    admin = schemas.TokenClaims(
+        sub="1", tenant="default", role="admin",
+        scope=security.scopes_for_role("admin"),
+    )
+    customer = schemas.TokenClaims(
+        sub="2", tenant="default", role="customer",
+        scope=security.scopes_for_role("customer"),
+    )
+
+    assert check(admin) is admin
+    with pytest.raises(HTTPException) as exc:
+        check(customer)
+    assert exc.value.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_get_current_admin_requires_default_tenant():
+    other_tenant = schemas.TokenClaims(
+        sub="1", tenant="loja-2", role="admin",
+        scope=security.scopes_for_role("admin"),
+    )
+
+    with pytest.raises(HTTPException) as exc:
+        security.get_current_admin(other_tenant)
+    assert exc.value.status_code == status.HTTP_403_FORBIDDEN
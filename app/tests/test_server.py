@@ -0,0 +1,202 @@
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+import uvicorn
+
+from app import server
+from app.services import lifecycle
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def test_worker_count_from_env(monkeypatch):
+    monkeypatch.setenv('WEB_CONCURRENCY', '4')
+    assert server.worker_count() == 4
+
+
+def test_worker_count_defaults_to_cpus(monkeypatch):
+    monkeypatch.delenv('WEB_CONCURRENCY', raising=False)
+    monkeypatch.setattr(os, 'cpu_count', lambda: None)
+    assert server.worker_count() == 1
+
+
+def test_build_config_reads_tuning_env(monkeypatch):
+    monkeypatch.setenv('PORT', '9000')
+    monkeypatch.setenv('SERVER_BACKLOG', '512')
+    monkeypatch.setenv('SERVER_KEEPALIVE_TIMEOUT', '10')
+    monkeypatch.setenv('SERVER_GRACEFUL_TIMEOUT', '7')
+    monkeypatch.setenv('SERVER_LOOP', 'asyncio')
+    monkeypatch.setenv('SERVER_HTTP', 'h11')
+
+    config = server.build_config()
+
+    assert config.port == 9000
+    assert config.backlog == 512
+    assert config.timeout_keep_alive == 10
+    assert config.timeout_graceful_shutdown == 7
+    assert config.loop == 'asyncio'
+    assert config.http == 'h11'
+    assert config.reload is False
+
+
+def test_default_shutdown_budget_fits_grace_period(monkeypatch):
+    for name in ('SERVER_DRAIN_DELAY', 'SERVER_GRACEFUL_TIMEOUT',
+                 'SERVER_TERMINATION_GRACE_PERIOD'):
+        monkeypatch.delenv(name, raising=False)
+    assert server.check_shutdown_budget() is True
+
+
+def test_warns_when_drain_exceeds_grace_period(monkeypatch, mocker):
+    monkeypatch.setenv('SERVER_DRAIN_DELAY', '5')
+    monkeypatch.setenv('SERVER_GRACEFUL_TIMEOUT', '30')
+    monkeypatch.setenv('SERVER_TERMINATION_GRACE_PERIOD', '30')
+    warning = mocker.patch.object(server.logger, 'warning')
+
+    assert server.check_shutdown_budget() is False
+    assert 'terminationGracePeriodSeconds (30s)' in warning.call_args[0][0]
+
+
+def test_draining_server_delays_exit():
+    draining = server.DrainingServer(server.build_config(), delay=60)
+    try:
+        draining.handle_exit(signal.SIGTERM, None)
+        assert lifecycle.is_draining()
+        assert draining.should_exit is False
+
+        draining.drain_deadline = time.monotonic()
+        asyncio.run(draining.on_tick(1))
+        assert draining.should_exit is True
+    finally:
+        lifecycle.reset()
+
+
+def test_second_signal_exits_immediately():
+    draining = server.DrainingServer(server.build_config(), delay=60)
+    try:
+        draining.handle_exit(signal.SIGTERM, None)
+        draining.handle_exit(signal.SIGTERM, None)
+        assert draining.should_exit is True
+    finally:
+        lifecycle.reset()
+
+
+def _exited(code: int) -> int:
+    # Status de `os.waitpid` de um processo que saiu com `code`
+    return code << 8
+
+
+def test_crashing_worker_is_respawned_with_backoff(mocker):
+    supervisor = server.Supervisor(server.build_config(), 1, restarts=3)
+    stop = mocker.patch.object(supervisor, 'stop')
+    supervisor.started_at[0] = time.monotonic()
+
+    delays = []
+    for _ in range(3):
+        supervisor.worker_exited(0, _exited(1))
+        delays.append(supervisor.respawn_at.pop(0) - time.monotonic())
+
+    assert delays == [
+        pytest.approx(0.5, abs=0.1), pytest.approx(1, abs=0.1),
+        pytest.approx(2, abs=0.1),
+    ]
+    stop.assert_not_called()
+
+    supervisor.worker_exited(0, _exited(1))
+
+    stop.assert_called_once()
+    assert supervisor.exit_code == 1
+    assert 0 not in supervisor.respawn_at
+
+
+def test_stable_worker_resets_backoff():
+    supervisor = server.Supervisor(server.build_config(), 1, restarts=3)
+    supervisor.failures[0] = 3
+    supervisor.started_at[0] = time.monotonic() - 60
+
+    supervisor.worker_exited(0, _exited(0))
+
+    assert supervisor.failures[0] == 1
+    assert supervisor.respawn_at[0] - time.monotonic() == pytest.approx(
+        0.5, abs=0.1
+    )
+
+
+async def _failing_app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await receive()
+        await send({'type': 'lifespan.startup.failed', 'message': 'boom'})
+
+
+def test_serve_reports_startup_failure():
+    config = uvicorn.Config(
+        _failing_app, host='127.0.0.1', port=_free_port(), loop='asyncio',
+        lifespan='on'
+    )
+
+    assert server.serve(config) == server.STARTUP_FAILURE
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requer os.fork')
+@pytest.mark.parametrize('workers', ['1', '2'])
+def test_serves_and_drains_on_sigterm(tmp_path, workers):
+    # Com um worker, o SIGTERM chega direto ao `DrainingServer` pelo
+    # tratamento de sinais do uvicorn; com dois, via supervisor
+    port = _free_port()
+    environ = dict(
+        os.environ,
+        HOST='127.0.0.1',
+        PORT=str(port),
+        WEB_CONCURRENCY=workers,
+        SERVER_GRACEFUL_TIMEOUT='5',
+        SERVER_DRAIN_DELAY='2',
+        DATABASE_URL=f"sqlite:///{tmp_path / 'server.db'}",
+    )
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'app.server'],
+        cwd=ROOT, env=environ,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 20
+        response = None
+        while time.monotonic() < deadline:
+            try:
+                response = httpx.get(f'http://127.0.0.1:{port}/health')
+                break
+            except httpx.TransportError:
+                time.sleep(0.2)
+        assert response is not None and response.status_code == 200
+
+        ready = httpx.get(f'http://127.0.0.1:{port}/readyz')
+        assert ready.status_code == 200
+
+        process.send_signal(signal.SIGTERM)
+        # Durante a drenagem o worker segue atendendo, mas não está pronto
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            ready = httpx.get(f'http://127.0.0.1:{port}/readyz')
+            if ready.status_code == 503:
+                break
+            time.sleep(0.05)
+        assert ready.status_code == 503
+        assert ready.json()['draining'] is True
+        assert httpx.get(f'http://127.0.0.1:{port}/livez').status_code == 200
+
+        assert process.wait(timeout=20) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
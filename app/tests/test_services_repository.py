@@ -1,14 +1,32 @@
 import pytest
 from unittest import mock
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import Session
+from app.database.database import Base
 from app.models import models
+from app.tests.query_budget import max_queries
 from ..models import schemas
 from app.services.repository import (
+    CUSTOMER_COLUMNS,
+    _search_criteria,
     create_admin_user,
     create_customer,
     create_anonymous_customer,
-    create_user
+    create_user,
+    get_customer,
+    get_customer_by_cpf,
+    get_customers,
+    get_customers_count,
+    count_cache_key,
+    cpf_cache_key,
+    email_miss_cache_key,
+    get_user_by_email,
+    negative_lookup_ttl,
+    normalize_email,
+    search_customers
 )
+from app.services import cache
 
 
 @pytest.fixture
@@ -42,7 +60,8 @@ def test_create_admin_user_already_exists(db_session, mock_env_vars):
             name='Admin User',
             email='admin@example.com',
             cpf='12345678900',
-            hashed_password='hashed_password'
+            hashed_password='hashed_password',
+            role='admin'
         )
     )
     create_admin_user(db_session)
@@ -51,6 +70,20 @@ def test_create_admin_user_already_exists(db_session, mock_env_vars):
     assert not db_session.refresh.called
 
 
+def test_create_admin_user_grants_admin_role(db_session, mock_env_vars):
+    existing = models.Customer(
+        name='Admin User', email='admin@example.com', cpf='12345678900',
+        hashed_password='hashed_password', role='customer'
+    )
+    db_session.query.return_value.filter.return_value.first.return_value = (
+        existing
+    )
+    create_admin_user(db_session)
+    assert existing.role == 'admin'
+    assert not db_session.add.called
+    assert db_session.commit.called
+
+
 def test_create_admin_user_missing_env_vars(db_session, monkeypatch):
     monkeypatch.delenv('ADMIN_EMAIL', raising=False)
     create_admin_user(db_session)
@@ -127,3 +160,271 @@ def test_create_user(db_session):
     assert user.email == user_data.email
     assert user.cpf == user_data.cpf
     assert user.hashed_password == "hashed_password"
+
+
+def test_normalize_email():
+    assert normalize_email("  John.Doe@Example.COM ") == "john.doe@example.com"
+    assert normalize_email(None) is None
+
+
+def test_create_user_normalizes_email(db_session):
+    user_data = schemas.CustomerCreate(
+        name="Test User",
+        email="Test@Example.com",
+        cpf="12345678900",
+        password="password123"
+    )
+
+    with mock.patch(
+        'app.services.repository.security.get_password_hash',
+        return_value="hashed_password"
+    ):
+        user = create_user(db_session, user_data)
+
+    assert user.email == "test@example.com"
+
+
+@pytest.fixture
+def sqlite_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = Session(bind=engine)
+    db.add(models.Customer(
+        name="John Doe", email="john@example.com", cpf="12345678900",
+        hashed_password="hashed_password"
+    ))
+    db.commit()
+    yield db
+    db.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def negative_cache(monkeypatch):
+    monkeypatch.setenv("NEGATIVE_LOOKUP_TTL", "60")
+
+
+def test_reads_return_lightweight_rows(sqlite_session):
+    by_cpf = get_customer_by_cpf(sqlite_session, "12345678900")
+    by_id = get_customer(sqlite_session, by_cpf.id)
+    listed = get_customers(sqlite_session)
+
+    for row in (by_id, listed[0]):
+        assert tuple(row._fields[:4]) == ("id", "name", "email", "cpf")
+        assert schemas.Customer.model_validate(row).name == "John Doe"
+    assert by_id.tenant_id == "default"
+    assert len(sqlite_session.identity_map) == 0
+
+
+def test_search_customers_ranks_prefix_first(sqlite_session):
+    sqlite_session.add_all([
+        models.Customer(name="Maria Joao", email="maria@example.com"),
+        models.Customer(name="Joao Silva", email="joao@example.com"),
+        models.Customer(name="Ana", email="ana_100%@example.com"),
+    ])
+    sqlite_session.commit()
+
+    names = [row.name for row in search_customers(sqlite_session, "joao")]
+    assert names == ["Joao Silva", "Maria Joao"]
+
+    assert search_customers(sqlite_session, "JOHN")[0].name == "John Doe"
+    assert len(search_customers(sqlite_session, "o", limit=2)) == 2
+    assert search_customers(sqlite_session, "_100%")[0].name == "Ana"
+    assert search_customers(sqlite_session, "1%0") == []
+
+
+def test_search_criteria_postgres_uses_trigram_operators():
+    criteria, order_by = _search_criteria("postgresql", "jo")
+    statement = select(*CUSTOMER_COLUMNS).where(*criteria).order_by(*order_by)
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+
+    assert "customers.name %% " in sql
+    assert "similarity(customers.name" in sql
+    assert "ILIKE" in sql
+
+
+def test_cpf_lookup_is_cached_and_invalidated_on_create(
+    sqlite_session, negative_cache
+):
+    assert get_customer_by_cpf(sqlite_session, "98765432100") is None
+
+    with mock.patch.object(sqlite_session, "query") as query:
+        assert get_customer_by_cpf(sqlite_session, "98765432100") is None
+        query.assert_not_called()
+
+    with mock.patch(
+        'app.services.repository.security.get_password_hash',
+        return_value="hashed_password"
+    ):
+        create_user(sqlite_session, schemas.CustomerCreate(
+            name="Maria", email="maria@example.com", cpf="98765432100",
+            password="password123"
+        ))
+
+    assert get_customer_by_cpf(sqlite_session, "98765432100").name == "Maria"
+    assert get_customer_by_cpf(sqlite_session, "98765432100").name == "Maria"
+
+
+def test_customers_count_is_cached(sqlite_session):
+    assert get_customers_count(sqlite_session) == 1
+    create_anonymous_customer(sqlite_session)
+    assert get_customers_count(sqlite_session) == 2
+
+
+def test_lookups_are_scoped_to_tenant(sqlite_session):
+    sqlite_session.add(models.Customer(
+        tenant_id="loja-2", name="John Other", email="john@example.com",
+        cpf="12345678900", hashed_password="hashed_password"
+    ))
+    sqlite_session.commit()
+
+    default = get_user_by_email(sqlite_session, "john@example.com")
+    other = get_user_by_email(
+        sqlite_session, "john@example.com", tenant_id="loja-2"
+    )
+    by_cpf = get_customer_by_cpf(
+        sqlite_session, "12345678900", tenant_id="loja-2"
+    )
+
+    assert default.name == "John Doe"
+    assert other.name == "John Other"
+    assert by_cpf.name == "John Other"
+    assert get_customer(
+        sqlite_session, default.id, tenant_id="loja-2"
+    ) is None
+    assert [row.name for row in get_customers(
+        sqlite_session, tenant_id="loja-2"
+    )] == ["John Other"]
+    assert get_customers_count(sqlite_session, tenant_id="loja-3") == 0
+
+
+def test_missing_email_lookup_is_cached_until_registered(
+    sqlite_session, negative_cache
+):
+    assert get_user_by_email(sqlite_session, "maria@example.com") is None
+    with max_queries(0):
+        assert get_user_by_email(sqlite_session, "Maria@Example.com") is None
+
+    with mock.patch(
+        'app.services.repository.security.get_password_hash',
+        return_value="hashed_password"
+    ):
+        create_user(sqlite_session, schemas.CustomerCreate(
+            name="Maria", email="maria@example.com", password="secret"
+        ))
+
+    assert get_user_by_email(sqlite_session, "maria@example.com").name == (
+        "Maria"
+    )
+
+
+def test_missing_email_is_not_cached_if_registered_during_lookup(
+    sqlite_session, negative_cache
+):
+    miss_key = email_miss_cache_key("default", "maria@example.com")
+    query = sqlite_session.query
+
+    def racing_query(*args):
+        # Cadastro concorrente entre a consulta e a gravação da ausência
+        cache.invalidate([miss_key])
+        return query(*args)
+
+    with mock.patch.object(sqlite_session, "query", side_effect=racing_query):
+        assert get_user_by_email(sqlite_session, "maria@example.com") is None
+
+    assert cache.get_cache().get(miss_key) is None
+
+
+def test_missing_cpf_is_not_cached_if_created_during_lookup(
+    sqlite_session, negative_cache
+):
+    key = cpf_cache_key("default", "98765432100")
+    query = sqlite_session.query
+
+    def racing_query(*args):
+        cache.invalidate([key])
+        return query(*args)
+
+    with mock.patch.object(sqlite_session, "query", side_effect=racing_query):
+        assert get_customer_by_cpf(sqlite_session, "98765432100") is None
+
+    assert cache.get_cache().get(key) is None
+
+
+@pytest.mark.parametrize("backend, expected", [
+    ("memory", 0), ("sqlite", 0), ("redis", 60),
+])
+def test_negative_lookups_need_a_shared_cache(monkeypatch, backend, expected):
+    monkeypatch.delenv("NEGATIVE_LOOKUP_TTL", raising=False)
+    monkeypatch.setenv("CACHE_BACKEND", backend)
+
+    assert negative_lookup_ttl() == expected
+
+
+def test_registration_is_seen_by_other_workers(sqlite_session, monkeypatch):
+    monkeypatch.delenv("NEGATIVE_LOOKUP_TTL", raising=False)
+    monkeypatch.delenv("CACHE_BACKEND", raising=False)
+    worker_a, worker_b = cache.LRUCache(), cache.LRUCache()
+
+    cache.set_cache(worker_a)
+    assert get_user_by_email(sqlite_session, "maria@example.com") is None
+
+    cache.set_cache(worker_b)
+    with mock.patch(
+        'app.services.repository.security.get_password_hash',
+        return_value="hashed_password"
+    ):
+        create_user(sqlite_session, schemas.CustomerCreate(
+            name="Maria", email="maria@example.com", password="secret"
+        ))
+
+    cache.set_cache(worker_a)
+    assert get_user_by_email(sqlite_session, "maria@example.com").name == (
+        "Maria"
+    )
+
+
+def test_cpf_lookup_returns_the_same_type_from_cache(sqlite_session):
+    from_db = get_customer_by_cpf(sqlite_session, "12345678900")
+    from_cache = get_customer_by_cpf(sqlite_session, "12345678900")
+
+    assert isinstance(from_db, schemas.Customer)
+    assert from_cache == from_db
+
+
+def test_count_is_not_cached_if_customer_created_during_count(
+    sqlite_session
+):
+    key = count_cache_key("default")
+    query = sqlite_session.query
+
+    def racing_query(*args):
+        cache.invalidate([key])
+        return query(*args)
+
+    with mock.patch.object(sqlite_session, "query", side_effect=racing_query):
+        assert get_customers_count(sqlite_session) == 1
+
+    assert cache.get_cache().get(key) is None
+
+
+def test_missing_cpf_is_seen_by_other_workers(sqlite_session, monkeypatch):
+    monkeypatch.delenv("NEGATIVE_LOOKUP_TTL", raising=False)
+    monkeypatch.delenv("CACHE_BACKEND", raising=False)
+    worker_a, worker_b = cache.LRUCache(), cache.LRUCache()
+
+    cache.set_cache(worker_a)
+    assert get_customer_by_cpf(sqlite_session, "98765432100") is None
+
+    cache.set_cache(worker_b)
+    with mock.patch(
+        'app.services.repository.security.get_password_hash',
+        return_value="hashed_password"
+    ):
+        create_user(sqlite_session, schemas.CustomerCreate(
+            name="Maria", email="maria@example.com", cpf="98765432100",
+            password="password123"
+        ))
+
+    cache.set_cache(worker_a)
+    assert get_customer_by_cpf(sqlite_session, "98765432100").name == "Maria"
@@ -0,0 +1,100 @@
+from unittest import mock
+
+import pytest
+from sqlalchemy import create_engine, func, select
+
+from app.database.database import Base
+from app.models import models
+from app.services import security, synthetic
+from app.services.synthetic import (
+    is_valid_index, load_customers, seed_customers, synthetic_cpf,
+    synthetic_customers
+)
+
+
+def _valid_cpf(cpf):
+    """Validação independente dos dígitos verificadores."""
+    digits = [int(digit) for digit in cpf]
+    if len(digits) != 11 or len(set(digits)) == 1:
+        return False
+    for size in (9, 10):
+        total = sum(d * (size + 1 - i) for i, d in enumerate(digits[:size]))
+        if (total * 10 % 11) % 10 != digits[size]:
+            return False
+    return True
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'synthetic.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_synthetic_cpf_is_valid():
+    assert synthetic_cpf(123456789) == '12345678909'
+    assert all(_valid_cpf(synthetic_cpf(i)) for i in range(1, 2000))
+
+
+def test_repeated_digit_indices_are_invalid():
+    assert not is_valid_index(0)
+    assert not is_valid_index(111111111)
+    assert not is_valid_index(10 ** 9)
+    with pytest.raises(ValueError):
+        synthetic_cpf(222222222)
+
+
+def test_synthetic_customers_skips_invalid_indices():
+    rows = list(synthetic_customers(3, 'hash', start=0, tenant_id='loja-2'))
+
+    assert [row['email'] for row in rows] == [
+        'cliente1@example.com', 'cliente2@example.com',
+        'cliente3@example.com',
+    ]
+    assert {row['tenant_id'] for row in rows} == {'loja-2'}
+    assert {row['hashed_password'] for row in rows} == {'hash'}
+    assert len({row['cpf'] for row in rows}) == 3
+
+
+def test_load_customers_uses_executemany_on_sqlite(engine):
+    rows = synthetic_customers(25, 'hash', start=1)
+
+    loaded = load_customers(engine, rows, batch_size=10)
+
+    assert loaded == 25
+    with engine.connect() as connection:
+        count = connection.execute(
+            select(func.count()).select_from(models.Customer)
+        ).scalar()
+    assert count == 25
+
+
+def test_load_customers_uses_copy_on_postgres():
+    engine = mock.MagicMock()
+    engine.dialect.name = 'postgresql'
+    connection = engine.begin.return_value.__enter__.return_value
+    cursor = connection.connection.cursor.return_value
+
+    loaded = load_customers(
+        engine, synthetic_customers(3, 'hash', start=1), batch_size=2
+    )
+
+    assert loaded == 3
+    assert cursor.copy_expert.call_count == 2
+    sql, buffer = cursor.copy_expert.call_args_list[0].args
+    assert sql.startswith('COPY customers (tenant_id, name, email, cpf')
+    assert buffer.getvalue().count('\n') == 2
+    connection.execute.assert_called_once()  # ANALYZE
+
+
+def test_seed_customers_hashes_password_once(engine):
+    with mock.patch.object(
+        security, 'get_password_hash', return_value='hash'
+    ) as get_password_hash, \
+            mock.patch.object(synthetic.cache, 'invalidate') as invalidate:
+        loaded = seed_customers(engine, 5, start=10, tenant_id='loja-2')
+
+    assert loaded == 5
+    get_password_hash.assert_called_once_with(synthetic.SYNTHETIC_PASSWORD)
+    invalidate.assert_called_once_with(['customers:loja-2:count'])
@@ -0,0 +1,196 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.database.database import Base, get_db
+from app.main import app
+from app.models import models
+from app.services import security
+from app.tools import tracing
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def exporter():
+    exporter = tracing.InMemorySpanExporter()
+    tracing.set_tracer(tracing.Tracer(tracing.SimpleSpanProcessor(exporter)))
+    yield exporter
+    tracing.set_tracer(None)
+
+
+def by_name(spans):
+    return {span.name: span for span in spans}
+
+
+def test_traceparent_round_trip():
+    header = f"00-{TRACE_ID}-{PARENT_ID}-01"
+    context = tracing.parse_traceparent(header)
+
+    assert context == tracing.SpanContext(TRACE_ID, PARENT_ID, True)
+    assert tracing.format_traceparent(context) == header
+    assert tracing.parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00") \
+        .sampled is False
+    assert tracing.parse_traceparent("00-zz-11-01") is None
+    assert tracing.parse_traceparent(f"00-{'0' * 32}-{PARENT_ID}-01") is None
+
+
+def test_disabled_tracer_creates_no_spans():
+    tracer = tracing.Tracer()
+    with tracer.start_span("noop") as span:
+        span.set_attribute("key", "value")
+    assert span is tracing.NOOP_SPAN
+    assert tracing.current_span() is None
+
+
+def test_nested_spans_share_trace(exporter):
+    with tracing.start_span("parent") as parent:
+        with tracing.start_span("child") as child:
+            assert tracing.current_span() is child
+            assert tracing.inject({})["traceparent"] == child.traceparent
+
+    spans = by_name(exporter.get_finished_spans())
+    assert spans["child"].parent_id == parent.context.span_id
+    assert spans["child"].context.trace_id == parent.context.trace_id
+    assert spans["parent"].parent_id is None
+    assert spans["child"].end_ns <= spans["parent"].end_ns
+
+
+def test_exceptions_are_recorded(exporter):
+    with pytest.raises(ValueError):
+        with tracing.start_span("failing"):
+            raise ValueError("boom")
+
+    span = exporter.get_finished_spans()[0]
+    assert span.error == "ValueError: boom"
+    assert span.attributes["exception.type"] == "ValueError"
+
+
+def test_traced_decorator_sync_and_async(exporter):
+    @tracing.traced()
+    def sync_work():
+        return 1
+
+    @tracing.traced("async.work")
+    async def async_work():
+        return 2
+
+    assert sync_work() == 1
+    assert asyncio.run(async_work()) == 2
+    names = [span.name for span in exporter.get_finished_spans()]
+    assert names == [
+        "test_tracing.test_traced_decorator_sync_and_async.<locals>."
+        "sync_work",
+        "async.work",
+    ]
+
+
+def test_unsampled_traces_are_not_exported():
+    exporter = tracing.InMemorySpanExporter()
+    tracer = tracing.Tracer(
+        tracing.SimpleSpanProcessor(exporter), sample_ratio=0
+    )
+    with tracer.start_span("root"), tracer.start_span("child"):
+        pass
+    remote = tracing.SpanContext(TRACE_ID, PARENT_ID, sampled=True)
+    with tracer.start_span("continued", parent=remote):
+        pass
+
+    assert [span.name for span in exporter.get_finished_spans()] == [
+        "continued"
+    ]
+
+
+def test_otlp_exporter_payload():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200)
+
+    exporter = tracing.OTLPHttpExporter(
+        "http://collector/v1/traces", "auth-service",
+        client=httpx.Client(transport=httpx.MockTransport(handler))
+    )
+    processor = tracing.BatchSpanProcessor(exporter, delay=10)
+    tracer = tracing.Tracer(processor)
+    remote = tracing.SpanContext(TRACE_ID, PARENT_ID)
+    with tracer.start_span("GET /auth", kind="server", parent=remote,
+                           attributes={"http.response.status_code": 200}):
+        pass
+    processor.shutdown()
+
+    payload = httpx.Response(200, content=requests[0].content).json()
+    resource = payload["resourceSpans"][0]
+    span = resource["scopeSpans"][0]["spans"][0]
+    assert resource["resource"]["attributes"][0]["value"] == {
+        "stringValue": "auth-service"
+    }
+    assert span["traceId"] == TRACE_ID
+    assert span["parentSpanId"] == PARENT_ID
+    assert span["kind"] == 2
+    assert span["attributes"] == [{
+        "key": "http.response.status_code", "value": {"intValue": "200"}
+    }]
+
+
+def test_request_spans_cover_router_security_and_repository(exporter):
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    with Session(bind=engine) as db:
+        db.add(models.Customer(
+            name="Admin", email="admin@fiap.com.br", cpf="12345678900"
+        ))
+        db.commit()
+    app.dependency_overrides[get_db] = lambda: Session(bind=engine)
+    token = security.create_access_token(data={"sub": "1"})
+    exporter.clear()
+
+    try:
+        response = TestClient(app).post(
+            "/customers/identify", json={"cpf": "12345678900"},
+            headers={
+                "Authorization": f"Bearer {token}",
+                "traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01",
+            }
+        )
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+    assert response.status_code == 200
+    spans = exporter.get_finished_spans()
+    named = by_name(spans)
+    server = named["POST /customers/identify"]
+    assert server.kind == "server"
+    assert server.parent_id == PARENT_ID
+    assert server.attributes["http.route"] == "/customers/identify"
+    assert all(span.context.trace_id == TRACE_ID for span in spans)
+
+    names = [span.name for span in spans]
+    assert names.count("customer.check_customer") == 1
+    handler = named["customer.check_customer"]
+    assert handler.parent_id == server.context.span_id
+    assert named["jwt.decode"].parent_id == server.context.span_id
+    assert named["repository.get_customer_by_cpf"].parent_id == \
+        handler.context.span_id
+    queries = [span for span in spans if span.name == "db.query"]
+    assert queries
+    assert queries[0].attributes["db.system"] == "sqlite"
+
+
+def test_kdf_spans(exporter):
+    hashed = security.get_password_hash("secret")
+    assert security.verify_password("secret", hashed)
+
+    names = [span.name for span in exporter.get_finished_spans()]
+    assert names == ["bcrypt.hash", "bcrypt.verify"]
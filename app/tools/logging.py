@@ -2,23 +2,38 @@ import logging
 import os
 from datetime import datetime
 
-# Criação do diretório de logs se não existir
+# Diretório de logs; criado somente quando o primeiro registro for gravado
 log_directory = '../logs'
-if not os.path.exists(log_directory):
-    os.makedirs(log_directory)
 
 # Configuração do nome do arquivo de log baseado na data atual
 log_filename = datetime.now().strftime('%Y-%m-%d') + '.log'
 log_filepath = os.path.join(log_directory, log_filename)
 
+
+class LazyFileHandler(logging.FileHandler):
+    """FileHandler que adia a criação do diretório e do arquivo de log.
+
+    Evita acesso ao sistema de arquivos durante o import do módulo; o
+    diretório é criado na primeira escrita.
+    """
+
+    def __init__(self, filename: str) -> None:
+        super().__init__(filename, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
 # Configuração do logger
 logging.basicConfig(
     level=logging.INFO,
     format=(
         '%(asctime)s - %(filename)s - %(pathname)s - %(name)s - '
-        '%(lineno)s - %(levelname)s - %(funcName)s - %(threadName)s - %(message)s'
+        '%(lineno)s - %(levelname)s - %(funcName)s - %(threadName)s - '
+        '%(message)s'
     ),
-    handlers=[logging.FileHandler(log_filepath), logging.StreamHandler()],
+    handlers=[LazyFileHandler(log_filepath), logging.StreamHandler()],
 )
 
 logging.getLogger('passlib.registry').setLevel(logging.WARNING)
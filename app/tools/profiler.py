@@ -0,0 +1,90 @@
+"""Profiler por amostragem para workers em produção.
+
+Um thread lê as pilhas de todos os threads do processo
+(`sys._current_frames`) a cada `interval` segundos e acumula as pilhas em
+formato "collapsed" (uma linha `quadro;quadro;... contagem` por pilha),
+aceito por `flamegraph.pl`, speedscope e similares.
+
+Nada é instalado no interpretador: fora de uma sessão de profiling não há
+thread nem hook ativo, e o custo é zero.
+"""
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Dict, List, Optional
+
+_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Já existe uma sessão de profiling em andamento no processo."""
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', code.co_filename)
+    return f'{module}:{code.co_name}:{frame.f_lineno}'
+
+
+def _collapse(frame: Optional[FrameType], thread_name: str) -> str:
+    labels: List[str] = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    labels.reverse()
+    return ';'.join(labels)
+
+
+def sample(duration: float, interval: float = 0.005) -> Counter:
+    """Amostra as pilhas de todos os threads durante `duration` segundos.
+
+    O thread que executa a amostragem é excluído do resultado. Apenas uma
+    sessão pode estar ativa por processo.
+
+    Args:
+        duration (float): Duração da sessão, em segundos.
+        interval (float): Intervalo entre as amostras, em segundos.
+
+    Raises:
+        ProfilerBusy: Se outra sessão estiver em andamento.
+
+    Returns:
+        Counter: Contagem de amostras por pilha colapsada.
+    """
+    if not _lock.acquire(blocking=False):
+        raise ProfilerBusy('Profiling já em andamento')
+    try:
+        own_id = threading.get_ident()
+        stacks: Counter = Counter()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            names: Dict[int, str] = {
+                thread.ident: thread.name
+                for thread in threading.enumerate()
+            }
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                name = names.get(thread_id, f'thread-{thread_id}')
+                stacks[_collapse(frame, name)] += 1
+            time.sleep(interval)
+        return stacks
+    finally:
+        _lock.release()
+
+
+def format_collapsed(stacks: Counter) -> str:
+    """Formata as pilhas no formato collapsed, da mais frequente à menos.
+
+    Args:
+        stacks (Counter): Contagem de amostras por pilha.
+
+    Returns:
+        str: Uma linha `pilha contagem` por pilha.
+    """
+    return ''.join(
+        f'{stack} {count}\n' for stack, count in stacks.most_common()
+    )
@@ -0,0 +1,48 @@
+from functools import lru_cache
+from typing import Any
+
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import TypeAdapter
+
+__all__ = ['ORJSONResponse', 'get_adapter', 'serialize']
+
+
+@lru_cache(maxsize=None)
+def get_adapter(type_: Any) -> TypeAdapter:
+    """Retorna um `TypeAdapter` em cache para o tipo informado.
+
+    Construir um `TypeAdapter` compila o schema de validação e serialização;
+    o cache garante que isso aconteça uma única vez por tipo no processo.
+
+    Args:
+        type_ (Any): O tipo Pydantic (ex.: `List[schemas.Customer]`).
+
+    Returns:
+        TypeAdapter: O adapter compilado para o tipo.
+    """
+    return TypeAdapter(type_)
+
+
+def serialize(type_: Any, content: Any, status_code: int = 200) -> Response:
+    """Converte objetos ORM (ou linhas) em uma resposta JSON pronta.
+
+    Os dados são lidos por atributo e serializados uma única vez pelo
+    pydantic-core. Como o retorno já é uma `Response`, o FastAPI não repete
+    a validação do `response_model` da rota, que permanece apenas para a
+    documentação OpenAPI.
+
+    Args:
+        type_ (Any): O tipo Pydantic da resposta.
+        content (Any): Os objetos a serializar.
+        status_code (int): O status HTTP da resposta.
+
+    Returns:
+        Response: A resposta com o corpo JSON serializado.
+    """
+    adapter = get_adapter(type_)
+    body = adapter.dump_json(
+        adapter.validate_python(content, from_attributes=True)
+    )
+    return Response(
+        content=body, status_code=status_code, media_type='application/json'
+    )
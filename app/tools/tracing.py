@@ -0,0 +1,589 @@
+"""Tracing distribuído compatível com OpenTelemetry.
+
+Spans são abertos com `start_span` (ou o decorador `traced`) e encadeados
+pelo contexto atual (`ContextVar`), inclusive nos endpoints síncronos que o
+FastAPI executa em threads. O contexto de entrada e de saída segue o
+padrão W3C Trace Context (`traceparent`).
+
+Os spans finalizados são entregues a um `SpanExporter` plugável:
+
+- `InMemorySpanExporter`: guarda os spans em memória (testes).
+- `LoggingSpanExporter`: uma linha de log por span.
+- `OTLPHttpExporter`: envia lotes no formato OTLP/HTTP JSON para um
+  collector OpenTelemetry (`TRACING_OTLP_ENDPOINT`).
+
+Sem exporter configurado (`TRACING_EXPORTER=none`, o padrão) o tracing fica
+desligado e `start_span` não cria spans.
+"""
+import functools
+import inspect
+import queue
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from os import environ as env
+from typing import (
+    Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Union
+)
+
+from fastapi.routing import APIRoute
+
+from .logging import logger
+
+_TRACEPARENT = re.compile(
+    r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$'
+)
+
+
+class SpanContext(NamedTuple):
+    """Identificação de um span propagável entre serviços."""
+
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[SpanContext]:
+    """Lê um cabeçalho W3C `traceparent`.
+
+    Args:
+        header (Optional[str]): O valor recebido.
+
+    Returns:
+        Optional[SpanContext]: O contexto remoto, ou None se inválido.
+    """
+    if not header:
+        return None
+    match = _TRACEPARENT.match(header.strip().lower())
+    if match is None:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == '0' * 32 or span_id == '0' * 16:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 1))
+
+
+def format_traceparent(context: SpanContext) -> str:
+    """Formata um contexto como cabeçalho W3C `traceparent`."""
+    flags = '01' if context.sampled else '00'
+    return f'00-{context.trace_id}-{context.span_id}-{flags}'
+
+
+def _new_id(bits: int) -> str:
+    return f'{random.getrandbits(bits):0{bits // 4}x}'
+
+
+class Span:
+    """Uma operação medida.
+
+    Attributes:
+        name (str): O nome da operação.
+        context (SpanContext): Os identificadores do span.
+        parent_id (Optional[str]): O ID do span pai, se houver.
+        kind (str): `internal`, `server` ou `client`.
+        start_ns (int): Início, em nanossegundos desde a época.
+        end_ns (Optional[int]): Fim, em nanossegundos desde a época.
+        attributes (Dict[str, Any]): Atributos do span.
+        error (Optional[str]): Descrição do erro, se a operação falhou.
+    """
+
+    __slots__ = ('name', 'context', 'parent_id', 'kind', 'start_ns',
+                 'end_ns', 'attributes', 'error')
+
+    def __init__(self, name: str, context: SpanContext,
+                 parent_id: Optional[str] = None, kind: str = 'internal',
+                 attributes: Optional[Dict[str, Any]] = None,
+                 start_ns: Optional[int] = None) -> None:
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.time_ns() if start_ns is None else start_ns
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        """A duração do span, em milissegundos."""
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    @property
+    def traceparent(self) -> str:
+        """O cabeçalho `traceparent` para propagar este span."""
+        return format_traceparent(self.context)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.error = f'{type(exc).__name__}: {exc}'
+        self.attributes['exception.type'] = type(exc).__name__
+        self.attributes['exception.message'] = str(exc)
+
+
+class _NoopSpan:
+    """Span usado com o tracing desligado; ignora todas as chamadas."""
+
+    context = None
+    traceparent = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current: ContextVar[Optional[Union[Span, SpanContext]]] = ContextVar(
+    'current_span', default=None
+)
+
+
+def current_span() -> Optional[Span]:
+    """Retorna o span ativo no contexto atual, se houver."""
+    span = _current.get()
+    return span if isinstance(span, Span) else None
+
+
+# ======= EXPORTERS ======= #
+
+
+class SpanExporter(ABC):
+    """Destino dos spans finalizados."""
+
+    @abstractmethod
+    def export(self, spans: List[Span]) -> None:
+        """Entrega um lote de spans finalizados."""
+
+    def shutdown(self) -> None:
+        """Libera os recursos do exporter."""
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Guarda os spans exportados em memória (usado nos testes)."""
+
+    def __init__(self) -> None:
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        with self._lock:
+            self._spans.extend(spans)
+
+    def get_finished_spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+
+class LoggingSpanExporter(SpanExporter):
+    """Registra cada span no log da aplicação."""
+
+    def export(self, spans: List[Span]) -> None:
+        for span in spans:
+            logger.info(
+                f'span {span.name} trace={span.context.trace_id} '
+                f'span={span.context.span_id} parent={span.parent_id} '
+                f'duration_ms={span.duration_ms:.2f} error={span.error}'
+            )
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+_OTLP_KINDS = {'internal': 1, 'server': 2, 'client': 3}
+
+
+class OTLPHttpExporter(SpanExporter):
+    """Envia os spans a um collector OpenTelemetry via OTLP/HTTP JSON.
+
+    Attributes:
+        endpoint (str): A URL de `v1/traces` do collector.
+        service_name (str): O `service.name` informado no recurso.
+    """
+
+    def __init__(self, endpoint: str, service_name: str,
+                 client=None, timeout: float = 5.0) -> None:
+        import httpx
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self._client = client or httpx.Client(timeout=timeout)
+
+    def to_otlp(self, spans: List[Span]) -> Dict[str, Any]:
+        """Converte os spans no payload `ExportTraceServiceRequest`."""
+        return {'resourceSpans': [{
+            'resource': {'attributes': [{
+                'key': 'service.name',
+                'value': _otlp_value(self.service_name),
+            }]},
+            'scopeSpans': [{
+                'scope': {'name': __name__},
+                'spans': [self._span(span) for span in spans],
+            }],
+        }]}
+
+    @staticmethod
+    def _span(span: Span) -> Dict[str, Any]:
+        data = {
+            'traceId': span.context.trace_id,
+            'spanId': span.context.span_id,
+            'name': span.name,
+            'kind': _OTLP_KINDS.get(span.kind, 1),
+            'startTimeUnixNano': str(span.start_ns),
+            'endTimeUnixNano': str(span.end_ns),
+            'attributes': [
+                {'key': key, 'value': _otlp_value(value)}
+                for key, value in span.attributes.items()
+            ],
+            'status': (
+                {'code': 2, 'message': span.error} if span.error
+                else {'code': 0}
+            ),
+        }
+        if span.parent_id:
+            data['parentSpanId'] = span.parent_id
+        return data
+
+    def export(self, spans: List[Span]) -> None:
+        try:
+            self._client.post(self.endpoint, json=self.to_otlp(spans))
+        except Exception as e:
+            logger.error(f'Error exporting {len(spans)} spans: {e}')
+
+    def shutdown(self) -> None:
+        self._client.close()
+
+
+# ======= PROCESSADORES ======= #
+
+
+class SimpleSpanProcessor:
+    """Exporta cada span no momento em que ele termina."""
+
+    def __init__(self, exporter: SpanExporter) -> None:
+        self.exporter = exporter
+
+    def on_end(self, span: Span) -> None:
+        self.exporter.export([span])
+
+    def shutdown(self) -> None:
+        self.exporter.shutdown()
+
+
+class BatchSpanProcessor:
+    """Exporta os spans em lotes a partir de um thread em segundo plano.
+
+    A fila é limitada: com o exporter lento, spans excedentes são
+    descartados em vez de acumular memória ou bloquear as requisições.
+    """
+
+    def __init__(self, exporter: SpanExporter, max_queue: int = 2048,
+                 max_batch: int = 512, delay: float = 1.0) -> None:
+        self.exporter = exporter
+        self.max_batch = max_batch
+        self.delay = delay
+        self.dropped = 0
+        self._queue: 'queue.Queue[Optional[Span]]' = queue.Queue(max_queue)
+        self._thread = threading.Thread(
+            target=self._run, name='span-exporter', daemon=True
+        )
+        self._thread.start()
+
+    def on_end(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.delay
+            while len(batch) < self.max_batch:
+                try:
+                    span = self._queue.get(
+                        timeout=max(deadline - time.monotonic(), 0)
+                    )
+                except queue.Empty:
+                    break
+                if span is None:
+                    if batch:
+                        self.exporter.export(batch)
+                    return
+                batch.append(span)
+            if batch:
+                self.exporter.export(batch)
+
+    def shutdown(self, timeout: Optional[float] = 5.0) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self.exporter.shutdown()
+
+
+# ======= TRACER ======= #
+
+
+class Tracer:
+    """Cria spans e os entrega ao processador configurado.
+
+    Attributes:
+        processor: O processador dos spans finalizados, ou None para
+        desligar o tracing.
+        sample_ratio (float): Fração dos traces iniciados aqui que são
+        registrados; traces recebidos seguem a decisão do chamador.
+    """
+
+    def __init__(self, processor=None, sample_ratio: float = 1.0) -> None:
+        self.processor = processor
+        self.sample_ratio = sample_ratio
+
+    @property
+    def enabled(self) -> bool:
+        return self.processor is not None
+
+    def _child_context(self, parent) -> SpanContext:
+        if parent is None:
+            return SpanContext(
+                _new_id(128), _new_id(64),
+                random.random() < self.sample_ratio
+            )
+        context = parent.context if isinstance(parent, Span) else parent
+        return SpanContext(context.trace_id, _new_id(64), context.sampled)
+
+    def _parent_id(self, parent) -> Optional[str]:
+        if parent is None:
+            return None
+        context = parent.context if isinstance(parent, Span) else parent
+        return context.span_id
+
+    @contextmanager
+    def start_span(self, name: str, kind: str = 'internal',
+                   attributes: Optional[Dict[str, Any]] = None,
+                   parent: Optional[SpanContext] = None
+                   ) -> Iterator[Union[Span, _NoopSpan]]:
+        """Abre um span filho do span atual (ou de `parent`).
+
+        Args:
+            name (str): O nome da operação.
+            kind (str): `internal`, `server` ou `client`.
+            attributes (Optional[Dict[str, Any]]): Atributos iniciais.
+            parent (Optional[SpanContext]): Contexto remoto recebido, que
+            substitui o span atual como pai.
+
+        Yields:
+            Span: O span aberto.
+        """
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+        parent = parent if parent is not None else _current.get()
+        span = Span(name, self._child_context(parent),
+                    self._parent_id(parent), kind, attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current.reset(token)
+            self._finish(span)
+
+    def record_span(self, name: str, start_ns: int, end_ns: int,
+                    kind: str = 'internal',
+                    attributes: Optional[Dict[str, Any]] = None) -> None:
+        """Registra um span já medido como filho do span atual.
+
+        Usado quando o início e o fim são observados em callbacks
+        separados, como nos eventos do SQLAlchemy.
+        """
+        parent = _current.get()
+        if not self.enabled or parent is None:
+            return
+        span = Span(name, self._child_context(parent),
+                    self._parent_id(parent), kind, attributes, start_ns)
+        span.end_ns = end_ns
+        if span.context.sampled:
+            self.processor.on_end(span)
+
+    def _finish(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        if span.context.sampled:
+            try:
+                self.processor.on_end(span)
+            except Exception as e:
+                logger.error(f'Error processing span {span.name}: {e}')
+
+    def shutdown(self) -> None:
+        if self.processor is not None:
+            self.processor.shutdown()
+
+
+def create_tracer() -> Tracer:
+    """Cria o tracer a partir das variáveis de ambiente.
+
+    - `TRACING_EXPORTER`: `none` (padrão), `log`, `memory` ou `otlp`.
+    - `TRACING_OTLP_ENDPOINT`: URL do collector (padrão
+      `http://localhost:4318/v1/traces`).
+    - `TRACING_SAMPLE_RATIO`: fração dos traces registrados (padrão `1`).
+    - `OTEL_SERVICE_NAME`: nome do serviço (padrão `auth-service`).
+
+    Returns:
+        Tracer: O tracer configurado.
+    """
+    kind = env.get('TRACING_EXPORTER', 'none').lower()
+    ratio = float(env.get('TRACING_SAMPLE_RATIO', '1'))
+    if kind == 'none':
+        return Tracer()
+    if kind == 'memory':
+        return Tracer(SimpleSpanProcessor(InMemorySpanExporter()), ratio)
+    if kind == 'log':
+        return Tracer(BatchSpanProcessor(LoggingSpanExporter()), ratio)
+    if kind == 'otlp':
+        exporter = OTLPHttpExporter(
+            env.get('TRACING_OTLP_ENDPOINT',
+                    'http://localhost:4318/v1/traces'),
+            env.get('OTEL_SERVICE_NAME', 'auth-service'),
+        )
+        return Tracer(BatchSpanProcessor(exporter), ratio)
+    raise ValueError(f'TRACING_EXPORTER inválido: {kind}')
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Retorna o tracer do processo, criando-o no primeiro uso."""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = create_tracer()
+    return _tracer
+
+
+def set_tracer(tracer: Optional[Tracer]) -> None:
+    """Substitui o tracer do processo (None recria a partir do ambiente)."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is not None and _tracer is not tracer:
+            _tracer.shutdown()
+        _tracer = tracer
+
+
+def start_span(name: str, kind: str = 'internal',
+               attributes: Optional[Dict[str, Any]] = None,
+               parent: Optional[SpanContext] = None):
+    """Abre um span com o tracer do processo (ver `Tracer.start_span`)."""
+    return get_tracer().start_span(name, kind, attributes, parent)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorador que executa a função (síncrona ou assíncrona) em um span.
+
+    Args:
+        name (Optional[str]): O nome do span; por padrão,
+        `<módulo>.<função>`.
+
+    Returns:
+        Callable: O decorador.
+    """
+    def decorator(func: Callable) -> Callable:
+        span_name = name or (
+            f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+        )
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with start_span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with start_span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TracedRoute(APIRoute):
+    """Rota do FastAPI que executa o handler dentro de um span.
+
+    Uso: `APIRouter(route_class=TracedRoute)`.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs) -> None:
+        # `include_router` recria as rotas com o endpoint já decorado
+        if not getattr(endpoint, '__traced__', False):
+            endpoint = traced()(endpoint)
+            endpoint.__traced__ = True
+        super().__init__(path, endpoint, **kwargs)
+
+
+def inject(headers: Dict[str, str]) -> Dict[str, str]:
+    """Adiciona o `traceparent` do span atual aos cabeçalhos de saída."""
+    span = current_span()
+    if span is not None:
+        headers['traceparent'] = span.traceparent
+    return headers
+
+
+# ======= SQLALCHEMY ======= #
+
+_DB_START_KEY = 'tracing_start'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany) -> None:
+    if get_tracer().enabled and _current.get() is not None:
+        conn.info.setdefault(_DB_START_KEY, []).append(time.time_ns())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany) -> None:
+    starts = conn.info.get(_DB_START_KEY)
+    if not starts:
+        return
+    get_tracer().record_span(
+        'db.query', starts.pop(), time.time_ns(), kind='client',
+        attributes={
+            'db.system': conn.dialect.name,
+            'db.statement': statement,
+        },
+    )
+
+
+def instrument_sqlalchemy(target=None) -> None:
+    """Registra um span `db.query` por comando SQL executado.
+
+    Args:
+        target: A engine, ou a classe `Engine` (padrão), a instrumentar.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    target = Engine if target is None else target
+    if not event.contains(target, 'before_cursor_execute',
+                          _before_cursor_execute):
+        event.listen(target, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(target, 'after_cursor_execute', _after_cursor_execute)
@@ -12,6 +12,10 @@ echo "Banco de dados PostgreSQL está pronto!"
 echo "Rodando as migrações com Alembic..."
 poetry run alembic upgrade head
 
-# Inicia o FastAPI com Uvicorn
+# Cria o usuário administrador uma única vez, antes de subir os workers
+echo "Criando usuário administrador..."
+poetry run python -m app.cli create-admin
+
+# Inicia o FastAPI com o servidor de produção (pre-fork, sem reload)
 echo "Iniciando o FastAPI..."
-exec poetry run uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
+exec poetry run python -m app.server